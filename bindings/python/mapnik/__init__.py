@@ -41,8 +41,21 @@ Several things happen when you do:
 
 import os
 import sys
+import threading
 import warnings
 
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+import array
+
 try:
     from ctypes import RTLD_NOW, RTLD_GLOBAL
 except ImportError:
@@ -259,10 +272,77 @@ class _Datasource(Datasource,_injector):
         return map(get_types,self._field_types())
 
     def all_features(self):
-        query = Query(self.envelope())
-        for fld in self.fields():
-            query.add_property_name(fld)
-        return self.features(query).features
+        return list(self.iter_features())
+
+    def iter_features(self, query=None, batch_size=1000):
+        """Lazily iterate over the features matching query.
+
+        Features are read from the datasource batch_size at a time, so
+        memory use stays constant regardless of the number of features.
+        The default query covers the whole datasource and requests all
+        fields.
+
+        >>> for feat in ds.iter_features():
+        ...     print feat.id()
+        """
+        if query is None:
+            query = Query(self.envelope())
+            for fld in self.fields():
+                query.add_property_name(fld)
+        featureset = self.features(query)
+        if featureset is None:
+            return
+        while True:
+            batch = featureset.next_batch(batch_size)
+            if not batch:
+                break
+            for feat in batch:
+                yield feat
+
+class _Featureset(Featureset,_injector):
+
+    def to_arrays(self, fields=None):
+        """Read the remaining features into columnar arrays.
+
+        Returns a dict with the vertex coordinates in 'x' and 'y'
+        (float64), the vertex commands in 'command' (uint8), the type
+        of each geometry in 'geometry_type' (uint8), the feature ids in
+        'id' (int32) and two offset arrays (uint32): the vertices of
+        geometry i are [geometry_offset[i]:geometry_offset[i+1]] and the
+        geometries of feature j are [feature_offset[j]:feature_offset[j+1]].
+
+        'fields' maps each requested attribute name to an int32 array
+        for integer attributes, a float64 array (NaN marking missing
+        values) for other numeric attributes or a list for strings.
+
+        The data is copied once out of Mapnik into a bytes object per
+        column. With numpy available the arrays are read-only numpy
+        views of those bytes (use .copy() to modify them), otherwise
+        they are array.array copies.
+
+        >>> arrays = ds.features(query).to_arrays(['NAME'])
+        >>> arrays['x'].mean()
+        """
+        arrays = self._to_arrays(list(fields or []))
+        for name, typecode in (('x', 'd'), ('y', 'd'),
+                               ('command', 'B'), ('geometry_type', 'B'),
+                               ('geometry_offset', 'I'), ('feature_offset', 'I'),
+                               ('id', 'i')):
+            arrays[name] = _frombuffer(typecode, arrays[name])
+        for name, column in arrays['fields'].items():
+            if isinstance(column, tuple):
+                arrays['fields'][name] = _frombuffer(*column)
+        return arrays
+
+def _frombuffer(typecode, data):
+    if numpy is not None:
+        return numpy.frombuffer(data, dtype=numpy.dtype(typecode))
+    a = array.array(typecode)
+    if hasattr(a, 'frombytes'):
+        a.frombytes(data)
+    else:
+        a.fromstring(data)
+    return a
 
 class _DeprecatedFeatureProperties(object):
 
@@ -361,6 +441,10 @@ def Shapefile(**keywords):
     Optional keyword arguments:
       base -- path prefix (default None)
       encoding -- file encoding (default 'utf-8')
+      row_cache_size -- number of decoded attribute rows to keep in memory (default 0, disabled)
+      build_index -- index shapefiles without a .index file in memory (default False)
+      save_index -- save the index built by build_index as a packed .index file,
+                    which older versions can not read (default False)
 
     >>> from mapnik import Shapefile, Layer
     >>> shp = Shapefile(base='/home/mapnik/data',file='world_borders') 
@@ -399,8 +483,11 @@ def PostGIS(**keywords):
       geometry_field -- specify geometry field to use (default: first entry in geometry_columns)
       srid -- specify srid to use (default: auto-detected from geometry_field)
       row_limit -- integer limit of rows to return (default: 0)
-      cursor_size -- integer size of binary cursor to use (default: 0, no binary cursor is used)
+      cursor_size -- integer number of rows of the first fetch from the binary cursor, later fetches adapt to the row size (default: 1000, 0 disables the cursor)
       multiple_geometries -- boolean, direct the Mapnik wkb reader to interpret as multigeometries (default False)
+      filter_pushdown -- boolean, add the rule filters of the rendered styles to the query as far as they translate to SQL, attributes must be compared to literals of their column type (default False)
+      simplify_geometries -- boolean, simplify geometries in the query to the resolution of the rendered map with ST_SnapToGrid and ST_SimplifyPreserveTopology (default False)
+      simplify_tolerance -- float, tolerance of simplify_geometries in pixels (default 0.5)
 
     >>> from mapnik import PostGIS, Layer
     >>> params = dict(dbname='mapnik',table='osm',user='postgres',password='gis')
@@ -533,6 +620,7 @@ def SQLite(**keywords):
       wkb_format -- specify a wkb type of 'spatialite' (default None)
       multiple_geometries -- boolean, direct the Mapnik wkb reader to interpret as multigeometries (default False)
       use_spatial_index -- boolean, instruct sqlite plugin to use Rtree spatial index (default True)
+      filter_pushdown -- boolean, add the rule filters of the rendered styles to the query as far as they translate to SQL (default False)
 
     >>> from mapnik import SQLite, Layer
     >>> sqlite = SQLite(base='/home/mapnik/data',file='osm.db',table='osm',extent='-20037508,-19929239,20037508,19929239') 
@@ -624,6 +712,91 @@ def Geos(**keywords):
     keywords['type'] = 'geos'
     return CreateDatasource(keywords)
 
+class RenderPool(object):
+    """Render many extents of one stylesheet in parallel.
+
+    Each worker thread owns its own Map loaded from map_xml, so neither
+    maps nor datasources are shared between threads. Rendering and
+    encoding release the GIL, so the workers run concurrently.
+
+    Jobs are (bbox, width, height, format) tuples. imap() yields
+    (job, encoded_image) pairs in the order the jobs finish.
+
+    >>> from mapnik import RenderPool, Box2d
+    >>> pool = RenderPool('mapfile.xml', workers=8)
+    >>> jobs = [(Box2d(-180,-90,0,90),256,256,'png'),(Box2d(0,-90,180,90),256,256,'png')]
+    >>> for job, data in pool.imap(jobs):
+    ...     pass
+    >>> pool.close()
+
+    """
+    def __init__(self, map_xml, workers=None, strict=False):
+        if workers is None:
+            try:
+                from multiprocessing import cpu_count
+                workers = cpu_count()
+            except (ImportError, NotImplementedError):
+                workers = 1
+        self._jobs = queue.Queue()
+        self._threads = []
+        # load_map holds the GIL, so maps are loaded up front rather
+        # than in the workers; this also reports load errors here
+        maps = []
+        for i in range(workers):
+            m = Map(256, 256)
+            load_map(m, map_xml, strict)
+            maps.append(m)
+        for m in maps:
+            t = threading.Thread(target=self._work, args=(m,))
+            t.setDaemon(True)
+            t.start()
+            self._threads.append(t)
+
+    def _work(self, m):
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            results, job = item
+            try:
+                bbox, width, height, format = job
+                m.resize(width, height)
+                m.zoom_to_box(bbox)
+                im = Image(width, height)
+                render(m, im)
+                results.put((job, im.tostring(format), None))
+            except:
+                results.put((job, None, sys.exc_info()[1]))
+
+    def imap(self, jobs):
+        """Render jobs and yield (job, encoded_image) as they finish."""
+        if not self._threads:
+            raise RuntimeError('RenderPool is closed')
+        results = queue.Queue()
+        count = 0
+        for job in jobs:
+            self._jobs.put((results, job))
+            count += 1
+        for i in range(count):
+            job, data, error = results.get()
+            if error is not None:
+                raise error
+            yield job, data
+
+    def close(self):
+        """Stop the worker threads once all queued jobs are done."""
+        for t in self._threads:
+            self._jobs.put(None)
+        for t in self._threads:
+            t.join()
+        self._threads = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
 def mapnik_version_string(version=mapnik_version()):
     """Return the Mapnik version as a string."""
     patch_level = version % 100
@@ -661,6 +834,7 @@ __all__ = [
     'Color',
     'Coord',
     'ColorBand',
+    'CompiledExpression',
     'CompositeOp',
     'DatasourceCache',
     'Box2d',
@@ -740,11 +914,19 @@ __all__ = [
     'save_map_to_string',
     'render',
     'render_tile_to_file',
+    'render_metatile',
+    'RenderPool',
     'render_to_file',
     #   other
     'register_plugins',
     'register_fonts',
     'scale_denominator',
+    'cached_projection',
+    'projection_cache_stats',
+    'clear_projection_cache',
+    'feature_cache_stats',
+    'set_feature_cache_size',
+    'clear_feature_cache',
     # deprecated
     'Filter',
     'Envelope',
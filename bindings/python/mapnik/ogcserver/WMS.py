@@ -21,7 +21,7 @@
 
 """Interface for registering map styles and layers for availability in WMS Requests."""
 
-from common import Version, copy_style, copy_layer
+from common import Version, copy_style, copy_layer, MapPool
 from exceptions import OGCException, ServerConfigurationError
 from wms111 import ServiceHandler as ServiceHandler111
 from wms130 import ServiceHandler as ServiceHandler130
@@ -46,6 +46,8 @@ class BaseWMSFactory:
         self.ordered_layers = []
         self.styles = {}
         self.aggregatestyles = {}
+        self.cache = None
+        self.mappool = MapPool()
 
     def loadXML(self, xmlfile, strict=False):
         tmp_map = Map(0,0)
@@ -71,6 +73,7 @@ class BaseWMSFactory:
                 aggregates_name = '%s_aggregates' % lyr.name
                 self.register_aggregate_style(aggregates_name,aggregates)
                 self.register_layer(copy_layer(lyr), aggregates_name, extrastyles=aggregates)
+        self.invalidate_cache()
 
     def register_layer(self, layer, defaultstyle, extrastyles=()):
         layername = layer.name
@@ -93,6 +96,7 @@ class BaseWMSFactory:
             raise ServerConfigurationError('Layer "%s" was passed an invalid list of extra styles.  List must be a tuple of strings.' % layername)
         self.ordered_layers.append(layer)    
         self.layers[layername] = layer
+        self.invalidate_cache()
 
     def register_style(self, name, style):
         if not name:
@@ -102,6 +106,7 @@ class BaseWMSFactory:
         if not isinstance(style, Style):
             raise ServerConfigurationError('Bad style object passed to register_style() for style "%s".' % name)
         self.styles[name] = style
+        self.invalidate_cache()
 
     def register_aggregate_style(self, name, stylenames):
         if not name:
@@ -113,6 +118,14 @@ class BaseWMSFactory:
             if stylename not in self.styles.keys():
                 raise ServerConfigurationError('Attempted to register an aggregate style containing a style that does not exist.')
             self.aggregatestyles[name].append(stylename)
+        self.invalidate_cache()
+
+    def invalidate_cache(self):
+        """ Drop all cached responses and pooled maps, called whenever layers or styles change. """
+        if getattr(self, 'cache', None) is not None:
+            self.cache.clear()
+        if getattr(self, 'mappool', None) is not None:
+            self.mappool.clear()
 
     def finalize(self):
         if len(self.layers) == 0:
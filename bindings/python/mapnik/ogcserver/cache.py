@@ -0,0 +1,279 @@
+#
+# This file is part of Mapnik (c++ mapping toolkit)
+#
+# Copyright (C) 2006 Jean-Francois Doyon
+#
+# Mapnik is free software; you can redistribute it and/or
+# modify it under the terms of the GNU Lesser General Public
+# License as published by the Free Software Foundation; either
+# version 2.1 of the License, or (at your option) any later version.
+#
+# This library is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+# Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public
+# License along with this library; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+#
+# $Id$
+
+"""Response caches for rendered GetMap requests."""
+
+from exceptions import ServerConfigurationError
+from threading import Lock
+from time import time
+import os
+import shutil
+import tempfile
+
+try:
+    from hashlib import sha1
+except ImportError:
+    from sha import new as sha1
+
+def cache_key(params, namespace=''):
+    """ Build a normalized cache key for GetMap parameters.
+
+        Only the parameters that influence the rendered image are
+        considered, so requests differing in e.g. EXCEPTIONS share
+        the same cache entry. The namespace separates requests that
+        are interpreted differently, e.g. by WMS 1.1.1 and 1.3.0.
+    """
+    layers = tuple(params['layers'])
+    styles = list(params.get('styles', []))
+    styles += [''] * (len(layers) - len(styles))
+    bgcolor = params.get('bgcolor')
+    if bgcolor is not None:
+        bgcolor = bgcolor.to_hex_string()
+    key = (namespace,
+           layers,
+           tuple(styles),
+           str(params['crs']).lower(),
+           tuple([repr(float(c)) for c in params['bbox']]),
+           params['width'],
+           params['height'],
+           params['format'],
+           params.get('transparent', 'FALSE'),
+           bgcolor)
+    return sha1(repr(key)).hexdigest()
+
+class MemoryCache:
+
+    def __init__(self, maxsize, ttl=0):
+        """ An in memory LRU cache of encoded responses.
+
+            @param maxsize: Maximum total size of the cached content in bytes.
+            @param ttl: Seconds after which an entry expires, 0 to never expire.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.size = 0
+        self.entries = {}
+        self.lock = Lock()
+        self.clock = 0
+
+    def get(self, key):
+        self.lock.acquire()
+        try:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if self.ttl and time() - entry[0] > self.ttl:
+                self._remove(key)
+                return None
+            self.clock += 1
+            entry[1] = self.clock
+            return entry[2]
+        finally:
+            self.lock.release()
+
+    def set(self, key, content):
+        if len(content) > self.maxsize:
+            return
+        self.lock.acquire()
+        try:
+            if key in self.entries:
+                self._remove(key)
+            self.clock += 1
+            self.entries[key] = [time(), self.clock, content]
+            self.size += len(content)
+            if self.size > self.maxsize:
+                # evict least recently used entries down to 90% of maxsize
+                # so that eviction is not triggered on every insert
+                lru = sorted(self.entries.items(), key=lambda item: item[1][1])
+                for oldkey, entry in lru:
+                    if self.size <= self.maxsize * 0.9:
+                        break
+                    self._remove(oldkey)
+        finally:
+            self.lock.release()
+
+    def clear(self):
+        self.lock.acquire()
+        try:
+            self.entries = {}
+            self.size = 0
+        finally:
+            self.lock.release()
+
+    def _remove(self, key):
+        entry = self.entries.pop(key)
+        self.size -= len(entry[2])
+
+class DiskCache:
+
+    def __init__(self, directory, maxsize, ttl=0):
+        """ An on disk cache of encoded responses, shared between
+            processes using the same directory.
+
+            @param directory: Directory to store cached responses in.
+            @param maxsize: Maximum total size of the cached content in bytes.
+            @param ttl: Seconds after which an entry expires, 0 to never expire.
+        """
+        self.directory = directory
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.size = None
+        self.lock = Lock()
+        if not os.path.isdir(directory):
+            try:
+                os.makedirs(directory)
+            except OSError:
+                raise ServerConfigurationError('Cache directory "%s" could not be created.' % directory)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if self.ttl and time() - os.path.getmtime(path) > self.ttl:
+                self._unlink(path)
+                return None
+            f = open(path, 'rb')
+            try:
+                return f.read()
+            finally:
+                f.close()
+        except (IOError, OSError):
+            return None
+
+    def set(self, key, content):
+        if len(content) > self.maxsize:
+            return
+        path = self._path(key)
+        dirname = os.path.dirname(path)
+        try:
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+            # write to a temporary file first so that concurrent
+            # readers never see a partially written response
+            fd, tmppath = tempfile.mkstemp(prefix='.', dir=dirname)
+            try:
+                os.write(fd, content)
+            finally:
+                os.close(fd)
+            os.rename(tmppath, path)
+        except (IOError, OSError):
+            return
+        self.lock.acquire()
+        try:
+            if self.size is None:
+                self.size = sum([size for mtime, size, path in self._scan()])
+            else:
+                self.size += len(content)
+            if self.size > self.maxsize:
+                self._evict()
+        finally:
+            self.lock.release()
+
+    def clear(self):
+        self.lock.acquire()
+        try:
+            for name in os.listdir(self.directory):
+                shutil.rmtree(os.path.join(self.directory, name), True)
+            self.size = 0
+        finally:
+            self.lock.release()
+
+    def _scan(self):
+        entries = []
+        for dirpath, dirnames, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.startswith('.'):
+                    # temporary file of a response being written
+                    continue
+                path = os.path.join(dirpath, filename)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+        return entries
+
+    def _evict(self):
+        # files are evicted by last access time, which approximates
+        # LRU on filesystems mounted with atime updates
+        entries = self._scan()
+        entries.sort()
+        self.size = sum([size for mtime, size, path in entries])
+        for mtime, size, path in entries:
+            if self.size <= self.maxsize * 0.9:
+                break
+            self._unlink(path)
+            self.size -= size
+
+    def _unlink(self, path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+class TieredCache:
+
+    def __init__(self, memory, disk):
+        """ A memory cache in front of a disk cache. """
+        self.memory = memory
+        self.disk = disk
+
+    def get(self, key):
+        content = self.memory.get(key)
+        if content is None:
+            content = self.disk.get(key)
+            if content is not None:
+                self.memory.set(key, content)
+        return content
+
+    def set(self, key, content):
+        self.memory.set(key, content)
+        self.disk.set(key, content)
+
+    def clear(self):
+        self.memory.clear()
+        self.disk.clear()
+
+def cache_from_config(conf):
+    """ Create the response cache configured in the [cache] section
+        of the server configuration, or None if caching is disabled.
+    """
+    if not conf.has_option_with_value('cache', 'type'):
+        return None
+    cachetype = conf.get('cache', 'type').strip().lower()
+    try:
+        maxsize = int(conf.get('cache', 'maxsize')) if conf.has_option_with_value('cache', 'maxsize') else 64 * 1024 * 1024
+        ttl = int(conf.get('cache', 'ttl')) if conf.has_option_with_value('cache', 'ttl') else 0
+        memory_maxsize = int(conf.get('cache', 'memory_maxsize')) if conf.has_option_with_value('cache', 'memory_maxsize') else maxsize
+    except ValueError:
+        raise ServerConfigurationError('Cache sizes and ttl must be integers.')
+    if cachetype == 'memory':
+        return MemoryCache(memory_maxsize, ttl)
+    if not conf.has_option_with_value('cache', 'directory'):
+        raise ServerConfigurationError('The cache directory is not defined in the configuration file.')
+    disk = DiskCache(conf.get('cache', 'directory'), maxsize, ttl)
+    if cachetype == 'disk':
+        return disk
+    elif cachetype == 'tiered':
+        return TieredCache(MemoryCache(memory_maxsize, ttl), disk)
+    raise ServerConfigurationError('Unknown cache type "%s".' % cachetype)
@@ -36,6 +36,7 @@ from wms111 import ExceptionHandler as ExceptionHandler111
 from wms130 import ExceptionHandler as ExceptionHandler130
 from configparser import SafeConfigParser
 from common import Version
+from cache import cache_from_config
 
 class Handler(cgi.DebugHandler):
 
@@ -53,6 +54,7 @@ class Handler(cgi.DebugHandler):
             self.mapfactory = getattr(mapfactorymodule, 'WMSFactory')()
         else:
             raise ServerConfigurationError('The factory module does not have a WMSFactory class.')
+        self.mapfactory.cache = cache_from_config(conf)
         if conf.has_option('server', 'debug'):
             self.debug = int(conf.get('server', 'debug'))
         else:
@@ -22,13 +22,15 @@
 """Core OGCServer classes and functions."""
 
 from exceptions import OGCException, ServerConfigurationError
-from mapnik2 import Map, Color, Box2d, render, Image, Layer, Style, Projection as MapnikProjection, Coord
+from cache import cache_key
+from mapnik2 import Map, Color, Box2d, render, Image, Layer, Style, Projection as MapnikProjection, Coord, cached_projection
 from PIL.Image import new
 from PIL.ImageDraw import Draw
 from StringIO import StringIO
 from copy import deepcopy
 from traceback import format_exception, format_exception_only
 from sys import exc_info
+from threading import Lock
 import re
 import sys
 
@@ -264,12 +266,12 @@ class CRS:
 
     def inverse(self, x, y):
         if not self.proj:
-            self.proj = Projection('+init=%s:%s' % (self.namespace, self.code))
+            self.proj = cached_projection('+init=%s:%s' % (self.namespace, self.code))
         return self.proj.inverse(Coord(x, y))
 
     def forward(self, x, y):
         if not self.proj:
-            self.proj = Projection('+init=%s:%s' % (self.namespace, self.code))        
+            self.proj = cached_projection('+init=%s:%s' % (self.namespace, self.code))
         return self.proj.forward(Coord(x, y))
 
 class CRSFactory:
@@ -309,49 +311,115 @@ def copy_style(obj):
        sty.rules.append(rule)
     return sty
       
+class MapPool:
+
+    def __init__(self, maxidle=4):
+        """ A pool of pre-built maps keyed by their layers, styles and CRS.
+
+            A map is handed out to one request at a time; at most maxidle
+            idle maps are kept for each key. Maps acquired before the pool
+            was last cleared are dropped when they are released.
+        """
+        self.maxidle = maxidle
+        self.maps = {}
+        self.generation = 0
+        self.lock = Lock()
+
+    def acquire(self, key):
+        """ Return (generation, map) where map is an idle map for key,
+            or None if a new one has to be built.
+        """
+        self.lock.acquire()
+        try:
+            idle = self.maps.get(key)
+            if idle:
+                return self.generation, idle.pop()
+            return self.generation, None
+        finally:
+            self.lock.release()
+
+    def release(self, key, generation, m):
+        self.lock.acquire()
+        try:
+            if generation != self.generation:
+                # built from layers and styles that have since changed
+                return
+            idle = self.maps.setdefault(key, [])
+            if len(idle) < self.maxidle:
+                idle.append(m)
+        finally:
+            self.lock.release()
+
+    def clear(self):
+        self.lock.acquire()
+        try:
+            self.maps = {}
+            self.generation += 1
+        finally:
+            self.lock.release()
+
 class WMSBaseServiceHandler(BaseServiceHandler):
 
     def GetMap(self, params):
-        m = self._buildMap(params)
+        cache = getattr(self.mapfactory, 'cache', None)
+        if cache is not None:
+            # validate first, the normalized key would otherwise answer
+            # invalid requests with the response of a valid one
+            self._checkMapParams(params)
+            key = cache_key(params, self.__module__)
+            content = cache.get(key)
+            if content is not None:
+                return Response(params['format'], content)
+        pooled = self._buildMap(params)
         im = Image(params['width'], params['height'])
-        render(m, im)
-        return Response(params['format'], im.tostring(PIL_TYPE_MAPPING[params['format']]))
+        try:
+            render(pooled[2], im)
+        finally:
+            self._releaseMap(pooled)
+        content = im.tostring(PIL_TYPE_MAPPING[params['format']])
+        if cache is not None:
+            cache.set(key, content)
+        return Response(params['format'], content)
 
     def GetFeatureInfo(self, params, querymethodname='query_point'):
-        m = self._buildMap(params)
-        if params['info_format'] == 'text/plain':
-            writer = TextFeatureInfo()
-        elif params['info_format'] == 'text/xml':
-            writer = XMLFeatureInfo()
-        if params['query_layers'] and params['query_layers'][0] == '__all__':
-            for layerindex, layer in enumerate(m.layers):
-                featureset = getattr(m, querymethodname)(layerindex, params['i'], params['j'])
-                features = featureset.features
-                if features:
-                    writer.addlayer(layer.name)
-                    for feat in features:
-                        writer.addfeature()
-                        for prop in feat.properties:
-                            writer.addattribute(prop[0], prop[1])
-        else:
-            for layerindex, layername in enumerate(params['query_layers']):
-                if layername in params['layers']:
-                    if m.layers[layerindex].queryable:
-                        featureset = getattr(m, querymethodname)(layerindex, params['i'], params['j'])
-                        features = featureset.features
-                        if features:
-                            writer.addlayer(m.layers[layerindex].name)
-                            for feat in features:
-                                writer.addfeature()
-                                for prop in feat.properties:
-                                    writer.addattribute(prop[0], prop[1])
+        pooled = self._buildMap(params)
+        m = pooled[2]
+        try:
+            if params['info_format'] == 'text/plain':
+                writer = TextFeatureInfo()
+            elif params['info_format'] == 'text/xml':
+                writer = XMLFeatureInfo()
+            if params['query_layers'] and params['query_layers'][0] == '__all__':
+                for layerindex, layer in enumerate(m.layers):
+                    featureset = getattr(m, querymethodname)(layerindex, params['i'], params['j'])
+                    features = featureset.features
+                    if features:
+                        writer.addlayer(layer.name)
+                        for feat in features:
+                            writer.addfeature()
+                            for prop in feat.properties:
+                                writer.addattribute(prop[0], prop[1])
+            else:
+                for layerindex, layername in enumerate(params['query_layers']):
+                    if layername in params['layers']:
+                        if m.layers[layerindex].queryable:
+                            featureset = getattr(m, querymethodname)(layerindex, params['i'], params['j'])
+                            features = featureset.features
+                            if features:
+                                writer.addlayer(m.layers[layerindex].name)
+                                for feat in features:
+                                    writer.addfeature()
+                                    for prop in feat.properties:
+                                        writer.addattribute(prop[0], prop[1])
+                        else:
+                            raise OGCException('Requested query layer "%s" is not marked queryable.' % layername, 'LayerNotQueryable')
                     else:
-                        raise OGCException('Requested query layer "%s" is not marked queryable.' % layername, 'LayerNotQueryable')
-                else:
-                    raise OGCException('Requested query layer "%s" not in the LAYERS parameter.' % layername)
+                        raise OGCException('Requested query layer "%s" not in the LAYERS parameter.' % layername)
+        finally:
+            self._releaseMap(pooled)
         return Response(params['info_format'], str(writer))
 
-    def _buildMap(self, params):
+    def _checkMapParams(self, params):
         if str(params['crs']) not in self.allowedepsgcodes:
             raise OGCException('Unsupported CRS "%s" requested.' % str(params['crs']).upper(), 'InvalidCRS')
         if params['bbox'][0] >= params['bbox'][2]:
@@ -360,12 +428,41 @@ class WMSBaseServiceHandler(BaseServiceHandler):
             raise OGCException("BBOX values don't make sense.  miny is greater than maxy.")
         if params.has_key('styles') and len(params['styles']) != len(params['layers']):
             raise OGCException('STYLES length does not match LAYERS length.')
-        m = Map(params['width'], params['height'], '+init=%s' % params['crs'])
-        if params.has_key('transparent') and params['transparent'] == 'FALSE':
-            if params['bgcolor']:
-                m.background = params['bgcolor']
+
+    def _buildMap(self, params):
+        """ Return (key, generation, map) with a map set up for params,
+            to be handed back to _releaseMap when done with it.
+        """
+        self._checkMapParams(params)
+        key = (tuple(params['layers']), tuple(params.get('styles', ())), str(params['crs']))
+        pool = getattr(self.mapfactory, 'mappool', None)
+        generation, m = None, None
+        if pool is not None:
+            generation, m = pool.acquire(key)
+        if m is None:
+            m = self._buildMapTemplate(params)
+        m.resize(params['width'], params['height'])
+        if params.has_key('transparent') and params['transparent'] == 'FALSE' and params['bgcolor']:
+            m.background = params['bgcolor']
         else:
             m.background = Color(0, 0, 0, 0)
+        m.zoom_to_box(Box2d(params['bbox'][0], params['bbox'][1], params['bbox'][2], params['bbox'][3]))
+        return key, generation, m
+
+    def _releaseMap(self, pooled):
+        """ Return a map obtained from _buildMap to the pool for reuse. """
+        pool = getattr(self.mapfactory, 'mappool', None)
+        key, generation, m = pooled
+        if pool is not None and generation is not None:
+            pool.release(key, generation, m)
+
+    def _buildMapTemplate(self, params):
+        """ Build a map with the requested layers, styles and CRS.
+
+            Everything that only depends on those parameters is done
+            here, so the result can be reused for later requests.
+        """
+        m = Map(params['width'], params['height'], '+init=%s' % params['crs'])
         maplayers = self.mapfactory.layers
         orderedmaplayers = self.mapfactory.ordered_layers
         mapstyles = self.mapfactory.styles
@@ -409,7 +506,6 @@ class WMSBaseServiceHandler(BaseServiceHandler):
                     else:
                         raise ServerConfigurationError('Layer "%s" refers to non-existent style "%s".' % (layername, stylename))
                 m.layers.append(layer)
-        m.zoom_to_box(Box2d(params['bbox'][0], params['bbox'][1], params['bbox'][2], params['bbox'][3]))
         return m
 
 class BaseExceptionHandler:
@@ -482,10 +578,13 @@ class BaseExceptionHandler:
         fh.seek(0)
         return Response(params['format'], fh.read())
 
+def epsgstring(proj):
+    return proj.params().split('=')[1].upper()
+
 class Projection(MapnikProjection):
     
     def epsgstring(self):
-        return self.params().split('=')[1].upper()
+        return epsgstring(self)
 
 class TextFeatureInfo:
 
@@ -28,6 +28,7 @@ from wms111 import ExceptionHandler as ExceptionHandler111
 from wms130 import ExceptionHandler as ExceptionHandler130
 from configparser import SafeConfigParser
 from common import Version
+from cache import cache_from_config
 
 
 class ModHandler(object):
@@ -45,14 +46,17 @@ class ModHandler(object):
             self.mapfactory = getattr(mapfactorymodule, 'WMSFactory')()
         else:
             raise ServerConfigurationError('The factory module does not have a WMSFactory class.')
+        self.mapfactory.cache = cache_from_config(conf)
         if conf.has_option('server', 'debug'):
             self.debug = int(conf.get('server', 'debug'))
         else:
             self.debug = 0
-        if self.conf.has_option_with_value('server', 'maxage'):
-            self.max_age = 'max-age=%d' % self.conf.get('server', 'maxage')
-        else:
-            self.max_age = None
+        # maxage is documented in the [service] section, but used to be read from [server]
+        self.max_age = None
+        for section in ('server', 'service'):
+            if self.conf.has_option_with_value(section, 'maxage'):
+                self.max_age = 'max-age=%d' % int(self.conf.get(section, 'maxage'))
+                break
 
     def __call__(self, apacheReq):
         try:
@@ -102,7 +106,7 @@ class ModHandler(object):
             return self.traceback(apacheReq,E)
 
         if self.max_age:
-            apacheReq.headers_out.add('Cache-Control', max_age)
+            apacheReq.headers_out.add('Cache-Control', self.max_age)
         apacheReq.headers_out.add('Content-Length', str(len(response.content)))
         apacheReq.send_http_header()
         apacheReq.write(response.content)
@@ -23,7 +23,7 @@
 
 from common import ParameterDefinition, Response, Version, ListFactory, \
                    ColorFactory, CRSFactory, WMSBaseServiceHandler, CRS, \
-                   BaseExceptionHandler, Projection
+                   BaseExceptionHandler, cached_projection, epsgstring
 from exceptions import OGCException, ServerConfigurationError
 from mapnik2 import Coord
 
@@ -161,7 +161,7 @@ class ServiceHandler(WMSBaseServiceHandler):
                 rootlayerelem.append(rootlayercrs)
     
             for layer in self.mapfactory.ordered_layers:
-                layerproj = Projection(layer.srs)
+                layerproj = cached_projection(layer.srs)
                 layername = ElementTree.Element('Name')
                 layername.text = layer.name
                 env = layer.envelope()
@@ -173,7 +173,7 @@ class ServiceHandler(WMSBaseServiceHandler):
                 latlonbb.set('maxx', str(urp.x))
                 latlonbb.set('maxy', str(urp.y))
                 layerbbox = ElementTree.Element('BoundingBox')
-                layerbbox.set('SRS', layerproj.epsgstring())
+                layerbbox.set('SRS', epsgstring(layerproj))
                 layerbbox.set('minx', str(env.minx))
                 layerbbox.set('miny', str(env.miny))
                 layerbbox.set('maxx', str(env.maxx))
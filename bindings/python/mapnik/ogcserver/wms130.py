@@ -23,7 +23,7 @@
 
 from common import ParameterDefinition, Response, Version, ListFactory, \
                    ColorFactory, CRSFactory, CRS, WMSBaseServiceHandler, \
-                   BaseExceptionHandler, Projection, Box2d
+                   BaseExceptionHandler, cached_projection, epsgstring, Box2d
 from exceptions import OGCException, ServerConfigurationError
 from mapnik2 import Coord
 
@@ -167,7 +167,7 @@ class ServiceHandler(WMSBaseServiceHandler):
                 rootlayerelem.append(rootlayercrs)
     
             for layer in self.mapfactory.ordered_layers:
-                layerproj = Projection(layer.srs)
+                layerproj = cached_projection(layer.srs)
                 layername = ElementTree.Element('Name')
                 layername.text = layer.name
                 env = layer.envelope()
@@ -187,7 +187,7 @@ class ServiceHandler(WMSBaseServiceHandler):
                 exgbb_nbl.text = str(ur.y)
                 layerexgbb.append(exgbb_nbl)
                 layerbbox = ElementTree.Element('BoundingBox')
-                layerbbox.set('CRS', layerproj.epsgstring())
+                layerbbox.set('CRS', epsgstring(layerproj))
                 layerbbox.set('minx', str(env.minx))
                 layerbbox.set('miny', str(env.miny))
                 layerbbox.set('maxx', str(env.maxx))
@@ -235,11 +235,11 @@ class ServiceHandler(WMSBaseServiceHandler):
         
         """
         # Call superclass method
-        m = WMSBaseServiceHandler._buildMap(self, params)
+        pooled = WMSBaseServiceHandler._buildMap(self, params)
         # for range of epsg codes reverse axis
         if params['crs'].code >= 4000 and params['crs'].code < 5000:
-            m.zoom_to_box(Box2d(params['bbox'][1], params['bbox'][0], params['bbox'][3], params['bbox'][2]))
-        return m    
+            pooled[2].zoom_to_box(Box2d(params['bbox'][1], params['bbox'][0], params['bbox'][3], params['bbox'][2]))
+        return pooled
 
 class ExceptionHandler(BaseExceptionHandler):
 
@@ -27,6 +27,7 @@ from cgi import parse_qs
 from wms111 import ExceptionHandler as ExceptionHandler111
 from wms130 import ExceptionHandler as ExceptionHandler130
 from common import Version
+from cache import cache_from_config
 
 class WSGIApp:
 
@@ -44,14 +45,17 @@ class WSGIApp:
             self.mapfactory = getattr(mapfactorymodule, 'WMSFactory')()
         else:
             raise ServerConfigurationError('The factory module does not have a WMSFactory class.')
+        self.mapfactory.cache = cache_from_config(conf)
         if conf.has_option('server', 'debug'):
             self.debug = int(conf.get('server', 'debug'))
         else:
             self.debug = 0
-        if self.conf.has_option_with_value('server', 'maxage'):
-            self.max_age = 'max-age=%d' % self.conf.get('server', 'maxage')
-        else:
-            self.max_age = None
+        # maxage is documented in the [service] section, but used to be read from [server]
+        self.max_age = None
+        for section in ('server', 'service'):
+            if self.conf.has_option_with_value(section, 'maxage'):
+                self.max_age = 'max-age=%d' % int(self.conf.get(section, 'maxage'))
+                break
 
     def __call__(self, environ, start_response):
         reqparams = {}
@@ -100,7 +104,7 @@ class WSGIApp:
             response = eh.getresponse(reqparams)
         response_headers = [('Content-Type', response.content_type),('Content-Length', str(len(response.content)))]
         if self.max_age:
-            response_headers.append(('Cache-Control', max_age))
+            response_headers.append(('Cache-Control', self.max_age))
         start_response('200 OK', response_headers)
         yield response.content
             
\ No newline at end of file
@@ -23,8 +23,10 @@
 // boost
 #include <boost/python.hpp>
 #include <boost/python/detail/api_placeholder.hpp>
+#include <boost/python/stl_iterator.hpp>
 // stl
 #include <sstream>
+#include <limits>
 #include <vector>
 
 // mapnik
@@ -33,6 +35,10 @@
 #include <mapnik/datasource_cache.hpp>
 #include <mapnik/feature_layer_desc.hpp>
 #include <mapnik/memory_datasource.hpp>
+#include <mapnik/feature_factory.hpp>
+#include <mapnik/wkb.hpp>
+
+#include "python_buffer.hpp"
 
 
 using mapnik::datasource;
@@ -96,6 +102,227 @@ std::string describe(boost::shared_ptr<mapnik::datasource> const& ds)
     return ss.str();
 }
     
+void add_features(memory_datasource & ds, boost::python::object const& features)
+{
+    boost::python::stl_input_iterator<mapnik::feature_ptr> begin(features), end;
+    std::vector<mapnik::feature_ptr> feats(begin, end);
+    ds.insert(feats.begin(), feats.end());
+}
+
+template <typename T, typename ValueType>
+void append_values(Py_buffer const& view, std::vector<mapnik::value> & values)
+{
+    T const* data = static_cast<T const*>(view.buf);
+    std::size_t count = view.len / sizeof(T);
+    for (std::size_t i = 0; i < count; ++i)
+    {
+        values.push_back(mapnik::value(static_cast<ValueType>(data[i])));
+    }
+}
+
+// 64 bit integers only fit in a mapnik::value int when in range,
+// returns false on the first one that does not
+bool append_int64_values(Py_buffer const& view, std::vector<mapnik::value> & values)
+{
+    long long const* data = static_cast<long long const*>(view.buf);
+    std::size_t count = view.len / sizeof(long long);
+    for (std::size_t i = 0; i < count; ++i)
+    {
+        if (data[i] < std::numeric_limits<int>::min() ||
+            data[i] > std::numeric_limits<int>::max())
+        {
+            return false;
+        }
+        values.push_back(mapnik::value(static_cast<int>(data[i])));
+    }
+    return true;
+}
+
+// read contiguous numeric buffers with a known native format
+// (e.g. numpy arrays) directly, returns false for anything else
+bool buffer_values(object const& column, std::vector<mapnik::value> & values)
+{
+    if (!PyObject_CheckBuffer(column.ptr())) return false;
+    Py_buffer view;
+    if (PyObject_GetBuffer(column.ptr(), &view, PyBUF_FORMAT) != 0)
+    {
+        PyErr_Clear();
+        return false;
+    }
+    std::string format(view.format ? view.format : "B");
+    if (!format.empty() && (format[0] == '@' || format[0] == '=')) format.erase(0, 1);
+    bool handled = true;
+    if (format == "d" && view.itemsize == sizeof(double))
+        append_values<double,double>(view, values);
+    else if (format == "f" && view.itemsize == sizeof(float))
+        append_values<float,double>(view, values);
+    else if (format == "?" && view.itemsize == sizeof(bool))
+        append_values<bool,bool>(view, values);
+    else if (format.size() == 1 && std::string("bhilq").find(format[0]) != std::string::npos)
+    {
+        // mapnik::value integers are ints, wider values must fit
+        switch (view.itemsize)
+        {
+        case 1: append_values<signed char,int>(view, values); break;
+        case 2: append_values<short,int>(view, values); break;
+        case 4: append_values<int,int>(view, values); break;
+        case 8:
+            if (!append_int64_values(view, values))
+            {
+                PyBuffer_Release(&view);
+                PyErr_SetString(PyExc_OverflowError,
+                                "integer attribute value does not fit in a 32 bit int");
+                throw_error_already_set();
+            }
+            break;
+        default: handled = false;
+        }
+    }
+    else
+        handled = false;
+    PyBuffer_Release(&view);
+    return handled;
+}
+
+// attribute columns of a bulk load, None values are left out
+void attribute_columns(dict const& attributes, std::size_t count,
+                       std::vector<std::string> & names,
+                       std::vector<std::vector<mapnik::value> > & columns)
+{
+    list keys = attributes.keys();
+    for (int i = 0; i < len(keys); ++i)
+    {
+        names.push_back(extract<std::string>(keys[i]));
+        columns.push_back(std::vector<mapnik::value>());
+        std::vector<mapnik::value> & values = columns.back();
+        values.reserve(count);
+        object column = attributes[keys[i]];
+        if (!buffer_values(column, values))
+        {
+            stl_input_iterator<object> itr(column), end;
+            for (; itr != end; ++itr)
+            {
+                object item = *itr;
+                if (item.ptr() == Py_None)
+                    values.push_back(mapnik::value());
+                else
+                    values.push_back(extract<mapnik::value>(item)());
+            }
+        }
+        if (values.size() != count)
+        {
+            PyErr_Format(PyExc_ValueError, "attribute '%s' has %d values, expected %d",
+                         names.back().c_str(), int(values.size()), int(count));
+            throw_error_already_set();
+        }
+    }
+}
+
+void set_attributes(mapnik::Feature & feature, std::size_t index,
+                    std::vector<std::string> const& names,
+                    std::vector<std::vector<mapnik::value> > const& columns)
+{
+    for (std::size_t j = 0; j < names.size(); ++j)
+    {
+        mapnik::value const& val = columns[j][index];
+        if (!boost::get<mapnik::value_null>(&val.base()))
+        {
+            feature[names[j]] = val;
+        }
+    }
+}
+
+void add_features_from_arrays(memory_datasource & ds, object const& xs, object const& ys,
+                              dict const& attributes)
+{
+    python_double_buffer x(xs, false);
+    python_double_buffer y(ys, false);
+    if (x.size() != y.size())
+    {
+        PyErr_SetString(PyExc_ValueError, "x and y must have the same length");
+        throw_error_already_set();
+    }
+    std::size_t count = x.size();
+    std::vector<std::string> names;
+    std::vector<std::vector<mapnik::value> > columns;
+    attribute_columns(attributes, count, names, columns);
+
+    // building the features does not touch python objects
+    Py_BEGIN_ALLOW_THREADS
+    try
+    {
+        std::vector<mapnik::feature_ptr> features;
+        features.reserve(count);
+        int id = ds.size();
+        for (std::size_t i = 0; i < count; ++i)
+        {
+            mapnik::feature_ptr feature(mapnik::feature_factory::create(id++));
+            mapnik::geometry_type * pt = new mapnik::geometry_type(mapnik::Point);
+            pt->move_to(x.data()[i], y.data()[i]);
+            feature->add_geometry(pt);
+            set_attributes(*feature, i, names, columns);
+            features.push_back(feature);
+        }
+        ds.insert(features.begin(), features.end());
+    }
+    catch (...)
+    {
+        Py_BLOCK_THREADS
+        throw;
+    }
+    Py_END_ALLOW_THREADS
+}
+
+void add_wkb_many(memory_datasource & ds, object const& wkbs, dict const& attributes,
+                  bool multiple_geometries)
+{
+    // keep references to the wkb strings while the GIL is released
+    list items(wkbs);
+    std::size_t count = len(items);
+    std::vector<std::pair<char const*, Py_ssize_t> > geometries;
+    geometries.reserve(count);
+    for (std::size_t i = 0; i < count; ++i)
+    {
+        char * data = 0;
+        Py_ssize_t size = 0;
+#if PY_VERSION_HEX >= 0x03000000
+        if (PyBytes_AsStringAndSize(object(items[i]).ptr(), &data, &size) != 0)
+#else
+        if (PyString_AsStringAndSize(object(items[i]).ptr(), &data, &size) != 0)
+#endif
+        {
+            throw_error_already_set();
+        }
+        geometries.push_back(std::make_pair(data, size));
+    }
+    std::vector<std::string> names;
+    std::vector<std::vector<mapnik::value> > columns;
+    attribute_columns(attributes, count, names, columns);
+
+    Py_BEGIN_ALLOW_THREADS
+    try
+    {
+        std::vector<mapnik::feature_ptr> features;
+        features.reserve(count);
+        int id = ds.size();
+        for (std::size_t i = 0; i < count; ++i)
+        {
+            mapnik::feature_ptr feature(mapnik::feature_factory::create(id++));
+            mapnik::geometry_utils::from_wkb(*feature, geometries[i].first, geometries[i].second,
+                                             multiple_geometries);
+            set_attributes(*feature, i, names, columns);
+            features.push_back(feature);
+        }
+        ds.insert(features.begin(), features.end());
+    }
+    catch (...)
+    {
+        Py_BLOCK_THREADS
+        throw;
+    }
+    Py_END_ALLOW_THREADS
+}
+
 std::string encoding(boost::shared_ptr<mapnik::datasource> const& ds)
 {
     layer_descriptor ld = ds->get_descriptor();
@@ -165,17 +392,46 @@ void export_datasource()
     def("Describe",&describe);
     def("CreateDatasource",&create_datasource);
 
-    class_<point_datasource, bases<datasource>, boost::noncopyable>("PointDatasource", init<>())
-        .def("add_point",&point_datasource::add_point)
-        ;
-
-
     class_<memory_datasource, bases<datasource>, boost::noncopyable>("MemoryDatasource", init<>())
+        .def(init<bool>((arg("index")),
+                        "Create a MemoryDatasource, optionally without a spatial index.\n"
+                        "By default features are indexed once there are enough of them,\n"
+                        "the index is built on the first query after features were added.\n"))
         .def("add_feature",&memory_datasource::push,
              "Adds a Feature:\n"
              ">>> ms = MemoryDatasource()\n"
              ">>> feature = Feature(1)\n"
              ">>> ms.add_feature(Feature(1))\n")
+        .def("add_features",&add_features,
+             (arg("features")),
+             "Adds all Features of an iterable at once:\n"
+             ">>> ms = MemoryDatasource()\n"
+             ">>> ms.add_features([Feature(1), Feature(2)])\n")
+        .def("add_features_from_arrays",&add_features_from_arrays,
+             (arg("x"),arg("y"),arg("attributes")=dict()),
+             "Adds a point Feature for every pair of coordinates in two buffers\n"
+             "of doubles (e.g. array.array('d') or float64 numpy arrays).\n"
+             "attributes maps names to sequences or numeric numpy arrays holding\n"
+             "one value per point, None values are left out.\n"
+             "\n"
+             "Usage:\n"
+             ">>> ms = MemoryDatasource()\n"
+             ">>> ms.add_features_from_arrays(array.array('d', [0, 10]), array.array('d', [0, 10]),\n"
+             "...                             {'name': ['a', 'b'], 'speed': [3.5, 4.0]})\n")
+        .def("add_wkb_many",&add_wkb_many,
+             (arg("wkbs"),arg("attributes")=dict(),arg("multiple_geometries")=false),
+             "Adds a Feature for every well-known binary geometry in a sequence\n"
+             "of strings, with attributes like add_features_from_arrays.\n"
+             "Multi geometries are split into separate geometries if\n"
+             "multiple_geometries is True.\n"
+             "\n"
+             "Usage:\n"
+             ">>> ms = MemoryDatasource()\n"
+             ">>> ms.add_wkb_many([row[0] for row in rows], {'name': [row[1] for row in rows]})\n")
         .def("num_features",&memory_datasource::size)
         ;
+
+    class_<point_datasource, bases<memory_datasource>, boost::noncopyable>("PointDatasource", init<>())
+        .def("add_point",&point_datasource::add_point)
+        ;
 }
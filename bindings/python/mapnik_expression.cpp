@@ -27,9 +27,11 @@
 #include <mapnik/filter_factory.hpp>
 #include <mapnik/expression_string.hpp>
 #include <mapnik/expression_evaluator.hpp>
+#include <mapnik/compiled_expression.hpp>
 #include <mapnik/parse_path.hpp>
 
 #include <boost/variant.hpp>
+#include <boost/make_shared.hpp>
 
 using mapnik::Feature;
 using mapnik::expression_ptr;
@@ -49,6 +51,44 @@ std::string expression_evaluate_(mapnik::expr_node const& expr, mapnik::Feature
     return result.to_string();
 }
 
+// compiled expression
+struct compiled_expression_
+{
+    explicit compiled_expression_(mapnik::expr_node const& expr)
+    {
+        exprs.add(boost::make_shared<mapnik::expr_node>(expr));
+    }
+    mapnik::compiled_expressions exprs;
+};
+
+boost::shared_ptr<compiled_expression_> expression_compile_(mapnik::expr_node const& expr)
+{
+    return boost::make_shared<compiled_expression_>(expr);
+}
+
+std::string compiled_evaluate_(compiled_expression_ const& compiled, mapnik::Feature const& f)
+{
+    mapnik::compiled_expressions::context ctx;
+    compiled.exprs.reset(ctx,f);
+    return compiled.exprs.evaluate(0,ctx).to_string();
+}
+
+boost::python::list compiled_attributes_(compiled_expression_ const& compiled)
+{
+    boost::python::list names;
+    std::vector<std::string> const& attributes = compiled.exprs.attribute_names();
+    for (std::vector<std::string>::const_iterator itr = attributes.begin(); itr != attributes.end(); ++itr)
+    {
+        names.append(*itr);
+    }
+    return names;
+}
+
+std::string compiled_to_string_(compiled_expression_ const& compiled)
+{
+    return compiled.exprs.to_string(0);
+}
+
 // path expression
 path_expression_ptr parse_path_(std::string const& path)
 {
@@ -72,8 +112,28 @@ void export_expression()
                                                   "TODO"
                                                   "",no_init)
         .def("evaluate", &expression_evaluate_)
+        .def("compile", &expression_compile_,
+             "Compile the expression to a flat program, which\n"
+             "evaluates to the same result without walking the\n"
+             "expression tree.\n"
+             "\n"
+             "Usage:\n"
+             ">>> from mapnik import Expression\n"
+             ">>> compiled = Expression(\"[name] = 'foo'\").compile()\n"
+             ">>> compiled.attributes\n"
+             "['name']\n")
         .def("__str__",&to_expression_string);
     ;
+
+    class_<compiled_expression_, boost::shared_ptr<compiled_expression_>,
+        boost::noncopyable>("CompiledExpression",
+                            "An expression compiled with Expression.compile()",
+                            no_init)
+        .def("evaluate", &compiled_evaluate_)
+        .add_property("attributes", &compiled_attributes_,
+                      "Names of the attributes used by the expression")
+        .def("__str__",&compiled_to_string_);
+    ;
     
     def("Expression",&parse_expression_,(arg("expr")),"Expression string");
 
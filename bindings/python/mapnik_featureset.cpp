@@ -26,6 +26,9 @@
 // mapnik
 #include <mapnik/feature.hpp>
 #include <mapnik/datasource.hpp>
+// stl
+#include <vector>
+#include <limits>
 
 namespace {
 using namespace boost::python;
@@ -44,6 +47,204 @@ list features(mapnik::featureset_ptr const& itr)
     }
     return l;
 }
+
+mapnik::feature_ptr next(mapnik::featureset_ptr const& itr)
+{
+    mapnik::feature_ptr fp = itr->next();
+    if (!fp)
+    {
+        PyErr_SetNone(PyExc_StopIteration);
+        boost::python::throw_error_already_set();
+    }
+    return fp;
+}
+
+list next_batch(mapnik::featureset_ptr const& itr, unsigned batch_size)
+{
+    std::vector<mapnik::feature_ptr> batch;
+    batch.reserve(batch_size);
+    // reading features does not touch python objects (and may block
+    // on i/o), so let other threads run meanwhile
+    Py_BEGIN_ALLOW_THREADS
+        try
+        {
+            while (batch.size() < batch_size)
+            {
+                mapnik::feature_ptr fp = itr->next();
+                if (!fp)
+                {
+                    break;
+                }
+                batch.push_back(fp);
+            }
+        }
+        catch (...)
+        {
+            Py_BLOCK_THREADS
+                throw;
+        }
+    Py_END_ALLOW_THREADS
+
+    list l;
+    for (std::vector<mapnik::feature_ptr>::const_iterator fp = batch.begin(); fp != batch.end(); ++fp)
+    {
+        l.append(*fp);
+    }
+    return l;
+}
+
+template <typename T>
+object array_bytes(std::vector<T> const& v)
+{
+    char const* data = v.empty() ? 0 : reinterpret_cast<char const*>(&v[0]);
+#if PY_VERSION_HEX >= 0x03000000
+    return object(handle<>(PyBytes_FromStringAndSize(data, v.size() * sizeof(T))));
+#else
+    return object(handle<>(PyString_FromStringAndSize(data, v.size() * sizeof(T))));
+#endif
+}
+
+bool is_null(mapnik::value const& v)
+{
+    return boost::get<mapnik::value_null>(&v.base()) != 0;
+}
+
+struct column_kind : public boost::static_visitor<>
+{
+    column_kind()
+        : has_null(false), has_double(false), has_string(false) {}
+
+    void operator() (mapnik::value_null const&) { has_null = true; }
+    void operator() (bool) {}
+    void operator() (int) {}
+    void operator() (double) { has_double = true; }
+    void operator() (UnicodeString const&) { has_string = true; }
+
+    bool has_null;
+    bool has_double;
+    bool has_string;
+};
+
+dict to_arrays(mapnik::featureset_ptr const& itr, list const& field_list)
+{
+    std::vector<std::string> fields;
+    for (ssize_t i = 0; i < len(field_list); ++i)
+    {
+        fields.push_back(extract<std::string>(field_list[i]));
+    }
+
+    std::vector<double> xs;
+    std::vector<double> ys;
+    std::vector<unsigned char> commands;
+    std::vector<unsigned char> geometry_types;
+    std::vector<unsigned> geometry_offsets(1, 0);
+    std::vector<unsigned> feature_offsets(1, 0);
+    std::vector<int> ids;
+    std::vector<std::vector<mapnik::value> > values(fields.size());
+
+    // reading and flattening features does not touch python objects
+    Py_BEGIN_ALLOW_THREADS
+        try
+        {
+            while (true)
+            {
+                mapnik::feature_ptr fp = itr->next();
+                if (!fp)
+                {
+                    break;
+                }
+                ids.push_back(fp->id());
+                for (unsigned i = 0; i < fp->num_geometries(); ++i)
+                {
+                    mapnik::geometry_type const& geom = fp->get_geometry(i);
+                    unsigned num_points = geom.num_points();
+                    xs.reserve(xs.size() + num_points);
+                    ys.reserve(ys.size() + num_points);
+                    commands.reserve(commands.size() + num_points);
+                    geom.rewind(0);
+                    for (unsigned j = 0; j < num_points; ++j)
+                    {
+                        double x, y;
+                        unsigned cmd = geom.vertex(&x, &y);
+                        xs.push_back(x);
+                        ys.push_back(y);
+                        commands.push_back(static_cast<unsigned char>(cmd));
+                    }
+                    geometry_types.push_back(static_cast<unsigned char>(geom.type()));
+                    geometry_offsets.push_back(xs.size());
+                }
+                feature_offsets.push_back(geometry_types.size());
+
+                std::map<std::string,mapnik::value> const& props = fp->props();
+                for (unsigned i = 0; i < fields.size(); ++i)
+                {
+                    std::map<std::string,mapnik::value>::const_iterator pos = props.find(fields[i]);
+                    values[i].push_back(pos != props.end() ? pos->second : mapnik::value());
+                }
+            }
+        }
+        catch (...)
+        {
+            Py_BLOCK_THREADS
+                throw;
+        }
+    Py_END_ALLOW_THREADS
+
+    dict columns;
+    for (unsigned i = 0; i < fields.size(); ++i)
+    {
+        std::vector<mapnik::value> const& column = values[i];
+        column_kind kind;
+        for (std::vector<mapnik::value>::const_iterator v = column.begin(); v != column.end(); ++v)
+        {
+            boost::apply_visitor(kind, v->base());
+        }
+        if (kind.has_string)
+        {
+            // strings have no fixed size representation, keep them as objects
+            list l;
+            for (std::vector<mapnik::value>::const_iterator v = column.begin(); v != column.end(); ++v)
+            {
+                if (is_null(*v))
+                    l.append(object());
+                else
+                    l.append(*v);
+            }
+            columns[fields[i]] = l;
+        }
+        else if (kind.has_double || kind.has_null)
+        {
+            std::vector<double> data;
+            data.reserve(column.size());
+            for (std::vector<mapnik::value>::const_iterator v = column.begin(); v != column.end(); ++v)
+            {
+                data.push_back(is_null(*v) ? std::numeric_limits<double>::quiet_NaN() : v->to_double());
+            }
+            columns[fields[i]] = make_tuple("d", array_bytes(data));
+        }
+        else
+        {
+            std::vector<int> data;
+            data.reserve(column.size());
+            for (std::vector<mapnik::value>::const_iterator v = column.begin(); v != column.end(); ++v)
+            {
+                data.push_back(static_cast<int>(v->to_int()));
+            }
+            columns[fields[i]] = make_tuple("i", array_bytes(data));
+        }
+    }
+
+    dict arrays;
+    arrays["x"] = array_bytes(xs);
+    arrays["y"] = array_bytes(ys);
+    arrays["command"] = array_bytes(commands);
+    arrays["geometry_type"] = array_bytes(geometry_types);
+    arrays["geometry_offset"] = array_bytes(geometry_offsets);
+    arrays["feature_offset"] = array_bytes(feature_offsets);
+    arrays["id"] = array_bytes(ids);
+    arrays["fields"] = columns;
+    return arrays;
+}
 }
 
 void export_featureset()
@@ -65,5 +266,21 @@ void export_featureset()
             ">>>     print f\n"
             "<mapnik2.Feature object at 0x105e64140>\n"
             )
+        .def("__iter__",objects::identity_function())
+        .def("__next__",next)
+        .def("next",next,
+            "Return the next feature or raise StopIteration.\n"
+            "\n"
+            "Featuresets are iterators, features are read one at a time:\n"
+            ">>> fs = m.query_map_point(0, 10, 10)\n"
+            ">>> for f in fs:\n"
+            ">>>     print f\n"
+            "<mapnik2.Feature object at 0x105e64140>\n"
+            )
+        .def("next_batch",next_batch,
+            "Return a list of up to batch_size next features,\n"
+            "an empty list once the featureset is exhausted.\n"
+            )
+        .def("_to_arrays",to_arrays)
         ;
 }
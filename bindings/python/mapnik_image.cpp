@@ -35,8 +35,10 @@ extern "C"
 #include <mapnik/graphics.hpp>
 #include <mapnik/image_util.hpp>
 #include <mapnik/png_io.hpp>
+#include <mapnik/palette.hpp>
 #include <mapnik/image_reader.hpp>
 #include <sstream>
+#include <cstring>
 
 // agg
 #include "agg_rendering_buffer.h"
@@ -79,7 +81,20 @@ PyObject* tostring1( image_32 const& im)
 // encode (png,jpeg)
 PyObject* tostring2(image_32 const & im, std::string const& format)
 {
-    std::string s = save_to_string(im, format);
+    std::string s;
+    // encoding does not touch python objects, so let other
+    // threads run while it is in progress
+    Py_BEGIN_ALLOW_THREADS
+        try
+        {
+            s = save_to_string(im, format);
+        }
+        catch (...)
+        {
+            Py_BLOCK_THREADS
+                throw;
+        }
+    Py_END_ALLOW_THREADS
     return
 #if PY_VERSION_HEX >= 0x03000000 
         ::PyBytes_FromStringAndSize
@@ -89,6 +104,136 @@ PyObject* tostring2(image_32 const & im, std::string const& format)
     (s.data(),s.size());
 }
 
+// expose the pixels through the buffer protocol, so they can be
+// shared with numpy, PIL or socket writes without copying
+image_32 * image_from_python(PyObject * obj)
+{
+    extract<image_32&> ex(obj);
+    if (!ex.check())
+    {
+        PyErr_SetString(PyExc_TypeError, "expected a mapnik Image");
+        return 0;
+    }
+    return &ex();
+}
+
+#if PY_VERSION_HEX < 0x03000000
+Py_ssize_t image_getreadbuffer(PyObject * obj, Py_ssize_t segment, void ** ptr)
+{
+    if (segment != 0)
+    {
+        PyErr_SetString(PyExc_SystemError, "accessing non-existent image segment");
+        return -1;
+    }
+    image_32 * im = image_from_python(obj);
+    if (!im) return -1;
+    *ptr = im->raw_data();
+    return im->width() * im->height() * 4;
+}
+
+Py_ssize_t image_getsegcount(PyObject * obj, Py_ssize_t * lenp)
+{
+    if (lenp)
+    {
+        image_32 * im = image_from_python(obj);
+        if (!im) return -1;
+        *lenp = im->width() * im->height() * 4;
+    }
+    return 1;
+}
+
+Py_ssize_t image_getcharbuffer(PyObject * obj, Py_ssize_t segment, char ** ptr)
+{
+    return image_getreadbuffer(obj, segment, reinterpret_cast<void**>(ptr));
+}
+#endif
+
+int image_getbuffer(PyObject * obj, Py_buffer * view, int flags)
+{
+    image_32 * im = image_from_python(obj);
+    if (!im) return -1;
+    return PyBuffer_FillInfo(view, obj, im->raw_data(), im->width() * im->height() * 4, 0, flags);
+}
+
+PyBufferProcs image_buffer_procs;
+
+void export_image_buffer(object const& cls)
+{
+#if PY_VERSION_HEX < 0x03000000
+    image_buffer_procs.bf_getreadbuffer = image_getreadbuffer;
+    image_buffer_procs.bf_getwritebuffer = image_getreadbuffer;
+    image_buffer_procs.bf_getsegcount = image_getsegcount;
+    image_buffer_procs.bf_getcharbuffer = image_getcharbuffer;
+#endif
+    image_buffer_procs.bf_getbuffer = image_getbuffer;
+    image_buffer_procs.bf_releasebuffer = 0;
+    PyTypeObject * type = reinterpret_cast<PyTypeObject*>(cls.ptr());
+    type->tp_as_buffer = &image_buffer_procs;
+#if PY_VERSION_HEX < 0x03000000
+    type->tp_flags |= Py_TPFLAGS_HAVE_NEWBUFFER;
+#endif
+}
+
+// copy raw RGBA pixels from any object supporting the buffer protocol
+boost::shared_ptr<image_32> frombuffer(unsigned width, unsigned height, object const& obj)
+{
+    char const* data = 0;
+    Py_ssize_t size = 0;
+#if PY_VERSION_HEX >= 0x03000000
+    Py_buffer view;
+    if (PyObject_GetBuffer(obj.ptr(), &view, PyBUF_SIMPLE) != 0)
+    {
+        throw_error_already_set();
+    }
+    data = static_cast<char const*>(view.buf);
+    size = view.len;
+#else
+    if (PyObject_AsReadBuffer(obj.ptr(), reinterpret_cast<void const**>(&data), &size) != 0)
+    {
+        throw_error_already_set();
+    }
+#endif
+    if (size != static_cast<Py_ssize_t>(width) * height * 4)
+    {
+#if PY_VERSION_HEX >= 0x03000000
+        PyBuffer_Release(&view);
+#endif
+        PyErr_SetString(PyExc_ValueError, "buffer size does not match width * height * 4");
+        throw_error_already_set();
+    }
+    boost::shared_ptr<image_32> image_ptr(new image_32(width, height));
+    std::memcpy(image_ptr->raw_data(), data, size);
+#if PY_VERSION_HEX >= 0x03000000
+    PyBuffer_Release(&view);
+#endif
+    return image_ptr;
+}
+
+// encode paletted png with a fixed palette
+PyObject* tostring3(image_32 const & im, std::string const& format, mapnik::rgba_palette const& pal)
+{
+    std::string s;
+    Py_BEGIN_ALLOW_THREADS
+        try
+        {
+            s = save_to_string(im, format, pal);
+        }
+        catch (...)
+        {
+            Py_BLOCK_THREADS
+                throw;
+        }
+    Py_END_ALLOW_THREADS
+    return
+#if PY_VERSION_HEX >= 0x03000000 
+        ::PyBytes_FromStringAndSize
+#else
+        ::PyString_FromStringAndSize
+#endif
+    (s.data(),s.size());
+}
+
+void (*save_to_file3)( mapnik::image_32 const&, std::string const&,std::string const&, mapnik::rgba_palette const&) = mapnik::save_to_file;
 void (*save_to_file1)( mapnik::image_32 const&, std::string const&,std::string const&) = mapnik::save_to_file;
 void (*save_to_file2)( mapnik::image_32 const&, std::string const&) = mapnik::save_to_file;
 
@@ -190,10 +335,19 @@ void export_image()
         .value("multiply",multiply)
         ;
     
-    class_<image_32,boost::shared_ptr<image_32> >("Image","This class represents a 32 bit RGBA image.",init<int,int>())
+    class_<image_32,boost::shared_ptr<image_32> > image("Image",
+        "This class represents a 32 bit RGBA image.\n"
+        "\n"
+        "Images support the buffer protocol, exposing their RGBA pixels\n"
+        "without copying:\n"
+        ">>> im = Image(256, 256)\n"
+        ">>> pixels = numpy.frombuffer(im, dtype=numpy.uint8).reshape(256, 256, 4)\n",
+        init<int,int>());
+    image
         .def("width",&image_32::width)
         .def("height",&image_32::height)
-        .def("view",&image_32::get_view)
+        // views reference the image pixels, keep the image alive
+        .def("view",&image_32::get_view,with_custodian_and_ward_postcall<0,1>())
         .add_property("background",make_function
                       (&image_32::get_background,return_value_policy<copy_const_reference>()),
                       &image_32::set_background, "The background color of the image.")
@@ -204,15 +358,31 @@ void export_image()
         .def("composite",&composite)
         //TODO(haoyu) The method name 'tostring' might be confusing since they actually return bytes in Python 3
         .def("tostring",&tostring1)
-        .def("tostring",&tostring2)
+        .def("tostring",&tostring2,
+             "Encode the image in the given format, which accepts the\n"
+             "same options as save_to_file, e.g. 'png:z=1:s=rle:f=none'\n"
+             "for fast PNG encoding.\n")
+        .def("tostring",&tostring3,
+             "Encode the image as paletted png using a fixed Palette.\n")
         .def("save", save_to_file1)
+        .def("save", save_to_file3)
         .def("save", save_to_file2)
         .def("open",open_from_file)
         .staticmethod("open")
+        .def("frombuffer",frombuffer,
+             (arg("width"),arg("height"),arg("buffer")),
+             "Create an Image from raw RGBA pixels in an object\n"
+             "supporting the buffer protocol (str, bytearray, numpy array...).\n"
+             "\n"
+             "Usage:\n"
+             ">>> im = Image.frombuffer(256, 256, other.tostring())\n")
+        .staticmethod("frombuffer")
 #if defined(HAVE_CAIRO) && defined(HAVE_PYCAIRO)
         .def("from_cairo",&from_cairo)
         .staticmethod("from_cairo")
 #endif
         ;    
+
+    export_image_buffer(image);
     
 }
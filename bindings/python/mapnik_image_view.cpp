@@ -30,7 +30,9 @@ extern "C"
 #include <mapnik/image_util.hpp>
 #include <mapnik/image_view.hpp>
 #include <mapnik/png_io.hpp>
+#include <mapnik/palette.hpp>
 #include <sstream>
+#include <cstring>
 
 // jpeg
 #if defined(HAVE_JPEG)
@@ -44,25 +46,139 @@ using mapnik::save_to_file;
 // output 'raw' pixels
 PyObject* view_tostring1(image_view<image_data_32> const& view)
 {
-    std::ostringstream ss(std::ios::out|std::ios::binary);
+    std::size_t row_size = view.width() * sizeof(image_view<image_data_32>::pixel_type);
+    PyObject * obj =
+#if PY_VERSION_HEX >= 0x03000000
+        ::PyBytes_FromStringAndSize
+#else
+        ::PyString_FromStringAndSize
+#endif
+        (0, row_size * view.height());
+    if (!obj)
+    {
+        boost::python::throw_error_already_set();
+    }
+    char * data =
+#if PY_VERSION_HEX >= 0x03000000
+        PyBytes_AS_STRING(obj);
+#else
+        PyString_AS_STRING(obj);
+#endif
     for (unsigned i=0;i<view.height();i++)
     {
-        ss.write(reinterpret_cast<const char*>(view.getRow(i)), 
-                 view.width() * sizeof(image_view<image_data_32>::pixel_type));
+        std::memcpy(data + i * row_size, view.getRow(i), row_size);
     }
+    return obj;
+}
+
+// encode (png,jpeg)
+PyObject* view_tostring2(image_view<image_data_32> const & view, std::string const& format)
+{
+    std::string s;
+    Py_BEGIN_ALLOW_THREADS
+        try
+        {
+            s = save_to_string(view, format);
+        }
+        catch (...)
+        {
+            Py_BLOCK_THREADS
+                throw;
+        }
+    Py_END_ALLOW_THREADS
     return 
 #if PY_VERSION_HEX >= 0x03000000
         ::PyBytes_FromStringAndSize
 #else
         ::PyString_FromStringAndSize
 #endif
-        ((const char*)ss.str().c_str(),ss.str().size());
+        (s.data(),s.size());
 }
 
-// encode (png,jpeg)
-PyObject* view_tostring2(image_view<image_data_32> const & view, std::string const& format)
+// expose the pixels through the (new style) buffer protocol as a
+// read-only height x width x 4 array of bytes; rows are strided by the
+// width of the underlying image, so no copy is made
+struct view_buffer_info
+{
+    Py_ssize_t shape[3];
+    Py_ssize_t strides[3];
+};
+
+int view_getbuffer(PyObject * obj, Py_buffer * buffer, int flags)
 {
-    std::string s = save_to_string(view, format);
+    boost::python::extract<image_view<image_data_32>&> ex(obj);
+    if (!ex.check())
+    {
+        PyErr_SetString(PyExc_TypeError, "expected a mapnik ImageView");
+        return -1;
+    }
+    if ((flags & PyBUF_WRITABLE) == PyBUF_WRITABLE)
+    {
+        PyErr_SetString(PyExc_BufferError, "ImageView buffers are read-only");
+        return -1;
+    }
+    image_view<image_data_32> const& view = ex();
+    bool contiguous = view.width() == view.data().width() || view.height() <= 1;
+    if (!contiguous && (flags & PyBUF_STRIDES) != PyBUF_STRIDES)
+    {
+        PyErr_SetString(PyExc_BufferError, "ImageView is not contiguous, request a strided buffer");
+        return -1;
+    }
+    view_buffer_info * info = new view_buffer_info;
+    info->shape[0] = view.height();
+    info->shape[1] = view.width();
+    info->shape[2] = 4;
+    info->strides[0] = view.data().width() * 4;
+    info->strides[1] = 4;
+    info->strides[2] = 1;
+
+    buffer->buf = const_cast<void*>(static_cast<void const*>(view.height() ? view.getRow(0) : 0));
+    buffer->obj = obj;
+    Py_INCREF(obj);
+    buffer->len = view.width() * view.height() * 4;
+    buffer->readonly = 1;
+    buffer->itemsize = 1;
+    buffer->format = (flags & PyBUF_FORMAT) == PyBUF_FORMAT ? const_cast<char*>("B") : 0;
+    buffer->ndim = 3;
+    buffer->shape = (flags & PyBUF_ND) == PyBUF_ND ? info->shape : 0;
+    buffer->strides = (flags & PyBUF_STRIDES) == PyBUF_STRIDES ? info->strides : 0;
+    buffer->suboffsets = 0;
+    buffer->internal = info;
+    return 0;
+}
+
+void view_releasebuffer(PyObject *, Py_buffer * buffer)
+{
+    delete static_cast<view_buffer_info*>(buffer->internal);
+}
+
+PyBufferProcs view_buffer_procs;
+
+void export_image_view_buffer(boost::python::object const& cls)
+{
+    view_buffer_procs.bf_getbuffer = view_getbuffer;
+    view_buffer_procs.bf_releasebuffer = view_releasebuffer;
+    PyTypeObject * type = reinterpret_cast<PyTypeObject*>(cls.ptr());
+    type->tp_as_buffer = &view_buffer_procs;
+#if PY_VERSION_HEX < 0x03000000
+    type->tp_flags |= Py_TPFLAGS_HAVE_NEWBUFFER;
+#endif
+}
+
+PyObject* view_tostring3(image_view<image_data_32> const & view, std::string const& format, mapnik::rgba_palette const& pal)
+{
+    std::string s;
+    Py_BEGIN_ALLOW_THREADS
+        try
+        {
+            s = save_to_string(view, format, pal);
+        }
+        catch (...)
+        {
+            Py_BLOCK_THREADS
+                throw;
+        }
+    Py_END_ALLOW_THREADS
     return 
 #if PY_VERSION_HEX >= 0x03000000
         ::PyBytes_FromStringAndSize
@@ -72,18 +188,30 @@ PyObject* view_tostring2(image_view<image_data_32> const & view, std::string con
         (s.data(),s.size());
 }
 
+void (*save_view3)(image_view<image_data_32> const&, std::string const&,std::string const&, mapnik::rgba_palette const&) = mapnik::save_to_file;
 void (*save_view1)(image_view<image_data_32> const&, std::string const&,std::string const&) = mapnik::save_to_file;
 void (*save_view2)(image_view<image_data_32> const&, std::string const&) = mapnik::save_to_file;
 
 void export_image_view()
 {
     using namespace boost::python;
-    class_<image_view<image_data_32> >("ImageView","A view into an image.",no_init)
+    class_<image_view<image_data_32> > view("ImageView",
+        "A view into an image.\n"
+        "\n"
+        "Views support the buffer protocol, exposing their pixels as a\n"
+        "read-only height x width x 4 array without copying:\n"
+        ">>> pixels = numpy.asarray(memoryview(im.view(0, 0, 256, 256)))\n",
+        no_init);
+    view
         .def("width",&image_view<image_data_32>::width)
         .def("height",&image_view<image_data_32>::height)
         .def("tostring",&view_tostring1)
         .def("tostring",&view_tostring2)
+        .def("tostring",&view_tostring3)
         .def("save",save_view1)
+        .def("save",save_view3)
         .def("save",save_view2)
         ;
+
+    export_image_view_buffer(view);
 }
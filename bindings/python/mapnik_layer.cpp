@@ -31,6 +31,7 @@
 #include <mapnik/layer.hpp>
 #include <mapnik/datasource.hpp>
 #include <mapnik/datasource_cache.hpp>
+#include <mapnik/feature_cache.hpp>
 
 using mapnik::layer;
 using mapnik::parameters;
@@ -97,6 +98,33 @@ struct layer_pickle_suite : boost::python::pickle_suite
 
 std::vector<std::string> & (mapnik::layer::*_styles_)() = &mapnik::layer::styles;
 
+namespace {
+
+boost::python::dict feature_cache_stats()
+{
+    mapnik::feature_cache_stats stats = mapnik::feature_cache::instance()->stats();
+    boost::python::dict result;
+    result["hits"] = stats.hits;
+    result["misses"] = stats.misses;
+    result["evictions"] = stats.evictions;
+    result["entries"] = stats.entries;
+    result["bytes"] = stats.bytes;
+    result["max_bytes"] = stats.max_bytes;
+    return result;
+}
+
+void set_feature_cache_size(std::size_t max_bytes)
+{
+    mapnik::feature_cache::instance()->set_max_bytes(max_bytes);
+}
+
+void clear_feature_cache()
+{
+    mapnik::feature_cache::instance()->clear();
+}
+
+}
+
 void export_layer()
 {
     using namespace boost::python;
@@ -196,7 +224,9 @@ void export_layer()
         .add_property("cache_features",
                       &layer::cache_features,
                       &layer::set_cache_features,
-                      "Get/Set whether features should be cached during rendering if used between multiple styles\n"
+                      "Get/Set whether features should be cached during rendering. Cached features\n"
+                      "are shared by all styles of the layer and kept for later renders of the\n"
+                      "same area, see feature_cache_stats and set_feature_cache_size.\n"
                       "\n"
                       "Usage:\n"
                       ">>> lyr.cache_features\n"
@@ -326,4 +356,18 @@ void export_layer()
             )
  
         ;
+
+    def("feature_cache_stats", &feature_cache_stats,
+        "Returns a dict with the hits, misses, evictions, number of entries,\n"
+        "size in bytes and maximum size of the cache of layer features.\n");
+    def("set_feature_cache_size", &set_feature_cache_size,
+        (arg("max_bytes")),
+        "Set the memory budget of the layer feature cache in bytes,\n"
+        "evicting the least recently used entries to fit.\n"
+        "\n"
+        "Usage:\n"
+        ">>> set_feature_cache_size(256 * 1024 * 1024)\n");
+    def("clear_feature_cache", &clear_feature_cache,
+        "Removes all features from the layer feature cache and resets\n"
+        "its statistics.\n");
 }
@@ -0,0 +1,140 @@
+/*****************************************************************************
+ * 
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+//$Id$
+
+// boost
+#include <boost/python.hpp>
+#include <boost/make_shared.hpp>
+
+// mapnik
+#include <mapnik/palette.hpp>
+#include <mapnik/graphics.hpp>
+#include <mapnik/png_io.hpp>
+
+// stl
+#include <vector>
+
+namespace {
+using namespace boost::python;
+using mapnik::rgba_palette;
+
+boost::shared_ptr<rgba_palette> make_palette(std::string const& pal, std::string const& format)
+{
+    rgba_palette::palette_type type = rgba_palette::PALETTE_RGBA;
+    if (format == "rgb")
+        type = rgba_palette::PALETTE_RGB;
+    else if (format == "act")
+        type = rgba_palette::PALETTE_ACT;
+    else if (format != "rgba")
+        throw mapnik::palette_error("invalid palette format '" + format + "', expected 'rgba', 'rgb' or 'act'");
+    return boost::make_shared<rgba_palette>(pal, type);
+}
+
+// learn a palette from sample images, e.g. tiles of a tileset sharing one style
+boost::shared_ptr<rgba_palette> palette_from_images(list const& images, unsigned colors)
+{
+    std::vector<mapnik::image_32*> samples;
+    for (ssize_t i = 0; i < len(images); ++i)
+    {
+        samples.push_back(&extract<mapnik::image_32&>(images[i])());
+    }
+    std::vector<mapnik::rgba> pal;
+    Py_BEGIN_ALLOW_THREADS
+        try
+        {
+            mapnik::hextree<mapnik::rgba> tree(colors);
+            for (std::vector<mapnik::image_32*>::const_iterator im = samples.begin(); im != samples.end(); ++im)
+            {
+                mapnik::image_data_32 const& data = (*im)->data();
+                for (unsigned y = 0; y < data.height(); ++y)
+                {
+                    mapnik::image_data_32::pixel_type const * row = data.getRow(y);
+                    for (unsigned x = 0; x < data.width(); ++x)
+                    {
+                        unsigned val = row[x];
+                        tree.insert(mapnik::rgba(U2RED(val), U2GREEN(val), U2BLUE(val), U2ALPHA(val)));
+                    }
+                }
+            }
+            tree.create_palette(pal);
+        }
+        catch (...)
+        {
+            Py_BLOCK_THREADS
+                throw;
+        }
+    Py_END_ALLOW_THREADS
+    if (pal.empty())
+    {
+        throw mapnik::palette_error("cannot learn a palette from empty images");
+    }
+    return boost::make_shared<rgba_palette>(pal);
+}
+
+PyObject* palette_tostring(rgba_palette const& pal)
+{
+    std::string s = pal.to_string();
+    return
+#if PY_VERSION_HEX >= 0x03000000
+        ::PyBytes_FromStringAndSize
+#else
+        ::PyString_FromStringAndSize
+#endif
+        (s.data(),s.size());
+}
+
+}
+
+void export_palette()
+{
+    using namespace boost::python;
+
+    class_<rgba_palette,boost::shared_ptr<rgba_palette>,
+        boost::noncopyable>("Palette",
+        "A fixed palette for paletted PNG output.\n"
+        "\n"
+        "The palette is matched through a lookup table built once, so\n"
+        "reusing it for many images is much cheaper than quantizing each\n"
+        "of them with 'png256'.\n"
+        "\n"
+        "Usage:\n"
+        ">>> pal = Palette(open('style.act','rb').read(), 'act')\n"
+        ">>> im.tostring('png', pal)\n",
+        no_init)
+        .def("__init__",make_constructor(make_palette,default_call_policies(),
+            (arg("palette"),arg("format")="rgba")),
+            "Create a palette from packed 'rgba' (default), 'rgb' or\n"
+            "Adobe Color Table ('act') data.\n")
+        .def("from_images",palette_from_images,
+            (arg("images"),arg("colors")=256),
+            "Learn a palette of at most colors entries from a list\n"
+            "of sample images.\n"
+            "\n"
+            "Usage:\n"
+            ">>> pal = Palette.from_images([im1, im2], 256)\n"
+            ">>> open('style.pal','wb').write(pal.tostring())\n")
+        .staticmethod("from_images")
+        .def("tostring",palette_tostring,
+            "Return the palette as packed rgba data.\n")
+        .def("__len__",&rgba_palette::size)
+        ;
+}
@@ -25,6 +25,8 @@
 #include <mapnik/proj_transform.hpp>
 // boost
 #include <boost/python.hpp>
+
+#include "python_buffer.hpp"
  
 using mapnik::proj_transform;
 using mapnik::projection;
@@ -82,6 +84,41 @@ mapnik::box2d<double> backward_transform_env(mapnik::proj_transform& t, mapnik::
     t.backward(maxx,maxy,z);
     return mapnik::box2d<double>(minx,miny,maxx,maxy);
 }   
+
+bool transform_many(mapnik::proj_transform& t, boost::python::object const& xs, boost::python::object const& ys, bool forward)
+{
+    python_double_buffer x(xs);
+    python_double_buffer y(ys);
+    if (x.size() != y.size())
+    {
+        PyErr_SetString(PyExc_ValueError, "x and y must have the same length");
+        boost::python::throw_error_already_set();
+    }
+    bool ok;
+    Py_BEGIN_ALLOW_THREADS
+        try
+        {
+            ok = forward ? t.forward(x.data(),y.data(),0,x.size())
+                : t.backward(x.data(),y.data(),0,x.size());
+        }
+        catch (...)
+        {
+            Py_BLOCK_THREADS
+                throw;
+        }
+    Py_END_ALLOW_THREADS
+    return ok;
+}
+
+bool forward_transform_many(mapnik::proj_transform& t, boost::python::object const& xs, boost::python::object const& ys)
+{
+    return transform_many(t,xs,ys,true);
+}
+
+bool backward_transform_many(mapnik::proj_transform& t, boost::python::object const& xs, boost::python::object const& ys)
+{
+    return transform_many(t,xs,ys,false);
+}
 }
 
 void export_proj_transform ()
@@ -94,6 +131,21 @@ void export_proj_transform ()
         .def("backward",backward_transform_c)
         .def("forward", forward_transform_env)
         .def("backward",backward_transform_env)
+        .def("forward_many", forward_transform_many,
+             (arg("x"),arg("y")),
+             "Transform the coordinates in two buffers of doubles (e.g.\n"
+             "array.array('d') or float64 numpy arrays) in place.\n"
+             "Returns False if some points could not be transformed.\n"
+             "\n"
+             "Usage:\n"
+             ">>> x = array.array('d', [0, 10])\n"
+             ">>> y = array.array('d', [0, 10])\n"
+             ">>> ProjTransform(longlat, merc).forward_many(x, y)\n"
+             "True\n")
+        .def("backward_many", backward_transform_many,
+             (arg("x"),arg("y")),
+             "Transform the coordinates in two buffers of doubles\n"
+             "backward in place, see forward_many.\n")
         ;
     
 }
@@ -27,6 +27,9 @@
 // mapnik
 #include <mapnik/coord.hpp>
 #include <mapnik/projection.hpp>
+#include <mapnik/projection_cache.hpp>
+
+#include "python_buffer.hpp"
 
 using mapnik::projection;
 
@@ -82,6 +85,65 @@ mapnik::box2d<double> inverse_env(mapnik::box2d<double> const & box,
     prj.inverse(maxx,maxy);
     return mapnik::box2d<double>(minx,miny,maxx,maxy);
 }
+
+void project_many(mapnik::projection const& prj, boost::python::object const& xs, boost::python::object const& ys, bool forward)
+{
+    python_double_buffer x(xs);
+    python_double_buffer y(ys);
+    if (x.size() != y.size())
+    {
+        PyErr_SetString(PyExc_ValueError, "x and y must have the same length");
+        boost::python::throw_error_already_set();
+    }
+    Py_BEGIN_ALLOW_THREADS
+        try
+        {
+            if (forward)
+                prj.forward(x.data(),y.data(),x.size());
+            else
+                prj.inverse(x.data(),y.data(),x.size());
+        }
+        catch (...)
+        {
+            Py_BLOCK_THREADS
+                throw;
+        }
+    Py_END_ALLOW_THREADS
+}
+
+void forward_many(mapnik::projection const& prj, boost::python::object const& xs, boost::python::object const& ys)
+{
+    project_many(prj,xs,ys,true);
+}
+
+void inverse_many(mapnik::projection const& prj, boost::python::object const& xs, boost::python::object const& ys)
+{
+    project_many(prj,xs,ys,false);
+}
+
+boost::shared_ptr<projection> cached_projection(std::string const& params)
+{
+    // cached projections are never modified, Projection has no mutators
+    return boost::const_pointer_cast<projection>(mapnik::projection_cache::instance()->get(params));
+}
+
+boost::python::dict projection_cache_stats()
+{
+    mapnik::projection_cache_stats stats = mapnik::projection_cache::instance()->stats();
+    boost::python::dict result;
+    result["projection_hits"] = stats.projection_hits;
+    result["projection_misses"] = stats.projection_misses;
+    result["transform_hits"] = stats.transform_hits;
+    result["transform_misses"] = stats.transform_misses;
+    result["projections"] = stats.projections;
+    result["transforms"] = stats.transforms;
+    return result;
+}
+
+void clear_projection_cache()
+{
+    mapnik::projection_cache::instance()->clear();
+}
    
 }
 
@@ -89,7 +151,7 @@ void export_projection ()
 {
     using namespace boost::python; 
 
-    class_<projection>("Projection", "Represents a map projection.",init<optional<std::string const&> >(
+    class_<projection, boost::shared_ptr<projection> >("Projection", "Represents a map projection.",init<optional<std::string const&> >(
                            (arg("proj4_string")),
                            "Constructs a new projection from its PROJ.4 string representation.\n"
                            "\n"
@@ -107,11 +169,40 @@ void export_projection ()
         .add_property ("geographic", &projection::is_geographic,
                        "This property is True if the projection is a geographic projection\n"
                        "(i.e. it uses lon/lat coordinates)\n")
+        .def ("forward_many", &forward_many,
+              (arg("x"),arg("y")),
+              "Project lon/lat coordinates in two buffers of doubles\n"
+              "(e.g. array.array('d') or float64 numpy arrays) in place.\n"
+              "\n"
+              "Usage:\n"
+              ">>> x = array.array('d', [0, 10])\n"
+              ">>> y = array.array('d', [0, 10])\n"
+              ">>> Projection('+init=epsg:3857').forward_many(x, y)\n")
+        .def ("inverse_many", &inverse_many,
+              (arg("x"),arg("y")),
+              "Inverse project coordinates in two buffers of doubles\n"
+              "in place, see forward_many.\n")
         ;
     
     def("forward_",&forward_pt);
     def("inverse_",&inverse_pt);
     def("forward_",&forward_env);
     def("inverse_",&inverse_env);
+
+    def("cached_projection", &cached_projection,
+        (arg("proj4_string")),
+        "Returns a Projection for the given PROJ.4 string from the projection\n"
+        "cache of the calling thread, initializing and caching it on first use.\n"
+        "Cached projections are shared with renderers in the same thread.\n"
+        "\n"
+        "Usage:\n"
+        ">>> merc = cached_projection('+init=epsg:3857')\n");
+    def("projection_cache_stats", &projection_cache_stats,
+        "Returns a dict with the hit and miss counts of the projection cache\n"
+        "and the number of projections and transforms cached for the calling\n"
+        "thread.\n");
+    def("clear_projection_cache", &clear_projection_cache,
+        "Removes all projections and transforms from the projection cache\n"
+        "and resets its statistics.\n");
     
 }
@@ -36,6 +36,7 @@ void export_query();
 void export_geometry();
 void export_image();
 void export_image_view();
+void export_palette();
 void export_map();
 void export_python();
 void export_expression();
@@ -71,10 +72,14 @@ void export_glyph_symbolizer();
 #endif
 #include <mapnik/graphics.hpp>
 #include <mapnik/image_util.hpp>
+#include <mapnik/image_view.hpp>
 #include <mapnik/load_map.hpp>
 #include <mapnik/config_error.hpp>
 #include <mapnik/value_error.hpp>
 #include <mapnik/save_map.hpp>
+// stl
+#include <cmath>
+#include <algorithm>
 
 #if defined(HAVE_CAIRO) && defined(HAVE_PYCAIRO)
 #include <pycairo.h>
@@ -180,6 +185,84 @@ void render_tile_to_file(const mapnik::Map& map,
     mapnik::save_to_file(image.data(),file,format);
 }
 
+boost::python::dict render_metatile(const mapnik::Map& map,
+                                    mapnik::box2d<double> const& bbox,
+                                    unsigned metatile_size,
+                                    unsigned tile_size,
+                                    unsigned buffer,
+                                    const std::string& format)
+{
+    using namespace boost::python;
+
+    if (metatile_size == 0 || tile_size == 0)
+    {
+        throw mapnik::value_error("metatile_size and tile_size must be greater than zero");
+    }
+
+    unsigned size = metatile_size * tile_size;
+    double res_x = bbox.width() / size;
+    double res_y = bbox.height() / size;
+    // zoom_to_box would widen one axis of a non-square bbox and the
+    // tiles cut from the image would no longer cover their own extents
+    if (std::fabs(res_x - res_y) > 1e-9 * std::max(res_x, res_y))
+    {
+        throw mapnik::value_error("metatile bbox must be square");
+    }
+
+    // render the whole metatile (plus buffer) in one pass so that
+    // datasource queries, style evaluation and label placement are
+    // shared by every tile in it
+    mapnik::Map metatile(map);
+    metatile.resize(size + 2 * buffer, size + 2 * buffer);
+    metatile.zoom_to_box(mapnik::box2d<double>(bbox.minx() - buffer * res_x,
+                                               bbox.miny() - buffer * res_y,
+                                               bbox.maxx() + buffer * res_x,
+                                               bbox.maxy() + buffer * res_y));
+
+    mapnik::image_32 image(metatile.width(),metatile.height());
+    std::vector<std::string> tiles;
+    tiles.reserve(metatile_size * metatile_size);
+
+    Py_BEGIN_ALLOW_THREADS
+        try
+        {
+            mapnik::agg_renderer<mapnik::image_32> ren(metatile,image,1.0,0,0);
+            ren.apply();
+
+            for (unsigned y = 0; y < metatile_size; ++y)
+            {
+                for (unsigned x = 0; x < metatile_size; ++x)
+                {
+                    mapnik::image_view<mapnik::image_data_32> view =
+                        image.get_view(buffer + x * tile_size, buffer + y * tile_size,
+                                       tile_size, tile_size);
+                    tiles.push_back(mapnik::save_to_string(view,format));
+                }
+            }
+        }
+        catch (...)
+        {
+            Py_BLOCK_THREADS
+                throw;
+        }
+    Py_END_ALLOW_THREADS
+
+    dict result;
+    for (unsigned i = 0; i < tiles.size(); ++i)
+    {
+        std::string const& s = tiles[i];
+        object data(handle<>(
+#if PY_VERSION_HEX >= 0x03000000
+                        ::PyBytes_FromStringAndSize
+#else
+                        ::PyString_FromStringAndSize
+#endif
+                        (s.data(),s.size())));
+        result[make_tuple(i % metatile_size, i / metatile_size)] = data;
+    }
+    return result;
+}
+
 void render_to_file1(const mapnik::Map& map,
                      const std::string& filename,
                      const std::string& format)
@@ -338,6 +421,7 @@ BOOST_PYTHON_MODULE(_mapnik2)
     export_envelope();   
     export_image();
     export_image_view();
+    export_palette();
     export_expression();
     export_rule();
     export_style();    
@@ -376,6 +460,12 @@ BOOST_PYTHON_MODULE(_mapnik2)
         "8 bit (paletted) PNG can be requested with 'png256':\n"
         ">>> render_to_file(m,'8bit_image.png','png256')\n"
         "\n"
+        "PNG zlib compression level (z=0-9), strategy\n"
+        "(s=default|filtered|huff|rle|fixed) and row filter\n"
+        "(f=none|sub|up|avg|paeth|all) can be appended to trade\n"
+        "file size for encoding speed:\n"
+        ">>> render_to_file(m,'fast.png','png:z=1:s=rle:f=none')\n"
+        "\n"
         "JPEG quality can be controlled by adding a suffix to\n"
         "'jpeg' between 0 and 100 (default is 85):\n"
         ">>> render_to_file(m,'top_quality.jpeg','jpeg100')\n"
@@ -409,7 +499,28 @@ BOOST_PYTHON_MODULE(_mapnik2)
         "\n"
         "TODO\n"
         "\n"
-        ); 
+        );
+
+    def("render_metatile",&render_metatile,
+        (arg("map"),arg("bbox"),arg("metatile_size"),arg("tile_size")=256,
+         arg("buffer")=128,arg("format")="png"),
+        "\n"
+        "Render a metatile of metatile_size x metatile_size tiles in a\n"
+        "single pass and return a dict of encoded tiles keyed by (x,y),\n"
+        "where (0,0) is the upper left tile of the metatile.\n"
+        "\n"
+        "The bbox covers the tiles only and must be square, the buffer\n"
+        "(in pixels) is added around it so that labels are not cut off\n"
+        "at tile edges.\n"
+        "\n"
+        "Usage:\n"
+        ">>> from mapnik import Map, Box2d, render_metatile, load_map\n"
+        ">>> m = Map(256,256)\n"
+        ">>> load_map(m,'mapfile.xml')\n"
+        ">>> tiles = render_metatile(m,Box2d(-180,-180,180,180),8,256,128,'png')\n"
+        ">>> open('0_0.png','wb').write(tiles[(0,0)])\n"
+        "\n"
+        );
 
     
     def("render", &render, render_overloads(
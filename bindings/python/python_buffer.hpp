@@ -0,0 +1,108 @@
+/*****************************************************************************
+ * 
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+//$Id$
+
+#ifndef MAPNIK_PYTHON_BUFFER_HPP
+#define MAPNIK_PYTHON_BUFFER_HPP
+
+#include <boost/python.hpp>
+#include <boost/utility.hpp>
+
+// An array of doubles in a python object supporting the buffer protocol,
+// e.g. array.array('d'), a float64 numpy array or a bytearray. Unless
+// writable is false the buffer is modified in place.
+class python_double_buffer : private boost::noncopyable
+{
+public:
+    explicit python_double_buffer(boost::python::object const& obj, bool writable = true)
+        : data_(0),
+          size_(0)
+    {
+        void * ptr = 0;
+        Py_ssize_t length = 0;
+#if PY_VERSION_HEX >= 0x03000000
+        if (PyObject_GetBuffer(obj.ptr(), &view_, writable ? PyBUF_WRITABLE : PyBUF_SIMPLE) != 0)
+        {
+            boost::python::throw_error_already_set();
+        }
+        ptr = view_.buf;
+        length = view_.len;
+#else
+        int result = 0;
+        if (writable)
+        {
+            result = PyObject_AsWriteBuffer(obj.ptr(), &ptr, &length);
+        }
+        else
+        {
+            void const* const_ptr = 0;
+            result = PyObject_AsReadBuffer(obj.ptr(), &const_ptr, &length);
+            ptr = const_cast<void*>(const_ptr);
+        }
+        if (result != 0)
+        {
+            boost::python::throw_error_already_set();
+        }
+#endif
+        if (length % sizeof(double) != 0)
+        {
+#if PY_VERSION_HEX >= 0x03000000
+            PyBuffer_Release(&view_);
+#endif
+            PyErr_SetString(PyExc_ValueError, "expected a buffer of doubles");
+            boost::python::throw_error_already_set();
+        }
+        data_ = static_cast<double*>(ptr);
+        size_ = length / sizeof(double);
+    }
+
+    ~python_double_buffer()
+    {
+#if PY_VERSION_HEX >= 0x03000000
+        PyBuffer_Release(&view_);
+#endif
+    }
+
+    double * data()
+    {
+        return data_;
+    }
+
+    double const* data() const
+    {
+        return data_;
+    }
+
+    std::size_t size() const
+    {
+        return size_;
+    }
+
+private:
+    double * data_;
+    std::size_t size_;
+#if PY_VERSION_HEX >= 0x03000000
+    Py_buffer view_;
+#endif
+};
+
+#endif // MAPNIK_PYTHON_BUFFER_HPP
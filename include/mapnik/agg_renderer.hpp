@@ -118,7 +118,7 @@ private:
     CoordTransform t_;
     freetype_engine font_engine_;
     face_manager<freetype_engine> font_manager_;
-    label_collision_detector4 detector_;
+    label_collision_detector_type detector_;
     boost::scoped_ptr<rasterizer> ras_ptr;
 };
 }
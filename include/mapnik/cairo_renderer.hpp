@@ -134,7 +134,7 @@ protected:
     boost::shared_ptr<freetype_engine> font_engine_;
     face_manager<freetype_engine> font_manager_;
     cairo_face_manager face_manager_;
-    label_collision_detector4 detector_;
+    label_collision_detector_type detector_;
 };
 
 template <typename T>
@@ -0,0 +1,146 @@
+/*****************************************************************************
+ *
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+
+//$Id$
+
+#ifndef MAPNIK_COMPILED_EXPRESSION_HPP
+#define MAPNIK_COMPILED_EXPRESSION_HPP
+
+// mapnik
+#include <mapnik/config.hpp>
+#include <mapnik/feature.hpp>
+#include <mapnik/expression_node.hpp>
+#include <mapnik/filter_factory.hpp>
+
+// stl
+#include <vector>
+#include <string>
+#include <map>
+
+namespace mapnik {
+
+// Expressions compiled to flat postfix programs, evaluated without
+// walking the expression tree. All programs of a set share one table
+// of attribute slots, so an attribute used by many expressions, e.g.
+// the filters of all rules of a style, is looked up once per feature.
+// Results are the same as those of the evaluate visitor.
+class MAPNIK_DECL compiled_expressions
+{
+public:
+    // evaluation state for one feature at a time, reusable across
+    // features to avoid allocations
+    class context
+    {
+    public:
+        context()
+            : feature_(0),
+              generation_(0) {}
+    private:
+        friend class compiled_expressions;
+        Feature const* feature_;
+        std::vector<value_type> slots_;
+        // generation in which each slot was loaded
+        std::vector<unsigned> loaded_;
+        std::vector<value_type> stack_;
+        unsigned generation_;
+    };
+
+    compiled_expressions() {}
+
+    // compile expr, returns the id to evaluate it with
+    unsigned add(expression_ptr const& expr);
+
+    std::size_t size() const
+    {
+        return programs_.size();
+    }
+
+    // names of the attributes used by the expressions, by slot
+    std::vector<std::string> const& attribute_names() const
+    {
+        return names_;
+    }
+
+    // start evaluating expressions for feature, which must outlive
+    // the evaluations
+    void reset(context & ctx, Feature const& feature) const;
+
+    value_type evaluate(unsigned id, context & ctx) const;
+
+    // readable listing of the program of an expression
+    std::string to_string(unsigned id) const;
+
+private:
+    enum opcode
+    {
+        PUSH_VALUE,
+        PUSH_ATTRIBUTE,
+        PLUS,
+        MINUS,
+        MULT,
+        DIV,
+        MOD,
+        LESS,
+        LESS_EQUAL,
+        GREATER,
+        GREATER_EQUAL,
+        EQUAL_TO,
+        NOT_EQUAL_TO,
+        NOT,
+        TO_BOOL,
+        // leave false on the stack and jump to arg if the top is false
+        AND_JUMP,
+        // leave true on the stack and jump to arg if the top is true
+        OR_JUMP,
+        REGEX_MATCH,
+        REGEX_REPLACE
+    };
+
+    struct instruction
+    {
+        instruction(opcode o, unsigned a = 0)
+            : op(o), arg(a) {}
+        opcode op;
+        unsigned arg;
+    };
+
+    struct compiler;
+    friend struct compiler;
+
+    unsigned slot(std::string const& name);
+    value_type const& load(unsigned slot, context & ctx) const;
+
+    // expressions are kept alive for the regex nodes referenced by programs
+    std::vector<expression_ptr> exprs_;
+    std::vector<instruction> code_;
+    // first and one past the last instruction of each program
+    std::vector<std::pair<unsigned,unsigned> > programs_;
+    std::vector<value_type> values_;
+    std::vector<regex_match_node const*> matches_;
+    std::vector<regex_replace_node const*> replaces_;
+    std::vector<std::string> names_;
+    std::map<std::string,unsigned> slots_;
+};
+
+}
+
+#endif // MAPNIK_COMPILED_EXPRESSION_HPP
@@ -26,8 +26,10 @@
 #define CTRANS_HPP
 
 #include <algorithm>
+#include <vector>
 
 #include <mapnik/box2d.hpp>
+#include <mapnik/vertex.hpp>
 #include <mapnik/coord_array.hpp>
 #include <mapnik/proj_transform.hpp>
 
@@ -57,6 +59,72 @@ private:
     Geometry& geom_;
 };
 
+// Vertices of a geometry transformed backward by prj_trans. All vertices
+// are reprojected in a single block on first access instead of calling
+// into proj4 once per vertex; identical projections are passed through.
+template <typename Geometry>
+struct backward_projected_vertices
+{
+    backward_projected_vertices(Geometry const& geom,
+                                proj_transform const& prj_trans)
+        : geom_(geom),
+          prj_trans_(prj_trans),
+          pos_(0),
+          loaded_(false) {}
+
+    unsigned vertex(double * x, double * y) const
+    {
+        if (prj_trans_.equal())
+        {
+            return geom_.vertex(x,y);
+        }
+        if (!loaded_)
+        {
+            load();
+        }
+        if (pos_ >= cmds_.size())
+        {
+            return SEG_END;
+        }
+        *x = xs_[pos_];
+        *y = ys_[pos_];
+        return cmds_[pos_++];
+    }
+
+    void rewind (unsigned pos)
+    {
+        geom_.rewind(pos);
+        pos_ = 0;
+    }
+
+private:
+    void load() const
+    {
+        unsigned size = geom_.num_points();
+        xs_.resize(size);
+        ys_.resize(size);
+        cmds_.resize(size);
+        geom_.rewind(0);
+        for (unsigned i = 0; i < size; ++i)
+        {
+            cmds_[i] = geom_.vertex(&xs_[i],&ys_[i]);
+        }
+        if (size > 0)
+        {
+            prj_trans_.backward(&xs_[0],&ys_[0],0,size);
+        }
+        loaded_ = true;
+    }
+
+    Geometry const& geom_;
+    proj_transform const& prj_trans_;
+    mutable std::vector<double> xs_;
+    mutable std::vector<double> ys_;
+    mutable std::vector<unsigned> cmds_;
+    mutable unsigned pos_;
+    mutable bool loaded_;
+};
+
 template <typename Transform,typename Geometry>
 struct MAPNIK_DECL coord_transform2
 {
@@ -68,20 +136,18 @@ struct MAPNIK_DECL coord_transform2
                      proj_transform const& prj_trans)
         : t_(t), 
         geom_(geom), 
-        prj_trans_(prj_trans)  {}
+        vertices_(geom,prj_trans)  {}
         
     unsigned  vertex(double * x , double  * y) const
     {
-        unsigned command = geom_.vertex(x,y);
-        double z=0;
-        prj_trans_.backward(*x,*y,z);
+        unsigned command = vertices_.vertex(x,y);
         t_.forward(x,y);
         return command;
     }
         
     void rewind (unsigned pos)
     {
-        geom_.rewind(pos);
+        vertices_.rewind(pos);
     }
 
     Geometry const& geom() const
@@ -92,7 +158,7 @@ struct MAPNIK_DECL coord_transform2
 private:
     Transform const& t_;
     Geometry const& geom_;
-    proj_transform const& prj_trans_;
+    backward_projected_vertices<Geometry> vertices_;
 };
     
 template <typename Transform,typename Geometry>
@@ -103,15 +169,12 @@ struct MAPNIK_DECL coord_transform3
                      proj_transform const& prj_trans,
                      int dx, int dy)
         : t_(t), 
-        geom_(geom), 
-        prj_trans_(prj_trans),
+        vertices_(geom,prj_trans),
         dx_(dx), dy_(dy) {}
       
     unsigned  vertex(double * x , double  * y) const
     {
-        unsigned command = geom_.vertex(x,y);
-        double z=0;
-        prj_trans_.backward(*x,*y,z);
+        unsigned command = vertices_.vertex(x,y);
         t_.forward(x,y);
         *x+=dx_;
         *y+=dy_;
@@ -120,13 +183,12 @@ struct MAPNIK_DECL coord_transform3
       
     void rewind (unsigned pos)
     {
-        geom_.rewind(pos);
+        vertices_.rewind(pos);
     }
       
 private:
     Transform const& t_;
-    Geometry const& geom_;
-    proj_transform const& prj_trans_;
+    backward_projected_vertices<Geometry> vertices_;
     int dx_;
     int dy_;
 };
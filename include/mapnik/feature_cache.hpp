@@ -0,0 +1,123 @@
+/*****************************************************************************
+ *
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+
+//$Id$
+
+#ifndef MAPNIK_FEATURE_CACHE_HPP
+#define MAPNIK_FEATURE_CACHE_HPP
+
+// mapnik
+#include <mapnik/config.hpp>
+#include <mapnik/utils.hpp>
+#include <mapnik/datasource.hpp>
+#include <mapnik/memory_datasource.hpp>
+#include <mapnik/query.hpp>
+#include <mapnik/box2d.hpp>
+
+// boost
+#include <boost/utility.hpp>
+#include <boost/shared_ptr.hpp>
+#include <boost/weak_ptr.hpp>
+#ifdef MAPNIK_THREADSAFE
+#include <boost/thread/mutex.hpp>
+#endif
+
+// stl
+#include <list>
+#include <vector>
+#include <string>
+#include <cstddef>
+
+namespace mapnik
+{
+
+struct feature_cache_stats
+{
+    feature_cache_stats()
+        : hits(0),
+          misses(0),
+          evictions(0),
+          entries(0),
+          bytes(0),
+          max_bytes(0) {}
+
+    std::size_t hits;
+    std::size_t misses;
+    std::size_t evictions;
+    std::size_t entries;
+    std::size_t bytes;
+    std::size_t max_bytes;
+};
+
+// Process wide cache of the features read for layers with cache-features
+// enabled, shared by all styles of a layer and by later renders. Entries
+// are keyed by datasource, property names and scale and hold the features
+// of the query bbox snapped outwards to a power of two grid, so renders of
+// neighbouring tiles are answered from the same entry. The least recently
+// used entries are evicted when the cached features exceed max_bytes.
+//
+// Cached features are never handed out, renders get copies: geometries
+// keep iteration state and so can't be shared between threads.
+struct MAPNIK_DECL feature_cache :
+        public singleton <feature_cache, CreateStatic>,
+        private boost::noncopyable
+{
+    friend class CreateStatic<feature_cache>;
+
+    struct entry
+    {
+        boost::weak_ptr<datasource> ds;
+        datasource const* ds_key;
+        std::string names;
+        int scale_bucket;
+        box2d<double> bbox;
+        std::vector<feature_ptr> features;
+        std::vector<box2d<double> > envelopes;
+        std::size_t bytes;
+    };
+    typedef boost::shared_ptr<entry const> entry_ptr;
+
+#ifdef MAPNIK_THREADSAFE
+    static boost::mutex mutex_;
+#endif
+    // most recently used first
+    static std::list<entry_ptr> entries_;
+    static feature_cache_stats stats_;
+    static std::size_t max_bytes_;
+
+    // push copies of the features of ds intersecting the query bbox to
+    // cache, querying ds for the snapped bbox if they are not cached yet
+    static void features(datasource_ptr const& ds, query const& q, memory_datasource & cache);
+    static void set_max_bytes(std::size_t max_bytes);
+    static std::size_t max_bytes();
+    static feature_cache_stats stats();
+    static void clear();
+private:
+    static entry_ptr find(datasource_ptr const& ds, std::string const& names,
+                          int scale_bucket, box2d<double> const& bbox);
+    static void insert(entry_ptr const& e);
+    static void evict();
+};
+
+}
+
+#endif // MAPNIK_FEATURE_CACHE_HPP
@@ -32,16 +32,21 @@
 #include <mapnik/map.hpp>
 #include <mapnik/attribute_collector.hpp>
 #include <mapnik/expression_evaluator.hpp>
+#include <mapnik/compiled_expression.hpp>
+#include <mapnik/rule_index.hpp>
 #include <mapnik/utils.hpp>
 #include <mapnik/projection.hpp>
+#include <mapnik/projection_cache.hpp>
 #include <mapnik/scale_denominator.hpp>
 #include <mapnik/memory_datasource.hpp>
+#include <mapnik/feature_cache.hpp>
 
 #ifdef MAPNIK_DEBUG
 //#include <mapnik/wall_clock_timer.hpp>
 #endif
 // boost
 #include <boost/foreach.hpp>
+#include <boost/make_shared.hpp>
 //stl
 #include <vector>
 
@@ -91,7 +96,8 @@ public:
                        
         try
         {
-            projection proj(m_.srs()); // map projection
+            projection_ptr map_proj = projection_cache::instance()->get(m_.srs());
+            projection const& proj = *map_proj; // map projection
 
             Map::const_metawriter_iterator metaItr = m_.begin_metawriters();
             Map::const_metawriter_iterator metaItrEnd = m_.end_metawriters();
@@ -148,8 +154,8 @@ private:
         {
             
             box2d<double> ext = m_.get_buffered_extent();
-            projection proj1(lay.srs());
-            proj_transform prj_trans(proj0,proj1);
+            proj_transform_ptr layer_trans = projection_cache::instance()->get_transform(proj0.params(),lay.srs());
+            proj_transform const& prj_trans = *layer_trans;
 
             // todo: only display raster if src and dest proj are matched
             // todo: add raster re-projection as an optional feature 
@@ -186,16 +192,23 @@ private:
             lx1 = std::min(ext.maxx(),lx1);
             ly1 = std::min(ext.maxy(),ly1);
             
+            // pixels across the clipped query bbox
+            double query_pixels = (lx1 - lx0) * m_.width() / m_.get_current_extent().width();
+
             prj_trans.forward(lx0,ly0,lz0);
             prj_trans.forward(lx1,ly1,lz1);
             box2d<double> bbox(lx0,ly0,lx1,ly1);
             
             query::resolution_type res(m_.width()/m_.get_current_extent().width(),m_.height()/m_.get_current_extent().height());
             query q(bbox,res,scale_denom); //BBOX query
+            if (query_pixels > 0)
+            {
+                q.set_pixel_size(bbox.width() / query_pixels);
+            }
                            
-            std::vector<feature_type_style*> active_styles;
+            // active styles with their rules active at this scale
+            std::vector<std::pair<feature_type_style const*,active_rules_ptr> > active_styles;
             std::set<std::string> names;
-            attribute_collector collector(names);
             double filt_factor = 1;
             directive_collector d_collector(&filt_factor);
             
@@ -210,24 +223,15 @@ private:
                     continue;
                 }
                 
-                const std::vector<rule>& rules=(*style).get_rules();
-                bool active_rules=false;
-                
-                BOOST_FOREACH(rule const& r, rules)
+                active_rules_ptr style_rules = style->get_active_rules(scale_denom);
+                if (!style_rules->rules.empty())
                 {
-                    if (r.active(scale_denom))
+                    if (ds->type() == datasource::Vector)
                     {
-                        active_rules = true;
-                        if (ds->type() == datasource::Vector)
-                        {
-                            collector(r);
-                        }
-                        // TODO - in the future rasters should be able to be filtered.
+                        names.insert(style_rules->names.begin(), style_rules->names.end());
                     }
-                }
-                if (active_rules)
-                {
-                    active_styles.push_back(const_cast<feature_type_style*>(&(*style)));
+                    // TODO - in the future rasters should be able to be filtered.
+                    active_styles.push_back(std::make_pair(&(*style), style_rules));
                 }
             }
             
@@ -237,58 +241,72 @@ private:
                 q.add_property_name(name);
             }
             
-            memory_datasource cache;
-            bool cache_features = lay.cache_features() && style_names.size()>1?true:false;
-            bool first = true;
+            // features of cached layers are read once through the
+            // process wide feature cache and shared by all styles
+            memory_datasource cache(false);
+            bool cache_features = lay.cache_features() && ds->type() == datasource::Vector
+                && !active_styles.empty();
+            if (cache_features)
+            {
+                feature_cache::instance()->features(ds, q, cache);
+            }
+            else if (ds->type() == datasource::Vector && !active_styles.empty())
+            {
+                // only features some active rule renders are wanted, the
+                // datasource may use the or of the rule filters to leave
+                // out the others. Cached features are shared by renders
+                // with other rules, so they are never filtered.
+                expression_ptr filter = active_styles[0].second->filter;
+                for (unsigned s = 1; s < active_styles.size() && filter; ++s)
+                {
+                    expression_ptr const& style_filter = active_styles[s].second->filter;
+                    filter = style_filter ?
+                        boost::make_shared<expr_node>(binary_node<tags::logical_or>(*filter,*style_filter)) :
+                        expression_ptr();
+                }
+                q.set_filter(filter);
+            }
             
-            BOOST_FOREACH (feature_type_style * style, active_styles)
+            for (unsigned s = 0; s < active_styles.size(); ++s)
             {
-                std::vector<rule*> if_rules;
-                std::vector<rule*> else_rules;
+                feature_type_style const* style = active_styles[s].first;
+                active_rules const& style_rules = *active_styles[s].second;
+                std::vector<rule const*> const& if_rules = style_rules.if_rules;
+                std::vector<rule const*> const& else_rules = style_rules.else_rules;
 
-                std::vector<rule> const& rules=style->get_rules();
-                
-                BOOST_FOREACH(rule const& r, rules)
+                if ( (ds->type() == datasource::Raster) &&
+                     (ds->params().get<double>("filter_factor",0.0) == 0.0) )
                 {
-                    if (r.active(scale_denom))
+                    BOOST_FOREACH(rule const* r, style_rules.rules)
                     {
-                        if (r.has_else_filter())
+                        rule::symbolizers const& symbols = r->get_symbolizers();
+                        rule::symbolizers::const_iterator symIter = symbols.begin();
+                        rule::symbolizers::const_iterator symEnd = symbols.end();
+                        while (symIter != symEnd)
                         {
-                            else_rules.push_back(const_cast<rule*>(&r));
-                        }
-                        else
-                        {
-                            if_rules.push_back(const_cast<rule*>(&r));
-                        }
-                        
-                        if ( (ds->type() == datasource::Raster) &&
-                             (ds->params().get<double>("filter_factor",0.0) == 0.0) )
-                        {
-                            rule::symbolizers const& symbols = r.get_symbolizers();
-                            rule::symbolizers::const_iterator symIter = symbols.begin();
-                            rule::symbolizers::const_iterator symEnd = symbols.end();
-                            while (symIter != symEnd)
-                            {
-                                // if multiple raster symbolizers, last will be respected
-                                // should we warn or throw?
-                                boost::apply_visitor(d_collector,*symIter++);
-                            }
-                            q.set_filter_factor(filt_factor);
+                            // if multiple raster symbolizers, last will be respected
+                            // should we warn or throw?
+                            boost::apply_visitor(d_collector,*symIter++);
                         }
+                        q.set_filter_factor(filt_factor);
                     }
                 }
+
+                // the filters of the active rules are compiled and
+                // indexed once per scale range, rule i has program i
+                compiled_expressions const& filters = style_rules.filters;
+                rule_index const& filter_index = style_rules.filter_index;
+                compiled_expressions::context filter_ctx;
                 
                 // process features
                 featureset_ptr fs;
-                if (first)
+                if (cache_features)
                 {
-                    if (cache_features)
-                        first = false;
-                    fs = ds->features(q);
+                    fs = cache.features(q);
                 }
                 else
                 {
-                    fs = cache.features(q);
+                    fs = ds->features(q);
                 }
                 
                 if (fs)
@@ -297,17 +315,14 @@ private:
                     while ((feature = fs->next()))
                     {                  
                         bool do_else=true;
+                        filters.reset(filter_ctx,*feature);
                         
-                        if (cache_features)
-                        {
-                            cache.push(feature);
-                        }
-                        
-                        BOOST_FOREACH(rule * r, if_rules )
+                        // only rules whose filter may match the feature
+                        std::vector<unsigned> const& candidates = filter_index.candidates(*feature);
+                        BOOST_FOREACH(unsigned i, candidates)
                         {
-                            expression_ptr const& expr=r->get_filter();    
-                            value_type result = boost::apply_visitor(evaluate<Feature,value_type>(*feature),*expr);
-                            if (result.to_bool())
+                            rule const* r = if_rules[i];
+                            if (filters.evaluate(i,filter_ctx).to_bool())
                             {   
                                 do_else=false;
                                 rule::symbolizers const& symbols = r->get_symbolizers();
@@ -333,7 +348,7 @@ private:
                         }
                         if (do_else)
                         {
-                            BOOST_FOREACH( rule * r, else_rules )
+                            BOOST_FOREACH( rule const* r, else_rules )
                             {
                                 rule::symbolizers const& symbols = r->get_symbolizers();
                                 // if the underlying renderer is not able to process the complete set of symbolizers,
@@ -351,7 +366,6 @@ private:
                         }
                     }
                 }
-                cache_features = false;
             }
         }
         
@@ -28,8 +28,17 @@
 #include <mapnik/rule.hpp>
 #include <mapnik/feature.hpp>
 #include <mapnik/enumeration.hpp>
+#include <mapnik/compiled_expression.hpp>
+#include <mapnik/rule_index.hpp>
+// boost
+#include <boost/shared_ptr.hpp>
+#ifdef MAPNIK_THREADSAFE
+#include <boost/thread/mutex.hpp>
+#endif
 // stl
 #include <vector>
+#include <set>
+#include <string>
 
 namespace mapnik
 {
@@ -43,11 +52,39 @@ enum filter_mode_enum {
 DEFINE_ENUM( filter_mode_e, filter_mode_enum );
 
 typedef std::vector<rule> rules;
+
+// the rules of a style which are active in a range of scales
+struct active_rules
+{
+    // all active rules, in style order
+    std::vector<rule const*> rules;
+    std::vector<rule const*> if_rules;
+    std::vector<rule const*> else_rules;
+    // attributes used by the filters and symbolizers of the rules
+    std::set<std::string> names;
+    // the filter of if_rules[i] is program i
+    compiled_expressions filters;
+    // or of the filters of if_rules, null if any feature may be
+    // rendered, e.g. by an else rule
+    expression_ptr filter;
+    rule_index filter_index;
+};
+
+typedef boost::shared_ptr<active_rules const> active_rules_ptr;
+
 class feature_type_style
 {
 private:
     rules  rules_;
     filter_mode_e filter_mode_;
+    // scales at which rules become active or inactive, sorted
+    mutable std::vector<double> scale_bounds_;
+    // active rules between consecutive scale bounds, built on demand
+    mutable std::vector<active_rules_ptr> active_rules_;
+#ifdef MAPNIK_THREADSAFE
+    mutable boost::mutex mutex_;
+#endif
+    void clear_active_rules();
 public:
     feature_type_style();
 
@@ -59,7 +96,13 @@ public:
         
     rules const& get_rules() const;
 
+    // rules are assumed to be changed through the returned reference,
+    // so the active rules are recomputed at the next get_active_rules()
     rules &get_rules_nonconst();
+
+    // rules active at scale_denom, cached per range of scales in which
+    // the same rules are active
+    active_rules_ptr get_active_rules(double scale_denom) const;
         
     void set_filter_mode(filter_mode_e mode);
 
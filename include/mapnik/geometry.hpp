@@ -303,6 +303,13 @@ public:
         return cont_.get_vertex(itr_++,x,y);
     }         
 
+    // random access which, unlike vertex(), leaves the iterator alone
+    // and so may be used on geometries shared between threads
+    unsigned get_vertex(unsigned pos, double* x, double* y) const
+    {
+        return cont_.get_vertex(pos,x,y);
+    }
+
     void rewind(unsigned ) const
     {
         itr_=0;
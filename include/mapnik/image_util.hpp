@@ -39,6 +39,7 @@
 namespace mapnik {
 
 class Map;    
+class rgba_palette;
 class ImageWriterException : public std::exception
 {
 private:
@@ -74,6 +75,18 @@ template <typename T>
 MAPNIK_DECL std::string save_to_string(T const& image,
                                        std::string const& type);
 
+// paletted png output with a fixed palette
+template <typename T>
+MAPNIK_DECL void save_to_file(T const& image,
+                              std::string const& filename,
+                              std::string const& type,
+                              rgba_palette const& palette);
+
+template <typename T>
+MAPNIK_DECL std::string save_to_string(T const& image,
+                                       std::string const& type,
+                                       rgba_palette const& palette);
+
 template <typename T>
 void save_as_png(T const& image,
                  std::string const& filename);
@@ -212,6 +225,21 @@ inline MAPNIK_DECL std::string save_to_string(image_32 const& image,
 {
     return save_to_string<image_data_32>(image.data(),type);
 }
+
+inline MAPNIK_DECL void save_to_file (image_32 const& image,
+                                      std::string const& file,
+                                      std::string const& type,
+                                      rgba_palette const& palette) 
+{
+    save_to_file<image_data_32>(image.data(),file,type,palette);
+}
+
+inline MAPNIK_DECL std::string save_to_string(image_32 const& image,
+                                              std::string const& type,
+                                              rgba_palette const& palette)
+{
+    return save_to_string<image_data_32>(image.data(),type,palette);
+}
    
 #ifdef _MSC_VER
 template MAPNIK_DECL void save_to_file<image_data_32>(image_data_32 const&,
@@ -33,36 +33,6 @@
 
 namespace mapnik
 {
-//this needs to be tree structure 
-//as a proof of a concept _only_ we use sequential scan 
-
-struct label_collision_detector
-{
-    typedef std::vector<box2d<double> > label_placements;
-
-    bool has_plasement(box2d<double> const& box)
-    {
-        label_placements::const_iterator itr=labels_.begin();
-        for( ; itr !=labels_.end();++itr)
-        {
-            if (itr->intersects(box))
-            {
-                return false;
-            }
-        }
-        labels_.push_back(box);
-        return true;
-    }
-    void clear()
-    {
-        labels_.clear();
-    }
-          
-private:
-
-    label_placements labels_;
-};
-
 // quad_tree based label collision detector
 class label_collision_detector2 : boost::noncopyable
 {
@@ -214,7 +184,19 @@ public:
     {
         tree_.insert(label(box, text), box);
     }
+
+    // bulk load a range of boxes, e.g. to pre-seed the detector with
+    // placements from neighbouring tiles
+    template <typename Iter>
+    void insert(Iter first, Iter last)
+    {
+        for ( ;first != last; ++first)
+        {
+            tree_.insert(label(*first), *first);
+        }
+    }
          
+    // removes all labels but keeps the tree nodes allocated
     void clear()
     {
         tree_.clear();
@@ -225,6 +207,10 @@ public:
         return tree_.extent();
     }
 };
+
+// collision detector shared by the text, shield, point, markers and glyph
+// processors of the renderers, change here to benchmark another detector
+typedef label_collision_detector4 label_collision_detector_type;
 }
 
 #endif // LABEL_COLLISION_DETECTOR_HPP
@@ -172,12 +172,13 @@ public:
     bool clear_label_cache() const; 
 
     /*!
-     * @param clear_cache Set whether this layer's features should be cached if used by multiple styles.
+     * @param clear_cache Set whether this layer's features should be cached in the
+     * feature_cache, shared by all styles and by later renders of the same area.
      */
     void set_cache_features(bool cache_features);
         
     /*!
-     * @return whether this layer's features will be cached if used by multiple styles
+     * @return whether this layer's features will be cached
      */
     bool cache_features() const; 
         
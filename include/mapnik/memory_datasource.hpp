@@ -27,6 +27,10 @@
 
 #include <mapnik/datasource.hpp>
 #include <mapnik/feature_factory.hpp> // TODO remove
+#include <mapnik/packed_rtree.hpp>
+#ifdef MAPNIK_THREADSAFE
+#include <boost/thread/mutex.hpp>
+#endif
 #include <vector>
 
 namespace mapnik {
@@ -35,9 +39,24 @@ class MAPNIK_DECL memory_datasource : public datasource
 {
     friend class memory_featureset;
 public:
+    // datasources with at least this many features are queried
+    // through a spatial index
+    static const std::size_t index_threshold = 128;
+
     memory_datasource();
+    // use_index: maintain a spatial index of the features, built
+    // lazily on the first query after features were added
+    explicit memory_datasource(bool use_index);
     virtual ~memory_datasource();
     void push(feature_ptr feature);
+    template <typename Iter>
+    void insert(Iter first, Iter last)
+    {
+        for ( ;first != last; ++first)
+        {
+            push(*first);
+        }
+    }
     int type() const;
     featureset_ptr features(const query& q) const;
     featureset_ptr features_at_point(coord2d const& pt) const;
@@ -45,7 +64,17 @@ public:
     layer_descriptor get_descriptor() const;
     size_t size() const;
 private:
+    featureset_ptr features_in_box(box2d<double> const& box) const;
+    void update_index() const;
     std::vector<feature_ptr> features_;
+    bool use_index_;
+    std::vector<box2d<double> > envelopes_;
+    // features_[0,indexed_) are in index_, the rest is scanned
+    mutable packed_rtree index_;
+    mutable std::size_t indexed_;
+#ifdef MAPNIK_THREADSAFE
+    mutable boost::mutex mutex_;
+#endif
 }; 
    
 // This class implements a simple way of displaying point-based data
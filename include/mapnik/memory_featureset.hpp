@@ -35,24 +35,48 @@ public:
     memory_featureset(box2d<double> const& bbox, memory_datasource const& ds)
         : bbox_(bbox),
           pos_(ds.features_.begin()),
-          end_(ds.features_.end())
+          end_(ds.features_.end()),
+          features_(ds.features_),
+          indexed_(false),
+          index_pos_(0)
     {}
+
+    // only visit the features at the given positions, candidates is swapped out
+    memory_featureset(box2d<double> const& bbox, memory_datasource const& ds,
+                      std::vector<unsigned> & candidates)
+        : bbox_(bbox),
+          pos_(ds.features_.begin()),
+          end_(ds.features_.end()),
+          features_(ds.features_),
+          indexed_(true),
+          index_pos_(0)
+    {
+        candidates_.swap(candidates);
+    }
+
     virtual ~memory_featureset() {}
         
     feature_ptr next()
     {
-        while (pos_ != end_)
+        if (indexed_)
         {
-            for  (unsigned i=0; i<(*pos_)->num_geometries();++i) {
-                geometry_type & geom = (*pos_)->get_geometry(i);
-#ifdef MAPNIK_DEBUG
-                std::clog << "bbox_=" << bbox_ << ", geom.envelope=" << geom.envelope() << "\n";
-#endif
-                if (bbox_.intersects(geom.envelope()))
+            while (index_pos_ < candidates_.size())
+            {
+                feature_ptr const& feature = features_[candidates_[index_pos_++]];
+                if (intersects(*feature))
                 {
-                    return *pos_++;
+                    return feature;
                 }
             }
+            return feature_ptr();
+        }
+
+        while (pos_ != end_)
+        {
+            if (intersects(**pos_))
+            {
+                return *pos_++;
+            }
             ++pos_;
         }
            
@@ -60,9 +84,28 @@ public:
     }
         
 private:
+    bool intersects(Feature const& feature) const
+    {
+        for  (unsigned i=0; i<feature.num_geometries();++i) {
+            geometry_type const& geom = feature.get_geometry(i);
+#ifdef MAPNIK_DEBUG
+            std::clog << "bbox_=" << bbox_ << ", geom.envelope=" << geom.envelope() << "\n";
+#endif
+            if (bbox_.intersects(geom.envelope()))
+            {
+                return true;
+            }
+        }
+        return false;
+    }
+
     box2d<double> bbox_;
     std::vector<feature_ptr>::const_iterator pos_;
     std::vector<feature_ptr>::const_iterator end_; 
+    std::vector<feature_ptr> const& features_;
+    bool indexed_;
+    std::vector<unsigned> candidates_;
+    std::size_t index_pos_;
 };
 }
 
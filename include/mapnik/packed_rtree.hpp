@@ -0,0 +1,173 @@
+/*****************************************************************************
+ *
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+
+//$Id$
+
+#ifndef MAPNIK_PACKED_RTREE_HPP
+#define MAPNIK_PACKED_RTREE_HPP
+
+// mapnik
+#include <mapnik/box2d.hpp>
+
+// stl
+#include <vector>
+#include <algorithm>
+#include <cmath>
+#include <cstddef>
+
+namespace mapnik
+{
+
+// Static R-tree over item bounding boxes, bulk loaded with the
+// sort-tile-recursive algorithm and stored level by level in flat
+// arrays. Items are identified by their index in the boxes passed to
+// build(); invalid (empty) boxes are never returned by queries.
+class packed_rtree
+{
+public:
+    static const unsigned node_size = 16;
+
+    packed_rtree() {}
+
+    void build(std::vector<box2d<double> > const& boxes)
+    {
+        clear();
+        std::vector<unsigned> ids;
+        ids.reserve(boxes.size());
+        for (unsigned i = 0; i < boxes.size(); ++i)
+        {
+            box2d<double> const& box = boxes[i];
+            if (box.minx() <= box.maxx() && box.miny() <= box.maxy()) ids.push_back(i);
+        }
+        if (ids.empty()) return;
+
+        // tile items into vertical slices by x, then sort each slice by y
+        std::size_t leaf_count = (ids.size() + node_size - 1) / node_size;
+        std::size_t slice_count = static_cast<std::size_t>(std::ceil(std::sqrt(double(leaf_count))));
+        std::size_t slice_size = ((leaf_count + slice_count - 1) / slice_count) * node_size;
+        std::sort(ids.begin(), ids.end(), center_less(boxes, true));
+        for (std::size_t start = 0; start < ids.size(); start += slice_size)
+        {
+            std::size_t end = std::min(start + slice_size, ids.size());
+            std::sort(ids.begin() + start, ids.begin() + end, center_less(boxes, false));
+        }
+
+        items_ = ids;
+        boxes_.reserve(ids.size() + ids.size() / (node_size - 1) + 1);
+        for (std::size_t i = 0; i < ids.size(); ++i)
+        {
+            boxes_.push_back(boxes[ids[i]]);
+        }
+        levels_.push_back(0);
+
+        // pack each level into parent nodes until a single root remains
+        std::size_t level_start = 0;
+        std::size_t level_end = boxes_.size();
+        while (level_end - level_start > 1)
+        {
+            levels_.push_back(level_end);
+            for (std::size_t i = level_start; i < level_end; i += node_size)
+            {
+                box2d<double> ext = boxes_[i];
+                std::size_t end = std::min(i + node_size, level_end);
+                for (std::size_t j = i + 1; j < end; ++j)
+                {
+                    ext.expand_to_include(boxes_[j]);
+                }
+                boxes_.push_back(ext);
+            }
+            level_start = level_end;
+            level_end = boxes_.size();
+        }
+    }
+
+    // append the ids of all items whose box intersects bbox, in no particular order
+    void query(box2d<double> const& bbox, std::vector<unsigned> & result) const
+    {
+        if (boxes_.empty()) return;
+        query_node(bbox, levels_.size() - 1, 0, result);
+    }
+
+    std::size_t size() const
+    {
+        return items_.size();
+    }
+
+    bool empty() const
+    {
+        return items_.empty();
+    }
+
+    void clear()
+    {
+        boxes_.clear();
+        items_.clear();
+        levels_.clear();
+    }
+
+private:
+    struct center_less
+    {
+        center_less(std::vector<box2d<double> > const& boxes, bool by_x)
+            : boxes_(boxes), by_x_(by_x) {}
+
+        bool operator() (unsigned a, unsigned b) const
+        {
+            box2d<double> const& ba = boxes_[a];
+            box2d<double> const& bb = boxes_[b];
+            if (by_x_)
+                return ba.minx() + ba.maxx() < bb.minx() + bb.maxx();
+            return ba.miny() + ba.maxy() < bb.miny() + bb.maxy();
+        }
+
+        std::vector<box2d<double> > const& boxes_;
+        bool by_x_;
+    };
+
+    void query_node(box2d<double> const& bbox, std::size_t level, std::size_t pos,
+                    std::vector<unsigned> & result) const
+    {
+        if (!bbox.intersects(boxes_[levels_[level] + pos])) return;
+        if (level == 0)
+        {
+            result.push_back(items_[pos]);
+            return;
+        }
+        std::size_t child_level_size = levels_[level] - levels_[level - 1];
+        std::size_t end = std::min((pos + 1) * node_size, child_level_size);
+        for (std::size_t child = pos * node_size; child < end; ++child)
+        {
+            query_node(bbox, level - 1, child, result);
+        }
+    }
+
+    // boxes of all levels, starting with the items in leaf order
+    std::vector<box2d<double> > boxes_;
+    // item ids in leaf order
+    std::vector<unsigned> items_;
+    // offset of each level in boxes_
+    std::vector<std::size_t> levels_;
+};
+
+}
+
+#endif // MAPNIK_PACKED_RTREE_HPP
@@ -0,0 +1,123 @@
+/*****************************************************************************
+ *
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+
+//$Id$
+
+#ifndef MAPNIK_PALETTE_HPP
+#define MAPNIK_PALETTE_HPP
+
+// mapnik
+#include <mapnik/config.hpp>
+#include <mapnik/global.hpp>
+#include <mapnik/octree.hpp>
+#include <mapnik/hextree.hpp>
+
+// boost
+#include <boost/utility.hpp>
+
+// stl
+#include <vector>
+#include <string>
+#include <stdexcept>
+
+namespace mapnik {
+
+class palette_error : public std::runtime_error
+{
+public:
+    palette_error(std::string const& what)
+        : std::runtime_error(what) {}
+};
+
+// A fixed palette for paletted (png256) output, shared by all images
+// encoded with it. Colors are matched through a lookup table built once
+// per palette, so encoding an image costs one table lookup per pixel
+// instead of building and querying a quantization tree.
+class MAPNIK_DECL rgba_palette : private boost::noncopyable
+{
+public:
+    enum palette_type
+    {
+        PALETTE_RGBA = 0,
+        PALETTE_RGB = 1,
+        PALETTE_ACT = 2
+    };
+
+    // palette from packed rgba, rgb or Adobe Color Table (.act) data
+    explicit rgba_palette(std::string const& pal, palette_type type = PALETTE_RGBA);
+    explicit rgba_palette(std::vector<rgba> const& colors);
+
+    inline byte quantize(byte r, byte g, byte b, byte a) const
+    {
+        if (a == 0 && transparent_index_ >= 0)
+        {
+            return transparent_index_;
+        }
+        unsigned level = alpha_levels_ == 1 ? 0 : alpha_level(a);
+        return lut_[(level << (3 * LUT_BITS)) |
+                    ((r >> (8 - LUT_BITS)) << (2 * LUT_BITS)) |
+                    ((g >> (8 - LUT_BITS)) << LUT_BITS) |
+                    (b >> (8 - LUT_BITS))];
+    }
+
+    unsigned size() const
+    {
+        return colors_.size();
+    }
+
+    std::vector<rgb> const& palette() const
+    {
+        return rgb_pal_;
+    }
+
+    std::vector<unsigned> const& alpha_table() const
+    {
+        return alpha_pal_;
+    }
+
+    // packed rgba data, suitable for the PALETTE_RGBA constructor
+    std::string to_string() const;
+
+private:
+    // bits per color channel in the lookup table
+    static const unsigned LUT_BITS = 5;
+    // opaque pixels get their own alpha level
+    static const unsigned ALPHA_LEVELS = 9;
+
+    static unsigned alpha_level(byte a)
+    {
+        return a == 255 ? ALPHA_LEVELS - 1 : a >> 5;
+    }
+
+    void init();
+
+    std::vector<rgba> colors_;
+    std::vector<rgb> rgb_pal_;
+    std::vector<unsigned> alpha_pal_;
+    std::vector<byte> lut_;
+    unsigned alpha_levels_;
+    int transparent_index_;
+};
+
+}
+
+#endif // MAPNIK_PALETTE_HPP
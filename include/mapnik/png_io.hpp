@@ -28,11 +28,13 @@
 #include <mapnik/global.hpp>
 #include <mapnik/octree.hpp>
 #include <mapnik/hextree.hpp>
+#include <mapnik/palette.hpp>
 #include <mapnik/global.hpp>
 
 extern "C"
 {
 #include <png.h>
+#include <zlib.h>
 }
 
 #define MAX_OCTREE_LEVELS 4
@@ -66,7 +68,10 @@ void flush_data (png_structp png_ptr)
 }
 
 template <typename T1, typename T2>
-void save_as_png(T1 & file , T2 const& image)
+void save_as_png(T1 & file , T2 const& image,
+                 int compression = Z_DEFAULT_COMPRESSION,
+                 int strategy = -1,
+                 int filter = PNG_FILTER_NONE)
 {        
     png_voidp error_ptr=0;
     png_structp png_ptr=png_create_write_struct(PNG_LIBPNG_VER_STRING,
@@ -81,7 +86,7 @@ void save_as_png(T1 & file , T2 const& image)
     mask = png_get_asm_flagmask(PNG_SELECT_READ | PNG_SELECT_WRITE);
     png_set_asm_flags(png_ptr, flags | mask);
 #endif
-    png_set_filter (png_ptr, 0, PNG_FILTER_NONE);
+    png_set_filter (png_ptr, 0, filter);
     png_infop info_ptr = png_create_info_struct(png_ptr);
     if (!info_ptr)
     {
@@ -95,8 +100,10 @@ void save_as_png(T1 & file , T2 const& image)
     }
     png_set_write_fn (png_ptr, &file, &write_data<T1>, &flush_data<T1>);
         
-    //png_set_compression_level(png_ptr, Z_BEST_COMPRESSION);
-    //png_set_compression_strategy(png_ptr, Z_FILTERED);
+    png_set_compression_level(png_ptr, compression);
+    // leave the strategy to libpng unless requested, which picks one based on the filter
+    if (strategy >= 0)
+        png_set_compression_strategy(png_ptr, strategy);
     png_set_IHDR(png_ptr, info_ptr,image.width(),image.height(),8,
                  PNG_COLOR_TYPE_RGB_ALPHA,PNG_INTERLACE_NONE,
                  PNG_COMPRESSION_TYPE_DEFAULT,PNG_FILTER_TYPE_DEFAULT);
@@ -215,7 +222,10 @@ void save_as_png(T & file, std::vector<mapnik::rgb> & palette,
                  unsigned width,
                  unsigned height,
                  unsigned color_depth,
-                 std::vector<unsigned> &alpha)
+                 std::vector<unsigned> &alpha,
+                 int compression = Z_DEFAULT_COMPRESSION,
+                 int strategy = -1,
+                 int filter = PNG_FILTER_NONE)
 {
     png_voidp error_ptr=0;
     png_structp png_ptr=png_create_write_struct(PNG_LIBPNG_VER_STRING,
@@ -230,7 +240,7 @@ void save_as_png(T & file, std::vector<mapnik::rgb> & palette,
     mask = png_get_asm_flagmask(PNG_SELECT_READ | PNG_SELECT_WRITE);
     png_set_asm_flags(png_ptr, flags | mask);
 #endif
-    png_set_filter (png_ptr, 0, PNG_FILTER_NONE);
+    png_set_filter (png_ptr, 0, filter);
     png_infop info_ptr = png_create_info_struct(png_ptr);
     if (!info_ptr)
     {
@@ -244,6 +254,11 @@ void save_as_png(T & file, std::vector<mapnik::rgb> & palette,
     }
     png_set_write_fn (png_ptr, &file, &write_data<T>, &flush_data<T>);
 
+    png_set_compression_level(png_ptr, compression);
+    // leave the strategy to libpng unless requested, which picks one based on the filter
+    if (strategy >= 0)
+        png_set_compression_strategy(png_ptr, strategy);
+
     png_set_IHDR(png_ptr, info_ptr,width,height,color_depth,
                  PNG_COLOR_TYPE_PALETTE,PNG_INTERLACE_NONE,
                  PNG_COMPRESSION_TYPE_DEFAULT,PNG_FILTER_TYPE_DEFAULT);
@@ -276,7 +291,8 @@ void save_as_png(T & file, std::vector<mapnik::rgb> & palette,
 }
 
 template <typename T1,typename T2>
-void save_as_png256(T1 & file, T2 const& image, const unsigned max_colors = 256, int trans_mode = -1)
+void save_as_png256(T1 & file, T2 const& image, const unsigned max_colors = 256, int trans_mode = -1,
+                    int compression = Z_DEFAULT_COMPRESSION, int strategy = -1, int filter = PNG_FILTER_NONE)
 {
     // number of alpha ranges in png256 format; 2 results in smallest image with binary transparency
     // 3 is minimum for semitransparency, 4 is recommended, anything else is worse
@@ -421,7 +437,7 @@ void save_as_png256(T1 & file, T2 const& image, const unsigned max_colors = 256,
         // >16 && <=256 colors -> write 8-bit color depth
         image_data_8 reduced_image(width,height);
         reduce_8(image, reduced_image, trees, limits, TRANSPARENCY_LEVELS, alphaTable);
-        save_as_png(file,palette,reduced_image,width,height,8,alphaTable);
+        save_as_png(file,palette,reduced_image,width,height,8,alphaTable, compression, strategy, filter);
     }
     else if (palette.size() == 1)
     {
@@ -434,7 +450,7 @@ void save_as_png256(T1 & file, T2 const& image, const unsigned max_colors = 256,
             alphaTable.resize(1);
             alphaTable[0] = meanAlpha;
         }
-        save_as_png(file,palette,reduced_image,width,height,1,alphaTable);
+        save_as_png(file,palette,reduced_image,width,height,1,alphaTable, compression, strategy, filter);
     }
     else
     {
@@ -443,12 +459,13 @@ void save_as_png256(T1 & file, T2 const& image, const unsigned max_colors = 256,
         unsigned image_height = height;
         image_data_8 reduced_image(image_width,image_height);
         reduce_4(image, reduced_image, trees, limits, TRANSPARENCY_LEVELS, alphaTable);
-        save_as_png(file,palette,reduced_image,width,height,4,alphaTable);
+        save_as_png(file,palette,reduced_image,width,height,4,alphaTable, compression, strategy, filter);
     }
 }
 
 template <typename T1,typename T2>
-void save_as_png256_hex(T1 & file, T2 const& image, int colors = 256, int trans_mode = -1, double gamma = 2.0)
+void save_as_png256_hex(T1 & file, T2 const& image, int colors = 256, int trans_mode = -1, double gamma = 2.0,
+                        int compression = Z_DEFAULT_COMPRESSION, int strategy = -1, int filter = PNG_FILTER_NONE)
 {
     unsigned width = image.width();
     unsigned height = image.height();
@@ -500,7 +517,7 @@ void save_as_png256_hex(T1 & file, T2 const& image, int colors = 256, int trans_
                 row_out[x] = tree.quantize(c);
             }
         }
-        save_as_png(file, palette, reduced_image, width, height, 8, alphaTable);
+        save_as_png(file, palette, reduced_image, width, height, 8, alphaTable, compression, strategy, filter);
     }
     else if (palette.size() == 1)
     {
@@ -509,7 +526,7 @@ void save_as_png256_hex(T1 & file, T2 const& image, int colors = 256, int trans_
         unsigned image_height = height;
         image_data_8 reduced_image(image_width, image_height);
         reduced_image.set(0);
-        save_as_png(file, palette, reduced_image, width, height, 1, alphaTable);
+        save_as_png(file, palette, reduced_image, width, height, 1, alphaTable, compression, strategy, filter);
     }
     else
     {
@@ -532,9 +549,69 @@ void save_as_png256_hex(T1 & file, T2 const& image, int colors = 256, int trans_
                 row_out[x>>1] |= index;
             }
         }
-        save_as_png(file, palette, reduced_image, width, height, 4, alphaTable);
+        save_as_png(file, palette, reduced_image, width, height, 4, alphaTable, compression, strategy, filter);
     }
 }   
+
+template <typename T1,typename T2>
+void save_as_png8_pal(T1 & file, T2 const& image, rgba_palette const& pal,
+                      int compression = Z_DEFAULT_COMPRESSION, int strategy = -1, int filter = PNG_FILTER_NONE)
+{
+    unsigned width = image.width();
+    unsigned height = image.height();
+    std::vector<mapnik::rgb> palette(pal.palette());
+    std::vector<unsigned> alphaTable(pal.alpha_table());
+
+    if (palette.size() > 16 )
+    {
+        // >16 && <=256 colors -> write 8-bit color depth
+        image_data_8 reduced_image(width, height);
+
+        for (unsigned y = 0; y < height; ++y)
+        {
+            mapnik::image_data_32::pixel_type const * row = image.getRow(y);
+            mapnik::image_data_8::pixel_type  * row_out = reduced_image.getRow(y);
+
+            for (unsigned x = 0; x < width; ++x)
+            {
+                unsigned val = row[x];
+                row_out[x] = pal.quantize(U2RED(val), U2GREEN(val), U2BLUE(val), U2ALPHA(val));
+            }
+        }
+        save_as_png(file, palette, reduced_image, width, height, 8, alphaTable, compression, strategy, filter);
+    }
+    else if (palette.size() == 1)
+    {
+        // 1 color image ->  write 1-bit color depth PNG
+        unsigned image_width  = (int(0.125*width) + 7)&~7;
+        unsigned image_height = height;
+        image_data_8 reduced_image(image_width, image_height);
+        reduced_image.set(0);
+        save_as_png(file, palette, reduced_image, width, height, 1, alphaTable, compression, strategy, filter);
+    }
+    else
+    {
+        // <=16 colors -> write 4-bit color depth PNG
+        unsigned image_width  = (int(0.5*width) + 3)&~3;
+        unsigned image_height = height;
+        image_data_8 reduced_image(image_width, image_height);
+        for (unsigned y = 0; y < height; ++y)
+        {
+            mapnik::image_data_32::pixel_type const * row = image.getRow(y);
+            mapnik::image_data_8::pixel_type  * row_out = reduced_image.getRow(y);
+            byte index = 0;
+
+            for (unsigned x = 0; x < width; ++x)
+            {
+                unsigned val = row[x];
+                index = pal.quantize(U2RED(val), U2GREEN(val), U2BLUE(val), U2ALPHA(val));
+                if (x%2 == 0) index = index<<4;
+                row_out[x>>1] |= index;
+            }
+        }
+        save_as_png(file, palette, reduced_image, width, height, 4, alphaTable, compression, strategy, filter);
+    }
+}
 }
 
 #endif // MAPNIK_PNG_IO_HPP
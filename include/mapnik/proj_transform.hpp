@@ -29,6 +29,8 @@
 #include <mapnik/projection.hpp>
 // boost
 #include <boost/utility.hpp>
+// stl
+#include <cstddef>
 
 namespace mapnik {
     
@@ -41,6 +43,9 @@ public:
     bool equal() const;
     bool forward (double& x, double& y , double& z) const;
     bool backward (double& x, double& y , double& z) const;
+    // transform point_count points in place, z may be null
+    bool forward (double * x, double * y , double * z, std::size_t point_count) const;
+    bool backward (double * x, double * y , double * z, std::size_t point_count) const;
     mapnik::projection const& source() const;
     mapnik::projection const& dest() const;
         
@@ -50,6 +55,9 @@ private:
     bool is_source_longlat_;
     bool is_dest_longlat_;
     bool is_source_equal_dest_;
+    // closed-form transforms between WGS84 and spherical mercator
+    bool wgs84_to_merc_;
+    bool merc_to_wgs84_;
 };
 }
 
@@ -27,6 +27,7 @@
 
 // mapnik
 #include <mapnik/box2d.hpp>
+#include <mapnik/well_known_srs.hpp>
 
 // proj4
 #include <proj_api.h>
@@ -37,10 +38,12 @@
 #endif
 
 #include <boost/utility.hpp>
+#include <boost/optional.hpp>
 // stl
 #include <string>
 #include <iostream>
 #include <stdexcept>
+#include <cstddef>
 
 namespace mapnik {
     
@@ -65,9 +68,13 @@ public:
     bool is_initialized() const;
     bool is_geographic() const;
     std::string const& params() const;
+    boost::optional<well_known_srs_e> well_known() const;
       
     void forward(double & x, double &y ) const;
     void inverse(double & x,double & y) const;
+    // project point_count points in place
+    void forward(double * x, double * y, std::size_t point_count) const;
+    void inverse(double * x, double * y, std::size_t point_count) const;
         
 private:
     void init(); 
@@ -77,6 +84,7 @@ private:
     std::string params_;
     projPJ proj_;
     bool is_geographic_;
+    boost::optional<well_known_srs_e> well_known_;
 #if PJ_VERSION >= 480
     projCtx proj_ctx_;
 #elif defined(MAPNIK_THREADSAFE)
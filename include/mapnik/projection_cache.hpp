@@ -0,0 +1,103 @@
+/*****************************************************************************
+ *
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+
+//$Id$
+
+#ifndef MAPNIK_PROJECTION_CACHE_HPP
+#define MAPNIK_PROJECTION_CACHE_HPP
+
+// mapnik
+#include <mapnik/config.hpp>
+#include <mapnik/utils.hpp>
+#include <mapnik/projection.hpp>
+#include <mapnik/proj_transform.hpp>
+
+// boost
+#include <boost/utility.hpp>
+#include <boost/shared_ptr.hpp>
+#ifdef MAPNIK_THREADSAFE
+#include <boost/thread/mutex.hpp>
+#endif
+
+// stl
+#include <string>
+#include <cstddef>
+
+namespace mapnik
+{
+
+typedef boost::shared_ptr<projection const> projection_ptr;
+typedef boost::shared_ptr<proj_transform const> proj_transform_ptr;
+
+struct projection_cache_stats
+{
+    projection_cache_stats()
+        : projection_hits(0),
+          projection_misses(0),
+          transform_hits(0),
+          transform_misses(0),
+          projections(0),
+          transforms(0) {}
+
+    std::size_t projection_hits;
+    std::size_t projection_misses;
+    std::size_t transform_hits;
+    std::size_t transform_misses;
+    std::size_t projections;
+    std::size_t transforms;
+};
+
+// Cache of initialized projections and transforms, keyed by their
+// whitespace normalized PROJ.4 definition. Initializing a projection
+// may read the epsg init files from disk, so renderers look projections
+// up here instead of creating them for every layer of every map.
+//
+// Cached objects are not shared between threads: with proj >= 4.8 every
+// projection owns a projCtx, which may only be used by one thread at a
+// time, so each thread initializes and caches its own objects. Hit and
+// miss counts and clear() apply to all threads.
+struct MAPNIK_DECL projection_cache :
+        public singleton <projection_cache, CreateStatic>,
+        private boost::noncopyable
+{
+    friend class CreateStatic<projection_cache>;
+    // definitions beyond this are still initialized but not cached
+    static const std::size_t max_entries = 1024;
+#ifdef MAPNIK_THREADSAFE
+    static boost::mutex mutex_;
+#endif
+    static projection_cache_stats stats_;
+    // incremented by clear(), threads drop their entries when it changed
+    static std::size_t generation_;
+
+    // throws proj_init_error if the definition is invalid
+    static projection_ptr get(std::string const& params);
+    static proj_transform_ptr get_transform(std::string const& source, std::string const& dest);
+    // projections and transforms are counted for the calling thread
+    static projection_cache_stats stats();
+    static void clear();
+    static std::string normalize(std::string const& params);
+};
+
+}
+
+#endif // MAPNIK_PROJECTION_CACHE_HPP
@@ -135,12 +135,16 @@ public:
         return  nodes_.end();
     }
           
+    // removes all items, but keeps the nodes and the capacity of their
+    // containers so that refilling the tree does not allocate again
     void clear () 
     {
-        box2d<double> ext = root_->extent_;
-        nodes_.clear();
-        nodes_.push_back(new node(ext));
-        root_ = &nodes_[0];
+        iterator itr = nodes_.begin();
+        iterator end = nodes_.end();
+        for ( ;itr != end; ++itr)
+        {
+            itr->cont_.clear();
+        }
     }
     
     box2d<double> const& extent() const
@@ -28,6 +28,7 @@
 //mapnik
 #include <mapnik/box2d.hpp>
 #include <mapnik/feature.hpp>
+#include <mapnik/filter_factory.hpp>
 
 // boost
 #include <boost/tuple/tuple.hpp>
@@ -47,21 +48,25 @@ private:
     resolution_type resolution_;
     double scale_denominator_;
     double filter_factor_;
+    double pixel_size_;
     std::set<std::string> names_;
+    expression_ptr filter_;
 public:
          
     query(box2d<double> const& bbox, resolution_type const& resolution, double scale_denominator = 1.0)
         : bbox_(bbox),
           resolution_(resolution),
           scale_denominator_(scale_denominator),
-          filter_factor_(1.0)
+          filter_factor_(1.0),
+          pixel_size_(0.0)
     {}
 
     query(box2d<double> const& bbox)
         : bbox_(bbox),
           resolution_(resolution_type(1.0,1.0)),
           scale_denominator_(1.0),
-          filter_factor_(1.0)
+          filter_factor_(1.0),
+          pixel_size_(0.0)
     {}
     
     query(query const& other)
@@ -69,7 +74,9 @@ public:
           resolution_(other.resolution_),
           scale_denominator_(other.scale_denominator_),
           filter_factor_(other.filter_factor_),
-          names_(other.names_)
+          pixel_size_(other.pixel_size_),
+          names_(other.names_),
+          filter_(other.filter_)
     {}
          
     query& operator=(query const& other)
@@ -79,7 +86,9 @@ public:
         resolution_=other.resolution_;
         scale_denominator_=other.scale_denominator_;
         filter_factor_=other.filter_factor_;
+        pixel_size_=other.pixel_size_;
         names_=other.names_;
+        filter_=other.filter_;
         return *this;
     }
          
@@ -108,6 +117,18 @@ public:
         filter_factor_ = factor;
     }
              
+    // width of a pixel in the units of the layer srs, 0 if unknown.
+    // resolution is in map units, which differ for reprojected layers.
+    double get_pixel_size() const
+    {
+        return pixel_size_;
+    }
+
+    void set_pixel_size(double size)
+    {
+        pixel_size_ = size;
+    }
+
     void add_property_name(std::string const& name)
     {
         names_.insert(name);
@@ -117,6 +138,18 @@ public:
     {
         return names_;
     }
+
+    // features which don't pass filter won't be rendered, so datasources
+    // may leave them out. Null if all features are wanted.
+    expression_ptr const& get_filter() const
+    {
+        return filter_;
+    }
+
+    void set_filter(expression_ptr const& filter)
+    {
+        filter_ = filter;
+    }
 };
 }
 
@@ -0,0 +1,100 @@
+/*****************************************************************************
+ *
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+
+//$Id$
+
+
+#ifndef MAPNIK_RULE_INDEX_HPP
+#define MAPNIK_RULE_INDEX_HPP
+
+// mapnik
+#include <mapnik/config.hpp>
+#include <mapnik/feature.hpp>
+#include <mapnik/filter_factory.hpp>
+// boost
+#include <boost/unordered_map.hpp>
+// icu
+#include <unicode/unistr.h>
+// stl
+#include <vector>
+#include <string>
+
+namespace mapnik {
+
+// Index of rule filters by the value of one attribute, for styles with
+// many filters like [highway] = 'primary'. A filter which can only be
+// true if the attribute equals one of a few literals is filed under
+// these literals, all other filters are candidates for every feature.
+// Candidates are in rule order and filters which are not candidates are
+// false, so evaluating only the candidates gives the same result as
+// evaluating all filters, also with FILTER_FIRST.
+class MAPNIK_DECL rule_index
+{
+public:
+    rule_index() {}
+
+    // index filters, the id of filters[i] is i
+    explicit rule_index(std::vector<expression_ptr> const& filters);
+
+    // ids of the filters which may be true for feature, in increasing order
+    std::vector<unsigned> const& candidates(Feature const& feature) const;
+
+    // the attribute the filters are indexed by, empty if not indexed
+    std::string const& attribute() const
+    {
+        return attribute_;
+    }
+
+    bool indexed() const
+    {
+        return !attribute_.empty();
+    }
+
+private:
+    struct unicode_hash
+    {
+        std::size_t operator() (UnicodeString const& str) const
+        {
+            return str.hashCode();
+        }
+    };
+
+    typedef boost::unordered_map<UnicodeString,std::vector<unsigned>,unicode_hash> string_table;
+    typedef boost::unordered_map<double,std::vector<unsigned> > number_table;
+
+    struct find_bucket;
+    struct insert_bucket;
+    friend struct find_bucket;
+    friend struct insert_bucket;
+
+    std::string attribute_;
+    // filters which are candidates for every feature
+    std::vector<unsigned> unindexed_;
+    // filed filters merged with the unindexed ones, by literal
+    string_table strings_;
+    number_table numbers_;
+    std::vector<unsigned> bools_[2];
+};
+
+}
+
+#endif // MAPNIK_RULE_INDEX_HPP
@@ -25,8 +25,17 @@
 #ifndef SQL_UTILS_HPP
 #define SQL_UTILS_HPP
 
+// mapnik
+#include <mapnik/expression_node.hpp>
+
 // boost
 #include <boost/algorithm/string.hpp>
+#include <boost/variant.hpp>
+
+// stl
+#include <string>
+#include <sstream>
+#include <limits>
 
 namespace mapnik
 {
@@ -54,6 +63,269 @@ MAPNIK_DECL std::string table_from_sql(const std::string& sql)
     return table_name;
 }
 
+// Translation of rule filters to sql conditions. Comparisons with null
+// are false in filters and sql, except under not, so the operand of not
+// is coalesced to false. Filters which can't be translated exactly are
+// translated to weaker conditions where possible, e.g. the translatable
+// side of an and, as features are still filtered after the query.
+namespace sql_detail {
+
+enum translation
+{
+    NOT_TRANSLATED,
+    WEAKER,
+    EXACT
+};
+
+inline std::string quote_identifier(std::string const& name)
+{
+    return "\"" + boost::algorithm::replace_all_copy(name, "\"", "\"\"") + "\"";
+}
+
+// operands of comparisons, false if they can't be translated. Arithmetic
+// is left out: with a null operand it yields the other operand in
+// filters, but null in sql.
+struct sql_operand : boost::static_visitor<bool>
+{
+    sql_operand(std::string & sql, bool boolean_literals)
+        : sql_(sql),
+          boolean_literals_(boolean_literals) {}
+
+    template <typename T>
+    bool operator() (T const&) const
+    {
+        return false;
+    }
+
+    bool operator() (value_type const& val) const
+    {
+        return boost::apply_visitor(*this, val.base());
+    }
+
+    bool operator() (value_null) const
+    {
+        return false;
+    }
+
+    bool operator() (bool val) const
+    {
+        if (boolean_literals_) sql_ += val ? "TRUE" : "FALSE";
+        else sql_ += val ? "1" : "0";
+        return true;
+    }
+
+    bool operator() (int val) const
+    {
+        std::ostringstream s;
+        s << val;
+        sql_ += s.str();
+        return true;
+    }
+
+    bool operator() (double val) const
+    {
+        if (val != val || val == std::numeric_limits<double>::infinity() ||
+            val == -std::numeric_limits<double>::infinity())
+        {
+            return false;
+        }
+        std::ostringstream s;
+        s.precision(17);
+        s << val;
+        // keep the literal a float for sql
+        if (s.str().find_first_of(".eE") == std::string::npos) s << ".0";
+        sql_ += s.str();
+        return true;
+    }
+
+    bool operator() (UnicodeString const& val) const
+    {
+        std::string utf8;
+        to_utf8(val, utf8);
+        // backslashes are escapes in some postgresql configurations
+        if (utf8.find('\\') != std::string::npos || utf8.find('\0') != std::string::npos) return false;
+        sql_ += "'";
+        sql_ += boost::algorithm::replace_all_copy(utf8, "'", "''");
+        sql_ += "'";
+        return true;
+    }
+
+    bool operator() (attribute const& attr) const
+    {
+        sql_ += quote_identifier(attr.name());
+        return true;
+    }
+
+    std::string & sql_;
+    bool boolean_literals_;
+};
+
+// boolean conditions
+struct sql_condition : boost::static_visitor<translation>
+{
+    sql_condition(std::string & sql, bool boolean_literals)
+        : sql_(sql),
+          boolean_literals_(boolean_literals) {}
+
+    template <typename T>
+    translation operator() (T const&) const
+    {
+        return NOT_TRANSLATED;
+    }
+
+    translation operator() (value_type const& val) const
+    {
+        literal(val.to_bool());
+        return EXACT;
+    }
+
+    translation operator() (binary_node<tags::less> const& x) const
+    {
+        return comparison(x.left, x.right, " < ", true);
+    }
+
+    translation operator() (binary_node<tags::less_equal> const& x) const
+    {
+        return comparison(x.left, x.right, " <= ", true);
+    }
+
+    translation operator() (binary_node<tags::greater> const& x) const
+    {
+        return comparison(x.left, x.right, " > ", true);
+    }
+
+    translation operator() (binary_node<tags::greater_equal> const& x) const
+    {
+        return comparison(x.left, x.right, " >= ", true);
+    }
+
+    translation operator() (binary_node<tags::equal_to> const& x) const
+    {
+        return comparison(x.left, x.right, " = ");
+    }
+
+    translation operator() (binary_node<tags::not_equal_to> const& x) const
+    {
+        return comparison(x.left, x.right, " <> ");
+    }
+
+    translation operator() (binary_node<tags::logical_and> const& x) const
+    {
+        std::size_t size = sql_.size();
+        sql_ += "(";
+        translation left = boost::apply_visitor(*this, x.left);
+        if (left == NOT_TRANSLATED)
+        {
+            // the right side alone is weaker
+            sql_.resize(size);
+            return boost::apply_visitor(*this, x.right) == NOT_TRANSLATED ? NOT_TRANSLATED : WEAKER;
+        }
+        std::size_t left_size = sql_.size();
+        sql_ += " AND ";
+        translation right = boost::apply_visitor(*this, x.right);
+        if (right == NOT_TRANSLATED)
+        {
+            // the left side alone is weaker
+            sql_.resize(left_size);
+            sql_.erase(size, 1);
+            return WEAKER;
+        }
+        sql_ += ")";
+        return std::min(left, right);
+    }
+
+    translation operator() (binary_node<tags::logical_or> const& x) const
+    {
+        std::size_t size = sql_.size();
+        sql_ += "(";
+        translation left = boost::apply_visitor(*this, x.left);
+        if (left == NOT_TRANSLATED) return fail(size);
+        sql_ += " OR ";
+        translation right = boost::apply_visitor(*this, x.right);
+        if (right == NOT_TRANSLATED) return fail(size);
+        sql_ += ")";
+        return std::min(left, right);
+    }
+
+    translation operator() (unary_node<tags::logical_not> const& x) const
+    {
+        std::size_t size = sql_.size();
+        sql_ += "(NOT COALESCE(";
+        if (boost::apply_visitor(*this, x.expr) != EXACT) return fail(size);
+        sql_ += ", ";
+        literal(false);
+        sql_ += "))";
+        return EXACT;
+    }
+
+    translation comparison(expr_node const& left, expr_node const& right, const char* op,
+                           bool ordered = false) const
+    {
+        // comparisons with null are always false in filters
+        value_type const* val = boost::get<value_type>(&left);
+        if (!val) val = boost::get<value_type>(&right);
+        if (val && boost::get<value_null>(&val->base()))
+        {
+            literal(false);
+            return EXACT;
+        }
+        // filters order strings by code point, sql by the collation of
+        // the database, so only orderings against a number are translated
+        if (ordered && !is_number(left) && !is_number(right))
+        {
+            return NOT_TRANSLATED;
+        }
+        std::size_t size = sql_.size();
+        sql_ += "(";
+        if (!boost::apply_visitor(sql_operand(sql_, boolean_literals_), left)) return fail(size);
+        sql_ += op;
+        if (!boost::apply_visitor(sql_operand(sql_, boolean_literals_), right)) return fail(size);
+        sql_ += ")";
+        return EXACT;
+    }
+
+    static bool is_number(expr_node const& node)
+    {
+        value_type const* val = boost::get<value_type>(&node);
+        return val && (boost::get<int>(&val->base()) || boost::get<double>(&val->base()));
+    }
+
+    void literal(bool val) const
+    {
+        if (boolean_literals_) sql_ += val ? "TRUE" : "FALSE";
+        else sql_ += val ? "(1=1)" : "(1=0)";
+    }
+
+    translation fail(std::size_t size) const
+    {
+        sql_.resize(size);
+        return NOT_TRANSLATED;
+    }
+
+    std::string & sql_;
+    bool boolean_literals_;
+};
+
+}
+
+// sql condition that holds for all features passing filter, and maybe
+// others. Empty if there is no such condition other than true. Unless
+// boolean_literals is set, booleans are written as 1 and 0.
+inline std::string sql_from_filter(expr_node const& filter, bool boolean_literals = true)
+{
+    std::string sql;
+    if (boost::apply_visitor(sql_detail::sql_condition(sql, boolean_literals), filter) == sql_detail::NOT_TRANSLATED)
+    {
+        return std::string();
+    }
+    value_type const* val = boost::get<value_type>(&filter);
+    if (val && val->to_bool())
+    {
+        return std::string();
+    }
+    return sql;
+}
+
 }
 
 #endif //SQL_UTILS_HPP
@@ -31,6 +31,7 @@
 #include <unicode/ucnv.h>
 // boost
 #include <boost/utility.hpp>
+#include <boost/cstdint.hpp>
 // stl
 #include <string>
 
@@ -39,7 +40,8 @@ class MAPNIK_DECL transcoder : private boost::noncopyable
 {
 public:
     explicit transcoder (std::string const& encoding);
-    UnicodeString transcode(const char* data) const;  
+    // length -1 means data is null terminated
+    UnicodeString transcode(const char* data, boost::int32_t length = -1) const;  
     ~transcoder(); 
 private:
     bool ok_;
@@ -0,0 +1,58 @@
+/*****************************************************************************
+ * 
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+
+//$Id$
+
+#ifndef MAPNIK_WELL_KNOWN_SRS_HPP
+#define MAPNIK_WELL_KNOWN_SRS_HPP
+
+// mapnik
+#include <mapnik/config.hpp>
+
+// boost
+#include <boost/optional.hpp>
+
+// stl
+#include <string>
+#include <cstddef>
+
+namespace mapnik {
+
+// spatial reference systems with closed-form transforms between them
+enum well_known_srs_e
+{
+    WGS_84 = 1,       // geographic WGS84, e.g. +init=epsg:4326
+    G_MERC = 2        // spherical (web) mercator, e.g. +init=epsg:3857 or 900913
+};
+
+// recognise the proj4 definition of a well known srs
+MAPNIK_DECL boost::optional<well_known_srs_e> is_well_known_srs(std::string const& params);
+
+// transform point_count points in place between WGS84 degrees and spherical
+// mercator meters, matching proj4. Points that proj4 cannot transform (the
+// poles) are set to HUGE_VAL and false is returned.
+MAPNIK_DECL bool lonlat2merc(double * x, double * y, std::size_t point_count);
+MAPNIK_DECL bool merc2lonlat(double * x, double * y, std::size_t point_count);
+
+}
+
+#endif // MAPNIK_WELL_KNOWN_SRS_HPP
@@ -34,17 +34,68 @@ extern "C"
 
 #include "resultset.hpp"
 
+#include <map>
+
 class ResultSet;
 class Connection
 {
    private:
+      typedef std::map<void const*,PGresult*> result_map;
+
       PGconn *conn_;
       int cursorId;
       bool closed_;
+      // owner of the query sent with sendQuery, if its result is not collected yet
+      mutable void const* pending_owner_;
+      // results collected for their owner because the connection was used meanwhile
+      mutable result_map results_;
+
+      // wait for the query in flight, so the connection can be used
+      void collect_pending() const
+      {
+         if (!pending_owner_) return;
+         PGresult *result;
+         while ((result=PQgetResult(conn_)))
+         {
+            if (results_.find(pending_owner_) == results_.end())
+               results_[pending_owner_] = result;
+            else
+               PQclear(result);
+         }
+         pending_owner_=0;
+      }
+
+      void clear_results()
+      {
+         pending_owner_=0;
+         for (result_map::iterator itr=results_.begin();itr!=results_.end();++itr)
+         {
+            PQclear(itr->second);
+         }
+         results_.clear();
+      }
+
+      void throw_error(PGresult *result, std::string const& sql) const
+      {
+         PQclear(result);
+         std::ostringstream s("Postgis Plugin: PSQL error");
+         if (conn_ )
+         {
+             std::string msg = PQerrorMessage( conn_ );
+             if ( ! msg.empty() )
+             {
+                 s << ":\n" <<  msg.substr( 0, msg.size() - 1 );
+             }
+             
+             s << "\nFull sql was: '" <<  sql << "'\n";
+         } 
+         throw mapnik::datasource_exception( s.str() );
+      }
    public:
       Connection(std::string const& connection_str)
          :cursorId(0),
-         closed_(false)
+         closed_(false),
+         pending_owner_(0)
       {
          conn_=PQconnectdb(connection_str.c_str());
          if (PQstatus(conn_) != CONNECTION_OK)
@@ -64,6 +115,7 @@ class Connection
       
       bool execute(const std::string& sql) const
       {
+         collect_pending();
          PGresult *result=PQexec(conn_,sql.c_str());
          bool ok=(result && PQresultStatus(result)==PGRES_COMMAND_OK);
          PQclear(result);
@@ -72,6 +124,7 @@ class Connection
       
       boost::shared_ptr<ResultSet> executeQuery(const std::string& sql,int type=0) const
       {
+         collect_pending();
          PGresult *result=0;
          if (type==1)
          {
@@ -83,22 +136,62 @@ class Connection
          }
          if(!result || PQresultStatus(result) != PGRES_TUPLES_OK)
          {
-             std::ostringstream s("Postgis Plugin: PSQL error");
-             if (conn_ )
-             {
-                 std::string msg = PQerrorMessage( conn_ );
-                 if ( ! msg.empty() )
-                 {
-                     s << ":\n" <<  msg.substr( 0, msg.size() - 1 );
-                 }
-                 
-                 s << "\nFull sql was: '" <<  sql << "'\n";
-             } 
-             throw mapnik::datasource_exception( s.str() );
+             throw_error(result, sql);
          }
 
          return boost::shared_ptr<ResultSet>(new ResultSet(result));
       }
+
+      // send a query without waiting for its result, which is collected
+      // by the same owner with getResult. Only one query is in flight at
+      // a time, other uses of the connection wait for it first.
+      bool sendQuery(const std::string& sql, void const* owner, int type=0) const
+      {
+         collect_pending();
+         if (!PQsendQueryParams(conn_,sql.c_str(),0,0,0,0,0,type==1 ? 1 : 0))
+         {
+             return false;
+         }
+         pending_owner_=owner;
+         return true;
+      }
+
+      // wait for the result of the query sent by owner
+      boost::shared_ptr<ResultSet> getResult(const std::string& sql, void const* owner) const
+      {
+         if (pending_owner_==owner) collect_pending();
+         PGresult *result=0;
+         result_map::iterator itr=results_.find(owner);
+         if (itr!=results_.end())
+         {
+             result=itr->second;
+             results_.erase(itr);
+         }
+         if(!result || PQresultStatus(result) != PGRES_TUPLES_OK)
+         {
+             throw_error(result, sql);
+         }
+
+         return boost::shared_ptr<ResultSet>(new ResultSet(result));
+      }
+
+      // drop the result of a query sent by owner, if any
+      void discardResult(void const* owner) const
+      {
+         if (pending_owner_==owner) collect_pending();
+         result_map::iterator itr=results_.find(owner);
+         if (itr!=results_.end())
+         {
+             PQclear(itr->second);
+             results_.erase(itr);
+         }
+      }
+
+      bool inTransaction() const
+      {
+         collect_pending();
+         return PQtransactionStatus(conn_)!=PQTRANS_IDLE;
+      }
       
       std::string client_encoding() const
       {
@@ -114,6 +207,7 @@ class Connection
       {
          if (!closed_)
          {
+             clear_results();
              PQfinish(conn_);
 #ifdef MAPNIK_DEBUG
              std::clog << "PostGIS: datasource closed, also closing connection - " << conn_ << std::endl;
@@ -133,6 +227,7 @@ class Connection
       {
          if (!closed_)
          {
+             clear_results();
              PQfinish(conn_);
 #ifdef MAPNIK_DEBUG
              std::clog << "PostGIS: postgresql connection closed - " << conn_ << std::endl;
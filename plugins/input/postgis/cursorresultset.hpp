@@ -1,49 +1,118 @@
 #ifndef CURSORRESULTSET_HPP
 #define CURSORRESULTSET_HPP
 
-#include "connection.hpp"
+#include "connection_manager.hpp"
 #include "resultset.hpp"
 
+#include <algorithm>
+
+// Reads a binary cursor in batches. The next FETCH is sent before the
+// current batch is handed out, so the server and the network produce it
+// while the featureset parses. Batch sizes adapt to the row size, to
+// keep round trips few without holding huge results in memory.
+//
+// The connection stays borrowed from its pool while the cursor is open
+// and is returned to it when the cursor is closed.
 class CursorResultSet : public IResultSet
 {
 private:
+    typedef boost::shared_ptr<Pool<Connection,ConnectionCreator> > pool_ptr;
+
     boost::shared_ptr<Connection> conn_;
+    pool_ptr pool_;
     std::string cursorName_;
     boost::shared_ptr<ResultSet> rs_;
     int fetch_size_;
+    // rows requested by the FETCH in flight, 0 if none
+    int requested_;
+    // the last batch was short, the cursor is exhausted
+    bool done_;
+    // the cursor runs in a transaction begun for it
+    bool own_transaction_;
     bool is_closed_;
+    // shared by copies, also identifies the queries of the cursor to the connection
     int *refCount_;
-    
-    void getNextResultSet()
+
+    static const int min_fetch_size = 16;
+    static const int max_fetch_size = 100000;
+    static const std::size_t target_batch_bytes = 1 << 20;
+
+    std::string fetchSql(int rows) const
     {
         std::ostringstream s;
-        s << "FETCH FORWARD " << fetch_size_ << " FROM " << cursorName_;
+        s << "FETCH FORWARD " << rows << " FROM " << cursorName_;
+        return s.str();
+    }
+
+    void sendFetch()
+    {
+        std::string sql = fetchSql(fetch_size_);
 #ifdef MAPNIK_DEBUG
-        std::clog << "Postgis Plugin: " << s.str() << std::endl;
+        std::clog << "Postgis Plugin: " << sql << std::endl;
 #endif
-        rs_ = conn_->executeQuery(s.str());
-        is_closed_ = false;
+        if (!conn_->sendQuery(sql, refCount_, 1))
+        {
+            throw mapnik::datasource_exception("Postgis Plugin: error sending '" + sql + "'");
+        }
+        requested_ = fetch_size_;
+    }
+
+    void getNextResultSet()
+    {
+        rs_ = conn_->getResult(fetchSql(requested_), refCount_);
+        done_ = rs_->size() < requested_;
+        requested_ = 0;
 #ifdef MAPNIK_DEBUG
         std::clog << "Postgis Plugin: FETCH result (" << cursorName_ << "): " << rs_->size() << " rows" << std::endl;
 #endif
+        if (!done_)
+        {
+            // aim at batches of about target_batch_bytes, growing at most
+            // fourfold per batch
+            std::size_t row_bytes = std::max(std::size_t(1), rs_->bytes() / rs_->size());
+            std::size_t rows = target_batch_bytes / row_bytes;
+            fetch_size_ = int(std::max(std::size_t(min_fetch_size),
+                                       std::min(rows, std::size_t(std::min(fetch_size_ * 4, max_fetch_size)))));
+            sendFetch();
+        }
     }
     
 public:
-    CursorResultSet(boost::shared_ptr<Connection> const &conn, std::string cursorName, int fetch_count)
+    CursorResultSet(boost::shared_ptr<Connection> const &conn, pool_ptr const& pool,
+                    std::string cursorName, int fetch_count, bool own_transaction = false)
         : conn_(conn),
+          pool_(pool),
           cursorName_(cursorName),
           fetch_size_(fetch_count),
+          requested_(0),
+          done_(false),
+          own_transaction_(own_transaction),
           is_closed_(false),
           refCount_(new int(1))
     {
-        getNextResultSet();
+        try
+        {
+            sendFetch();
+            getNextResultSet();
+        }
+        catch (...)
+        {
+            // the destructor does not run, the caller still owns the
+            // connection and cleans up the cursor
+            delete refCount_;
+            throw;
+        }
     }
 
     CursorResultSet(const CursorResultSet& rhs)
         : conn_(rhs.conn_),
+          pool_(rhs.pool_),
           cursorName_(rhs.cursorName_),
           rs_(rhs.rs_),
           fetch_size_(rhs.fetch_size_),
+          requested_(rhs.requested_),
+          done_(rhs.done_),
+          own_transaction_(rhs.own_transaction_),
           is_closed_(rhs.is_closed_),
           refCount_(rhs.refCount_)
     {
@@ -59,10 +128,14 @@ public:
             delete refCount_,refCount_=0;
         }
         conn_=rhs.conn_;
+        pool_=rhs.pool_;
         cursorName_=rhs.cursorName_;
         rs_=rhs.rs_;
         refCount_=rhs.refCount_;
         fetch_size_=rhs.fetch_size_;
+        requested_=rhs.requested_;
+        done_=rhs.done_;
+        own_transaction_=rhs.own_transaction_;
         is_closed_ = false;
         (*refCount_)++;
         return *this;
@@ -73,12 +146,25 @@ public:
         if (!is_closed_)
         {
             rs_.reset();
+            if (requested_ > 0)
+            {
+                conn_->discardResult(refCount_);
+                requested_ = 0;
+            }
             std::ostringstream s;
             s << "CLOSE " << cursorName_;
 #ifdef MAPNIK_DEBUG
             std::clog << "Postgis Plugin: " << s.str() << std::endl;
 #endif
             conn_->execute(s.str());
+            if (own_transaction_)
+            {
+                conn_->execute("COMMIT");
+            }
+            if (pool_)
+            {
+                pool_->returnObject(conn_);
+            }
             is_closed_ = true;
         }
     }
@@ -99,14 +185,12 @@ public:
 
     virtual bool next()
     {
-        if (rs_->next()) {
-            return true;
-        } else if (rs_->size() == 0) {
-            return false;
-        } else {
+        while (!rs_->next())
+        {
+            if (done_) return false;
             getNextResultSet();
-            return rs_->next();
         }
+        return true;
     }
 
     virtual const char* getFieldName(int index) const
@@ -67,7 +67,7 @@ postgis_datasource::postgis_datasource(parameters const& params, bool bind)
       schema_(""),
       geometry_table_(*params_.get<std::string>("geometry_table","")),
       geometry_field_(*params_.get<std::string>("geometry_field","")),
-      cursor_fetch_size_(*params_.get<int>("cursor_size",0)),
+      cursor_fetch_size_(*params_.get<int>("cursor_size",1000)),
       row_limit_(*params_.get<int>("row_limit",0)),
       type_(datasource::Vector),
       srid_(*params_.get<int>("srid",0)),
@@ -81,8 +81,12 @@ postgis_datasource::postgis_datasource(parameters const& params, bool bind)
                params.get<std::string>("connect_timeout","4")),
       bbox_token_("!bbox!"),
       scale_denom_token_("!scale_denominator!"),
+      pixel_width_token_("!pixel_width!"),
       persist_connection_(*params_.get<mapnik::boolean>("persist_connection",true)),
       extent_from_subquery_(*params_.get<mapnik::boolean>("extent_from_subquery",false)),
+      filter_pushdown_(*params_.get<mapnik::boolean>("filter_pushdown",false)),
+      simplify_geometries_(*params_.get<mapnik::boolean>("simplify_geometries",false)),
+      simplify_tolerance_(*params_.get<double>("simplify_tolerance",0.5)),
       // params below are for testing purposes only (will likely be removed at any time)
       force2d_(*params_.get<mapnik::boolean>("force_2d",false)),
       st_(*params_.get<mapnik::boolean>("st_prefix",false))
@@ -340,10 +344,14 @@ std::string postgis_datasource::populate_tokens(const std::string& sql) const
         std::string max_denom = lexical_cast<std::string>(FMAX);
         boost::algorithm::replace_all(populated_sql,scale_denom_token_,max_denom);
     }
+    if ( boost::algorithm::icontains(sql,pixel_width_token_) )
+    {
+        boost::algorithm::replace_all(populated_sql,pixel_width_token_,"0");
+    }
     return populated_sql;
 }
 
-std::string postgis_datasource::populate_tokens(const std::string& sql, double const& scale_denom, box2d<double> const& env) const
+std::string postgis_datasource::populate_tokens(const std::string& sql, double const& scale_denom, box2d<double> const& env, double pixel_width) const
 {
     std::string populated_sql = sql;
     std::string box = sql_bbox(env);
@@ -353,6 +361,11 @@ std::string postgis_datasource::populate_tokens(const std::string& sql, double c
         std::string max_denom = lexical_cast<std::string>(scale_denom);
         boost::algorithm::replace_all(populated_sql,scale_denom_token_,max_denom);
     }
+
+    if ( boost::algorithm::icontains(populated_sql,pixel_width_token_) )
+    {
+        boost::algorithm::replace_all(populated_sql,pixel_width_token_,lexical_cast<std::string>(pixel_width));
+    }
     
     if ( boost::algorithm::icontains(populated_sql,bbox_token_) )
     {
@@ -375,7 +388,9 @@ std::string postgis_datasource::unquote(const std::string& sql)
     return table_name;
 }
 
-boost::shared_ptr<IResultSet> postgis_datasource::get_resultset(boost::shared_ptr<Connection> const &conn, const std::string &sql) const
+boost::shared_ptr<IResultSet> postgis_datasource::get_resultset(boost::shared_ptr<Connection> &conn,
+                                                                boost::shared_ptr<Pool<Connection,ConnectionCreator> > const& pool,
+                                                                const std::string &sql) const
 {
     if (cursor_fetch_size_ > 0)
     {
@@ -383,7 +398,14 @@ boost::shared_ptr<IResultSet> postgis_datasource::get_resultset(boost::shared_pt
         std::ostringstream csql;
         std::string cursor_name = conn->new_cursor_name();
 
-        csql << "DECLARE " << cursor_name << " BINARY INSENSITIVE NO SCROLL CURSOR WITH HOLD FOR " << sql << " FOR READ ONLY";
+        // a cursor WITH HOLD outside a transaction is materialized before
+        // the first FETCH, so run it in a transaction of its own to stream
+        // rows as they are produced. Inside a transaction begun elsewhere
+        // it is held, to survive the commit of that transaction.
+        bool own_transaction = !conn->inTransaction() && conn->execute("BEGIN");
+
+        csql << "DECLARE " << cursor_name << " BINARY INSENSITIVE NO SCROLL CURSOR "
+             << (own_transaction ? "" : "WITH HOLD ") << "FOR " << sql << " FOR READ ONLY";
 
         /*
         if (show_queries_)
@@ -393,9 +415,27 @@ boost::shared_ptr<IResultSet> postgis_datasource::get_resultset(boost::shared_pt
         */
 
         if (!conn->execute(csql.str()))
+        {
+            if (own_transaction) conn->execute("ROLLBACK");
             throw mapnik::datasource_exception("Postgis Plugin: error creating cursor for data select." );
+        }
 
-        return shared_ptr<CursorResultSet>(new CursorResultSet(conn, cursor_name, cursor_fetch_size_));
+        shared_ptr<CursorResultSet> rs;
+        try
+        {
+            rs.reset(new CursorResultSet(conn, pool, cursor_name, cursor_fetch_size_, own_transaction));
+        }
+        catch (...)
+        {
+            // the first FETCH failed, leave the connection usable before
+            // it goes back to the pool
+            if (own_transaction) conn->execute("ROLLBACK");
+            else conn->execute("CLOSE " + cursor_name);
+            throw;
+        }
+        // the connection is now returned by the cursor once it is closed
+        conn.reset();
+        return rs;
 
     }
     else
@@ -452,13 +492,26 @@ featureset_ptr postgis_datasource::features(const query& q) const
             }
 
             std::ostringstream s;
+            // width of a pixel in the layer srs, 0 if unknown
+            double pixel_width = q.get_pixel_size();
+
+            std::string geometry = "\"" + geometryColumn_ + "\"";
+            if (simplify_geometries_ && simplify_tolerance_ > 0 && pixel_width > 0)
+            {
+                // drop detail below the tolerance, falling back to the
+                // full geometry if it collapses
+                std::string tolerance = lexical_cast<std::string>(simplify_tolerance_ * pixel_width);
+                geometry = "COALESCE(ST_SimplifyPreserveTopology(ST_SnapToGrid(" + geometry + "," + tolerance
+                    + ")," + tolerance + ")," + geometry + ")";
+            }
+
             s << "SELECT ";
             if (st_)
                 s << "ST_";
             if (force2d_)
-                s << "AsBinary(ST_Force_2D(\"" << geometryColumn_ << "\")) AS geom";
+                s << "AsBinary(ST_Force_2D(" << geometry << ")) AS geom";
             else
-                s << "AsBinary(\"" << geometryColumn_ << "\") AS geom";
+                s << "AsBinary(" << geometry << ") AS geom";
 
             std::set<std::string> const& props=q.property_names();
             std::set<std::string>::const_iterator pos=props.begin();
@@ -469,15 +522,26 @@ featureset_ptr postgis_datasource::features(const query& q) const
                 ++pos;
             }       
 
-            std::string table_with_bbox = populate_tokens(table_,scale_denom,box);
+            std::string table_with_bbox = populate_tokens(table_,scale_denom,box,pixel_width);
 
             s << " from " << table_with_bbox;
 
+            // leave out rows no active rule matches, populate_tokens adds
+            // a WHERE clause unless the table has a bbox token
+            if (filter_pushdown_ && q.get_filter())
+            {
+                std::string filter = mapnik::sql_from_filter(*q.get_filter());
+                if (!filter.empty())
+                {
+                    s << (boost::algorithm::icontains(table_,bbox_token_) ? " WHERE " : " AND ") << filter;
+                }
+            }
+
             if (row_limit_ > 0) {
                 s << " LIMIT " << row_limit_;
             }
          
-            boost::shared_ptr<IResultSet> rs = get_resultset(conn, s.str());
+            boost::shared_ptr<IResultSet> rs = get_resultset(conn, pool, s.str());
             return featureset_ptr(new postgis_featureset(rs,desc_.get_encoding(),multiple_geometries_,props.size()));
         }
         else 
@@ -541,7 +605,7 @@ featureset_ptr postgis_datasource::features_at_point(coord2d const& pt) const
             }
 
             box2d<double> box(pt.x,pt.y,pt.x,pt.y);
-            std::string table_with_bbox = populate_tokens(table_,FMAX,box);
+            std::string table_with_bbox = populate_tokens(table_,FMAX,box,0);
 
             s << " from " << table_with_bbox;
          
@@ -549,7 +613,7 @@ featureset_ptr postgis_datasource::features_at_point(coord2d const& pt) const
                 s << " LIMIT " << row_limit_;
             }
          
-            boost::shared_ptr<IResultSet> rs = get_resultset(conn, s.str());
+            boost::shared_ptr<IResultSet> rs = get_resultset(conn, pool, s.str());
             return featureset_ptr(new postgis_featureset(rs,desc_.get_encoding(),multiple_geometries_, size));
         }
     }
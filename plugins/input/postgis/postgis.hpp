@@ -72,8 +72,12 @@ class postgis_datasource : public datasource
       bool multiple_geometries_;
       const std::string bbox_token_;
       const std::string scale_denom_token_;
+      const std::string pixel_width_token_;
       bool persist_connection_;
       bool extent_from_subquery_;
+      bool filter_pushdown_;
+      bool simplify_geometries_;
+      double simplify_tolerance_;
       // params below are for testing purposes only (will likely be removed at any time)
       bool force2d_;
       bool st_;
@@ -90,10 +94,15 @@ class postgis_datasource : public datasource
       void bind() const;
    private:
       std::string sql_bbox(box2d<double> const& env) const;
-      std::string populate_tokens(const std::string& sql, double const& scale_denom, box2d<double> const& env) const;
+      std::string populate_tokens(const std::string& sql, double const& scale_denom, box2d<double> const& env, double pixel_width) const;
       std::string populate_tokens(const std::string& sql) const;
       static std::string unquote(const std::string& sql);
-      boost::shared_ptr<IResultSet> get_resultset(boost::shared_ptr<Connection> const &conn, const std::string &sql) const;
+      // a cursor result set takes over conn and returns it to pool when
+      // it is closed; conn is then reset, so the caller's PoolGuard, which
+      // refers to it, does not return the connection while it is in use
+      boost::shared_ptr<IResultSet> get_resultset(boost::shared_ptr<Connection> &conn,
+                                                  boost::shared_ptr<Pool<Connection,ConnectionCreator> > const& pool,
+                                                  const std::string &sql) const;
       postgis_datasource(const postgis_datasource&);
       postgis_datasource& operator=(const postgis_datasource&);
 };
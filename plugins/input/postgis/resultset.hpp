@@ -117,6 +117,21 @@ public:
         return numTuples_;
     }
 
+    // total length of the field values of all rows
+    std::size_t bytes() const
+    {
+        std::size_t total=0;
+        int fields=PQnfields(res_);
+        for (int row=0;row<numTuples_;++row)
+        {
+            for (int col=0;col<fields;++col)
+            {
+                total+=PQgetlength(res_,row,col);
+            }
+        }
+        return total;
+    }
+
     virtual bool next()
     {
         return (++pos_<numTuples_);
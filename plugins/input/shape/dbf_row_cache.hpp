@@ -0,0 +1,181 @@
+/*****************************************************************************
+ *
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+
+#ifndef DBF_ROW_CACHE_HPP
+#define DBF_ROW_CACHE_HPP
+
+// mapnik
+#include <mapnik/feature.hpp>
+#include <mapnik/value.hpp>
+// boost
+#include <boost/utility.hpp>
+#ifdef MAPNIK_THREADSAFE
+#include <boost/thread/mutex.hpp>
+#endif
+// stl
+#include <vector>
+#include <list>
+#include <map>
+#include <utility>
+#include <algorithm>
+#include <iterator>
+#include <iostream>
+
+#include "dbffile.hpp"
+
+// LRU cache of decoded dbf records, shared by all featuresets of a
+// shape datasource. A row only holds the columns that were requested
+// so far, sorted by column index.
+class dbf_row_cache : private boost::noncopyable
+{
+public:
+    typedef std::vector<std::pair<int,mapnik::value> > row_type;
+
+    explicit dbf_row_cache(std::size_t max_rows)
+        : max_rows_(max_rows) {}
+
+    // copy the given (sorted) columns of the cached row of record into
+    // row, false unless all of them are cached
+    bool find(int record, std::vector<int> const& cols, row_type & row)
+    {
+#ifdef MAPNIK_THREADSAFE
+        boost::mutex::scoped_lock lock(mutex_);
+#endif
+        index_type::iterator itr = index_.find(record);
+        if (itr == index_.end()) return false;
+        row_type const& cached = itr->second->second;
+        row_type::const_iterator col = cached.begin();
+        row.clear();
+        for (std::vector<int>::const_iterator pos = cols.begin(); pos != cols.end(); ++pos)
+        {
+            while (col != cached.end() && col->first < *pos) ++col;
+            if (col == cached.end() || col->first != *pos) return false;
+            row.push_back(*col);
+        }
+        lru_.splice(lru_.begin(), lru_, itr->second);
+        return true;
+    }
+
+    // add the (sorted) columns of row to the cached row of record
+    void insert(int record, row_type const& row)
+    {
+        if (max_rows_ == 0) return;
+#ifdef MAPNIK_THREADSAFE
+        boost::mutex::scoped_lock lock(mutex_);
+#endif
+        index_type::iterator itr = index_.find(record);
+        if (itr != index_.end())
+        {
+            row_type & cached = itr->second->second;
+            row_type merged;
+            merged.reserve(cached.size() + row.size());
+            std::merge(cached.begin(), cached.end(), row.begin(), row.end(),
+                       std::back_inserter(merged), column_less());
+            merged.erase(std::unique(merged.begin(), merged.end(), same_column()), merged.end());
+            cached.swap(merged);
+            lru_.splice(lru_.begin(), lru_, itr->second);
+            return;
+        }
+        lru_.push_front(std::make_pair(record, row));
+        index_.insert(std::make_pair(record, lru_.begin()));
+        while (index_.size() > max_rows_)
+        {
+            index_.erase(lru_.back().first);
+            lru_.pop_back();
+        }
+    }
+
+    std::size_t size() const
+    {
+        return index_.size();
+    }
+
+    std::size_t max_rows() const
+    {
+        return max_rows_;
+    }
+
+private:
+    typedef std::list<std::pair<int,row_type> > lru_type;
+    typedef std::map<int,lru_type::iterator> index_type;
+
+    struct column_less
+    {
+        bool operator() (row_type::value_type const& a, row_type::value_type const& b) const
+        {
+            return a.first < b.first;
+        }
+    };
+
+    struct same_column
+    {
+        bool operator() (row_type::value_type const& a, row_type::value_type const& b) const
+        {
+            return a.first == b.first;
+        }
+    };
+
+    std::size_t max_rows_;
+    lru_type lru_;
+    index_type index_;
+#ifdef MAPNIK_THREADSAFE
+    boost::mutex mutex_;
+#endif
+};
+
+// add the (sorted) columns of record to feature, decoding them from
+// dbf only if they are not in cache, which may be null
+inline void add_attributes(dbf_file & dbf,
+                           dbf_row_cache * cache,
+                           int record,
+                           std::vector<int> const& cols,
+                           transcoder const& tr,
+                           Feature & feature)
+{
+    dbf_row_cache::row_type row;
+    if (!cache || !cache->find(record, cols, row))
+    {
+        row.clear();
+        dbf.move_to(record);
+        for (std::vector<int>::const_iterator pos = cols.begin(); pos != cols.end(); ++pos)
+        {
+            try
+            {
+                row.push_back(std::make_pair(*pos, dbf.value(*pos, tr)));
+            }
+            catch (...)
+            {
+                std::clog << "Shape Plugin: error processing attributes" << std::endl;
+            }
+        }
+        if (cache) cache->insert(record, row);
+    }
+    for (dbf_row_cache::row_type::const_iterator itr = row.begin(); itr != row.end(); ++itr)
+    {
+        if (!boost::get<mapnik::value_null>(&itr->second.base()))
+        {
+            boost::put(feature, dbf.descriptor(itr->first).name_, itr->second);
+        }
+    }
+}
+
+#endif // DBF_ROW_CACHE_HPP
@@ -30,13 +30,16 @@
 
 // stl
 #include <string>
+#include <cctype>
+#include <algorithm>
 
 
 dbf_file::dbf_file()
     : num_records_(0),
       num_fields_(0),
       record_length_(0),
-      record_(0) {}
+      record_(0),
+      current_(0) {}
 
 dbf_file::dbf_file(std::string const& file_name)
     :num_records_(0),
@@ -47,7 +50,8 @@ dbf_file::dbf_file(std::string const& file_name)
 #else
      file_(file_name,std::ios::in | std::ios::binary),
 #endif
-     record_(0)
+     record_(0),
+     current_(0)
 {
     if (file_.is_open())
     {
@@ -92,17 +96,26 @@ void dbf_file::move_to(int index)
     if (index>0 && index<=num_records_)
     {
         stream_offset pos=(num_fields_<<5)+34+(index-1)*(record_length_+1);
+#ifdef SHAPE_MEMORY_MAPPED_FILE
+        // point into the mapping instead of copying the record
+        if (pos + record_length_ <= stream_offset(file_->size()))
+        {
+            current_ = file_->data() + pos;
+        }
+#else
         file_.seekg(pos,std::ios::beg);
         file_.read(record_,record_length_);
+        current_ = record_;
+#endif
     }
 }
 
 
 std::string dbf_file::string_value(int col) const
 {
-    if (col>=0 && col<num_fields_)
+    if (current_ && col>=0 && col<num_fields_)
     {
-        return std::string(record_+fields_[col].offset_,fields_[col].length_);
+        return std::string(current_+fields_[col].offset_,fields_[col].length_);
     }
     return "";
 }
@@ -115,56 +128,63 @@ const field_descriptor& dbf_file::descriptor(int col) const
 }
 
 
-void dbf_file::add_attribute(int col, mapnik::transcoder const& tr, Feature const& f) const throw()
+mapnik::value dbf_file::value(int col, mapnik::transcoder const& tr) const
 {
     using namespace boost::spirit;
 
-    if (col>=0 && col<num_fields_)
+    if (!current_ || col<0 || col>=num_fields_)
     {
-        std::string name=fields_[col].name_;
-        
-        switch (fields_[col].type_)
-        {
-        case 'C':
-        case 'D'://todo handle date?
-        case 'M':
-        case 'L':
+        return mapnik::value();
+    }
+    field_descriptor const& fd = fields_[col];
+    const char *itr = current_+fd.offset_;
+    const char *end = itr + fd.length_;
+    switch (fd.type_)
+    {
+    case 'C':
+    case 'D'://todo handle date?
+    case 'M':
+    case 'L':
+    {
+        // values end at the first NUL, then are trimmed in place and
+        // only the remaining bytes are transcoded
+        end = std::find(itr, end, '\0');
+        while (itr != end && std::isspace(static_cast<unsigned char>(*itr))) ++itr;
+        while (end != itr && std::isspace(static_cast<unsigned char>(*(end-1)))) --end;
+        return tr.transcode(itr, end - itr);
+    }
+    case 'N':
+    case 'F':
+    {
+        if (*itr == '*')
         {
-            // FIXME - avoid constructing std::string in stack
-            std::string str(record_+fields_[col].offset_,fields_[col].length_);
-            boost::trim(str); 
-            f[name] = tr.transcode(str.c_str()); 
-            break;
+            return 0;
         }
-        case 'N':
-        case 'F':
-        {
-            
-            if (record_[fields_[col].offset_] == '*')
-            {
-                boost::put(f,name,0);
-                break;
-            }
-            if ( fields_[col].dec_>0 )
-            {   
-                double val = 0.0;
-                const char *itr = record_+fields_[col].offset_;
-                const char *end = itr + fields_[col].length_;
-                qi::phrase_parse(itr,end,double_,ascii::space,val);
-                boost::put(f,name,val); 
-            }
-            else
-            {
-                int val = 0; 
-                const char *itr = record_+fields_[col].offset_;
-                const char *end = itr + fields_[col].length_;
-                qi::phrase_parse(itr,end,int_,ascii::space,val);
-                boost::put(f,name,val); 
-            }
-            break;
+        if ( fd.dec_>0 )
+        {   
+            double val = 0.0;
+            qi::phrase_parse(itr,end,double_,ascii::space,val);
+            return val;
         }
+        else
+        {
+            int val = 0; 
+            qi::phrase_parse(itr,end,int_,ascii::space,val);
+            return val;
         }
     }
+    }
+    return mapnik::value();
+}
+
+
+void dbf_file::add_attribute(int col, mapnik::transcoder const& tr, Feature const& f) const throw()
+{
+    mapnik::value val = value(col,tr);
+    if (!boost::get<mapnik::value_null>(&val.base()))
+    {
+        boost::put(f,fields_[col].name_,val);
+    }
 }
 
 void dbf_file::read_header()
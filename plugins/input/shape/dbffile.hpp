@@ -24,6 +24,7 @@
 #define DBFFILE_HPP
 
 #include <mapnik/feature.hpp>
+#include <mapnik/value.hpp>
 // boost
 #include <boost/iostreams/stream.hpp>
 #include <boost/iostreams/device/file.hpp>
@@ -62,6 +63,8 @@ private:
     stream<file_source> file_;
 #endif
     char* record_;
+    // the current record, either in record_ or in the mapped file
+    const char* current_;
 public:
     dbf_file();
     dbf_file(const std::string& file_name);
@@ -73,6 +76,9 @@ public:
     field_descriptor const& descriptor(int col) const;
     void move_to(int index);
     std::string string_value(int col) const;
+    // decoded value of a column of the current record, parsed straight
+    // from the record buffer, null for unsupported field types
+    mapnik::value value(int col, transcoder const& tr) const;
     void add_attribute(int col, transcoder const& tr, Feature const& f) const throw();
 private:
     dbf_file(const dbf_file&);
@@ -24,6 +24,7 @@
 #include <fstream>
 #include <stdexcept>
 #include <mapnik/geom_util.hpp>
+#include <mapnik/ptree_helpers.hpp>
 
 // boost
 #include <boost/version.hpp>
@@ -51,6 +52,8 @@ shape_datasource::shape_datasource(const parameters &params, bool bind)
       type_(datasource::Vector),
       file_length_(0),
       indexed_(false),
+      build_index_(*params.get<mapnik::boolean>("build_index",false)),
+      save_index_(*params.get<mapnik::boolean>("save_index",false)),
       desc_(*params.get<std::string>("type"), *params.get<std::string>("encoding","utf-8"))
 {
     boost::optional<std::string> file = params.get<std::string>("file");
@@ -63,6 +66,13 @@ shape_datasource::shape_datasource(const parameters &params, bool bind)
         shape_name_ = *file;
 
     boost::algorithm::ireplace_last(shape_name_,".shp","");
+
+    // decoded attribute rows of recently read records, disabled by default
+    unsigned row_cache_size = *params.get<unsigned>("row_cache_size",0);
+    if (row_cache_size > 0)
+    {
+        row_cache_ = boost::shared_ptr<dbf_row_cache>(new dbf_row_cache(row_cache_size));
+    }
     
     if (bind)
     {
@@ -126,6 +136,11 @@ void shape_datasource::bind() const
                 break;
             }
         }
+        // without a .index file, scan the shapefile and index it in memory
+        if (!indexed_ && build_index_)
+        {
+            build_index(*shape_ref);
+        }
         // for indexed shapefiles we keep open the file descriptor for fast reads
         if (indexed_) {
             shape_ = shape_ref;
@@ -217,6 +232,27 @@ void  shape_datasource::init(shape_io& shape) const
 
 }
 
+void shape_datasource::build_index(shape_io& shape) const
+{
+    boost::shared_ptr<shp_memory_index> index(new shp_memory_index);
+    if (!index->build(shape.shp()))
+    {
+        std::clog << "Shape Plugin: could not build index for '" << shape_name_ << ".shp'" << std::endl;
+        return;
+    }
+    shape.memory_index() = index;
+    indexed_ = true;
+
+#ifdef MAPNIK_DEBUG
+    std::clog << "Shape Plugin: indexed " << index->size() << " shapes in memory" << std::endl;
+#endif
+
+    if (save_index_ && !index->save(shape_name_ + shape_io::INDEX))
+    {
+        std::clog << "Shape Plugin: could not save index '" << shape_name_ << shape_io::INDEX << "'" << std::endl;
+    }
+}
+
 std::string shape_datasource::name()
 {
     return "shape";
@@ -245,7 +281,8 @@ featureset_ptr shape_datasource::features(const query& q) const
             (new shape_index_featureset<filter_in_box>(filter,
                                                        *shape_,
                                                        q.property_names(),
-                                                       desc_.get_encoding()));
+                                                       desc_.get_encoding(),
+                                                       row_cache_.get()));
     }
     else
     {
@@ -254,7 +291,8 @@ featureset_ptr shape_datasource::features(const query& q) const
                                                  shape_name_,
                                                  q.property_names(),
                                                  desc_.get_encoding(),
-                                                 file_length_));
+                                                 file_length_,
+                                                 row_cache_.get()));
     }
 }
 
@@ -282,7 +320,8 @@ featureset_ptr shape_datasource::features_at_point(coord2d const& pt) const
             (new shape_index_featureset<filter_at_point>(filter,
                                                          *shape_,
                                                          names,
-                                                         desc_.get_encoding()));
+                                                         desc_.get_encoding(),
+                                                         row_cache_.get()));
     }
     else
     {
@@ -291,7 +330,8 @@ featureset_ptr shape_datasource::features_at_point(coord2d const& pt) const
                                                    shape_name_,
                                                    names,
                                                    desc_.get_encoding(),
-                                                   file_length_));
+                                                   file_length_,
+                                                   row_cache_.get()));
     }
 }
 
@@ -31,6 +31,7 @@
 #include <boost/shared_ptr.hpp>
 
 #include "shape_io.hpp"
+#include "dbf_row_cache.hpp"
 
 using mapnik::datasource;
 using mapnik::parameters;
@@ -56,6 +57,7 @@ private:
     shape_datasource(const shape_datasource&);
     shape_datasource& operator=(const shape_datasource&);
     void init(shape_io& shape) const;
+    void build_index(shape_io& shape) const;
 private:
     int type_;
     std::string shape_name_;
@@ -63,7 +65,10 @@ private:
     mutable long file_length_;
     mutable box2d<double> extent_;
     mutable bool indexed_;
+    bool build_index_;
+    bool save_index_;
     mutable layer_descriptor desc_;
+    boost::shared_ptr<dbf_row_cache> row_cache_;
 };
 
 #endif //SHAPE_HPP
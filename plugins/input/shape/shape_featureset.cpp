@@ -29,13 +29,15 @@ shape_featureset<filterT>::shape_featureset(const filterT& filter,
                                             const std::string& shape_file,
                                             const std::set<std::string>& attribute_names,
                                             std::string const& encoding,
-                                            long file_length )
+                                            long file_length,
+                                            dbf_row_cache * row_cache)
     : filter_(filter),
       shape_type_(shape_io::shape_null),
       shape_(shape_file, false),
       query_ext_(),
       tr_(new transcoder(encoding)),
       file_length_(file_length),
+      row_cache_(row_cache),
       count_(0)
 {
     shape_.shp().skip(100);
@@ -68,6 +70,8 @@ shape_featureset<filterT>::shape_featureset(const filterT& filter,
         }
         ++pos;
     }
+    // dbf columns are read in file order
+    std::sort(attr_ids_.begin(),attr_ids_.end());
 }
 
 
@@ -242,22 +246,7 @@ feature_ptr shape_featureset<filterT>::next()
         }
         if (attr_ids_.size())
         {
-            shape_.dbf().move_to(shape_.id_);
-            std::vector<int>::const_iterator pos=attr_ids_.begin();
-            std::vector<int>::const_iterator end=attr_ids_.end();
-             
-            while (pos!=end)
-            {
-                try 
-                {
-                    shape_.dbf().add_attribute(*pos,*tr_,*feature);//TODO optimize!!!
-                }
-                catch (...)
-                {
-                    std::clog << "Shape Plugin: error processing attributes " << std::endl;
-                }
-                ++pos;
-            }
+            add_attributes(shape_.dbf(),row_cache_,shape_.id_,attr_ids_,*tr_,*feature);
         }
         return feature;
     }
@@ -41,6 +41,7 @@ class shape_featureset : public Featureset
       boost::scoped_ptr<transcoder> tr_;
       long file_length_;
       std::vector<int> attr_ids_;
+      dbf_row_cache * row_cache_;
       mutable box2d<double> feature_ext_;
       mutable int total_geom_size;
       mutable int count_;
@@ -49,7 +50,8 @@ class shape_featureset : public Featureset
                        const std::string& shape_file,
                        const std::set<std::string>& attribute_names,
                        std::string const& encoding,
-                       long file_length);
+                       long file_length,
+                       dbf_row_cache * row_cache = 0);
       virtual ~shape_featureset();
       feature_ptr next();
    private:
@@ -34,17 +34,23 @@ template <typename filterT>
 shape_index_featureset<filterT>::shape_index_featureset(const filterT& filter,
                                                         shape_io& shape,
                                                         const std::set<std::string>& attribute_names,
-                                                        std::string const& encoding)
+                                                        std::string const& encoding,
+                                                        dbf_row_cache * row_cache)
     : filter_(filter),
       shape_type_(0),
       shape_(shape),
       tr_(new transcoder(encoding)),
+      row_cache_(row_cache),
       count_(0)
 
 {
     shape_.shp().skip(100);
     boost::shared_ptr<shape_file> index = shape_.index();
-    if (index)
+    if (shape_.memory_index())
+    {
+        shape_.memory_index()->query(filter,ids_);
+    }
+    else if (index)
     {
 #ifdef SHAPE_MEMORY_MAPPED_FILE
         shp_index<filterT,stream<mapped_file_source> >::query(filter,index->file(),ids_);
@@ -69,7 +75,7 @@ shape_index_featureset<filterT>::shape_index_featureset(const filterT& filter,
         {
             if (shape_.dbf().descriptor(i).name_ == *pos)
             {
-                attr_ids_.insert(i);
+                attr_ids_.push_back(i);
                 found_name = true;
                 break;
             }
@@ -89,6 +95,8 @@ shape_index_featureset<filterT>::shape_index_featureset(const filterT& filter,
         }
         ++pos;
     }
+    // dbf columns are read in file order
+    std::sort(attr_ids_.begin(),attr_ids_.end());
 }
 
 template <typename filterT>
@@ -214,20 +222,7 @@ feature_ptr shape_index_featureset<filterT>::next()
         }
         if (attr_ids_.size())
         {
-            shape_.dbf().move_to(shape_.id_);
-            std::set<int>::const_iterator pos=attr_ids_.begin();
-            while (pos!=attr_ids_.end())
-            {
-                try 
-                {
-                    shape_.dbf().add_attribute(*pos,*tr_,*feature);
-                }
-                catch (...)
-                {
-                    std::clog << "Shape Plugin: error processing attributes" << std::endl;
-                }
-                ++pos;
-            }
+            add_attributes(shape_.dbf(),row_cache_,shape_.id_,attr_ids_,*tr_,*feature);
         }
         return feature;
     }
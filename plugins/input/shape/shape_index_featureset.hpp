@@ -44,7 +44,8 @@ class shape_index_featureset : public Featureset
       boost::scoped_ptr<transcoder> tr_;
       std::vector<int> ids_;
       std::vector<int>::iterator itr_;
-      std::set<int> attr_ids_;
+      std::vector<int> attr_ids_;
+      dbf_row_cache * row_cache_;
       mutable box2d<double> feature_ext_;
       mutable int total_geom_size;
       mutable int count_;
@@ -53,7 +54,8 @@ class shape_index_featureset : public Featureset
       shape_index_featureset(const filterT& filter,
                              shape_io& shape,
                              const std::set<std::string>& attribute_names,
-                             std::string const& encoding);
+                             std::string const& encoding,
+                             dbf_row_cache * row_cache = 0);
       virtual ~shape_index_featureset();
       feature_ptr next();
    private:
@@ -51,6 +51,16 @@ shape_io::shape_io(const std::string& shape_name, bool open_index)
         {
             
             index_= boost::shared_ptr<shape_file>(new shape_file(shape_name + INDEX));
+            if (index_->is_open())
+            {
+                // packed indexes are queried in memory, quadtree indexes
+                // are read through the index file
+                boost::shared_ptr<shp_memory_index> packed(new shp_memory_index);
+                if (packed->load(*index_))
+                {
+                    memory_index_ = packed;
+                }
+            }
         }
         catch (...)
         {
@@ -27,6 +27,7 @@
 #include "dbffile.hpp"
 #include "shapefile.hpp"
 #include "shp_index.hpp"
+#include "shp_memory_index.hpp"
 // boost
 #include <boost/utility.hpp>
 #include <boost/shared_ptr.hpp>
@@ -46,6 +47,7 @@ struct shape_io : boost::noncopyable
     shape_file shx_;
     dbf_file   dbf_;
     boost::shared_ptr<shape_file>  index_;
+    boost::shared_ptr<shp_memory_index> memory_index_;
     unsigned reclength_;
     unsigned id_;
     box2d<double> cur_extent_;
@@ -80,9 +82,14 @@ public:
         return index_;
     }
     
+    inline boost::shared_ptr<shp_memory_index>& memory_index()
+    {
+        return memory_index_;
+    }
+    
     inline bool has_index() const
     {
-        return (index_ && index_->is_open());
+        return (index_ && index_->is_open()) || memory_index_;
     }
     void move_to(int id);
     int type() const;
@@ -0,0 +1,184 @@
+/*****************************************************************************
+ *
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+
+#ifndef SHP_MEMORY_INDEX_HPP
+#define SHP_MEMORY_INDEX_HPP
+
+// mapnik
+#include <mapnik/box2d.hpp>
+#include <mapnik/geom_util.hpp>
+// boost
+#include <boost/utility.hpp>
+#include <boost/lexical_cast.hpp>
+// stl
+#include <vector>
+#include <string>
+#include <fstream>
+#include <cstdio>
+#include <cstring>
+#include <algorithm>
+#ifdef _WINDOWS
+#include <process.h>
+#else
+#include <unistd.h>
+#endif
+
+#include "shapefile.hpp"
+#include "shp_packed_index.hpp"
+
+using mapnik::box2d;
+
+// Packed spatial index of the records of a .shp file, queried in
+// memory. It is either built by scanning a shapefile without a .index
+// file, and can then be saved as one, or loaded from a packed .index
+// file written by shapeindex.
+class shp_memory_index : private boost::noncopyable
+{
+public:
+    shp_memory_index() {}
+
+    // scan the record headers of shp, false if the file is not a valid shapefile
+    bool build(shape_file & shp)
+    {
+        std::vector<box2d<double> > boxes;
+        std::vector<int> offsets;
+        shp.seek(0);
+        if (shp.read_xdr_integer() != 9994) return false;
+        shp.skip(5*4);
+        std::streamoff file_length = std::streamoff(shp.read_xdr_integer()) * 2;
+        std::streamoff offset = 100;
+        while (offset + 12 <= file_length)
+        {
+            shp.seek(offset);
+            shp.read_xdr_integer(); // record number
+            std::streamoff content_length = std::streamoff(shp.read_xdr_integer()) * 2;
+            int type = shp.read_ndr_integer();
+            if (shp.is_eof()) break;
+            switch (type)
+            {
+            case 0: // null shape
+                break;
+            case 1:  // point
+            case 11: // pointz
+            case 21: // pointm
+            {
+                double x = shp.read_double();
+                double y = shp.read_double();
+                boxes.push_back(box2d<double>(x,y,x,y));
+                offsets.push_back(offset);
+                break;
+            }
+            default:
+            {
+                box2d<double> item_ext;
+                shp.read_envelope(item_ext);
+                boxes.push_back(item_ext);
+                offsets.push_back(offset);
+            }
+            }
+            offset += 8 + content_length;
+        }
+        shp_packed_index::build(boxes, offsets, buffer_);
+        return index_.open(&buffer_[0], buffer_.size());
+    }
+
+    // load a packed .index file, which is queried straight from the
+    // mapping if memory mapped files are used. False if the file is
+    // not a packed index, e.g. a quadtree index.
+    bool load(shape_file & file)
+    {
+#ifdef SHAPE_MEMORY_MAPPED_FILE
+        return index_.open(file.file()->data(), file.file()->size());
+#else
+        char header[shp_packed_index::header_size];
+        file.seek(0);
+        file.file().read(header, shp_packed_index::header_size);
+        if (!file.file() || !shp_packed_index::is_packed(header, shp_packed_index::header_size))
+        {
+            file.file().clear();
+            return false;
+        }
+        file.file().seekg(0, std::ios::end);
+        std::streamoff size = file.pos();
+        buffer_.resize(size);
+        file.seek(0);
+        file.file().read(&buffer_[0], size);
+        if (!file.file()) return false;
+        return index_.open(&buffer_[0], buffer_.size());
+#endif
+    }
+
+    // append the offsets of the records that may pass filter, in file order
+    template <typename filterT>
+    void query(filterT const& filter, std::vector<int> & pos) const
+    {
+        std::size_t first = pos.size();
+        index_.query(filter, pos);
+        std::sort(pos.begin() + first, pos.end());
+    }
+
+    std::size_t size() const
+    {
+        return index_.size();
+    }
+
+    // write the index as a .index file, through a temporary file
+    // renamed into place so concurrent readers never see a partial index
+    bool save(std::string const& index_name) const
+    {
+        if (index_.size() == 0) return false;
+#ifdef _WINDOWS
+        std::string tmp_name = index_name + ".tmp" + boost::lexical_cast<std::string>(_getpid());
+#else
+        std::string tmp_name = index_name + ".tmp" + boost::lexical_cast<std::string>(getpid());
+#endif
+        {
+            std::ofstream file(tmp_name.c_str(), std::ios::out | std::ios::trunc | std::ios::binary);
+            if (!file) return false;
+            file.write(index_.data(), index_.data_size());
+            file.close();
+            if (!file)
+            {
+                std::remove(tmp_name.c_str());
+                return false;
+            }
+        }
+        if (std::rename(tmp_name.c_str(), index_name.c_str()) != 0)
+        {
+            // rename does not replace existing files on windows
+            std::remove(index_name.c_str());
+            if (std::rename(tmp_name.c_str(), index_name.c_str()) != 0)
+            {
+                std::remove(tmp_name.c_str());
+                return false;
+            }
+        }
+        return true;
+    }
+
+private:
+    shp_packed_index index_;
+    // index data, unless it is read from a mapped file
+    std::vector<char> buffer_;
+};
+
+#endif // SHP_MEMORY_INDEX_HPP
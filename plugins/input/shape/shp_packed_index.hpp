@@ -0,0 +1,280 @@
+/*****************************************************************************
+ *
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+
+#ifndef SHP_PACKED_INDEX_HPP
+#define SHP_PACKED_INDEX_HPP
+
+// mapnik
+#include <mapnik/global.hpp>
+#include <mapnik/box2d.hpp>
+// boost
+#include <boost/cstdint.hpp>
+// stl
+#include <vector>
+#include <utility>
+#include <algorithm>
+#include <cstring>
+
+using mapnik::box2d;
+
+// Packed Hilbert R-tree .index format.
+//
+// A 16 byte header holds the magic "mapnikH\1", the number of items and
+// the node size. It is followed by the nodes of all levels as one flat
+// array, leaves first and the root last. Each node is a box (4 doubles)
+// and an int32 value, padded to 40 bytes. The value of a leaf is the
+// offset of its record in the .shp file, the value of an inner node the
+// index of its first child. All numbers are little endian.
+//
+// Leaves are sorted by the Hilbert value of their center and packed
+// bottom up, so nodes are tight and a query reads the index in place,
+// e.g. from a memory mapping, without allocating.
+class shp_packed_index
+{
+public:
+    static const unsigned header_size = 16;
+    static const unsigned record_size = 40;
+    static const unsigned default_node_size = 16;
+
+    shp_packed_index()
+        : data_(0),
+          size_(0),
+          count_(0),
+          node_size_(0),
+          num_levels_(0) {}
+
+    // true if data starts with the header of a packed index
+    static bool is_packed(const char* data, std::size_t size)
+    {
+        return size >= header_size && std::memcmp(data, magic(), 8) == 0;
+    }
+
+    // point the index at data, which must outlive it, false if data
+    // does not hold a valid packed index
+    bool open(const char* data, std::size_t size)
+    {
+        data_ = 0;
+        size_ = 0;
+        count_ = 0;
+        num_levels_ = 0;
+        if (!is_packed(data, size)) return false;
+        boost::int32_t count, node_size;
+        mapnik::read_int32_ndr(data + 8, count);
+        mapnik::read_int32_ndr(data + 12, node_size);
+        if (count < 0 || node_size < 2) return false;
+        unsigned levels = 0;
+        std::size_t total = 0;
+        for (std::size_t n = count; n > 0; n = (n == 1) ? 0 : (n + node_size - 1) / node_size)
+        {
+            if (levels == max_levels) return false;
+            level_bounds_[levels++] = total;
+            total += n;
+        }
+        level_bounds_[levels] = total;
+        if (size < header_size + total * record_size) return false;
+        data_ = data;
+        size_ = size;
+        count_ = count;
+        node_size_ = node_size;
+        num_levels_ = levels;
+        return true;
+    }
+
+    // append the values of the leaves whose box passes filter
+    template <typename filterT>
+    void query(filterT const& filter, std::vector<int> & pos) const
+    {
+        if (num_levels_ == 0) return;
+        query_node(filter, num_levels_ - 1, level_bounds_[num_levels_ - 1], pos);
+    }
+
+    std::size_t size() const
+    {
+        return count_;
+    }
+
+    // the index data passed to open()
+    const char* data() const
+    {
+        return data_;
+    }
+
+    std::size_t data_size() const
+    {
+        return size_;
+    }
+
+    // write a packed index of boxes, with values[i] the value of boxes[i]
+    static void build(std::vector<box2d<double> > const& boxes,
+                      std::vector<int> const& values,
+                      std::vector<char> & out,
+                      unsigned node_size = default_node_size)
+    {
+        std::size_t count = boxes.size();
+        box2d<double> extent;
+        for (std::size_t i = 0; i < count; ++i)
+        {
+            if (i == 0) extent = boxes[i];
+            else extent.expand_to_include(boxes[i]);
+        }
+        double sx = extent.width() > 0 ? 65535.0 / extent.width() : 0.0;
+        double sy = extent.height() > 0 ? 65535.0 / extent.height() : 0.0;
+        std::vector<std::pair<boost::uint32_t,unsigned> > order;
+        order.reserve(count);
+        for (std::size_t i = 0; i < count; ++i)
+        {
+            box2d<double> const& box = boxes[i];
+            boost::uint32_t x = static_cast<boost::uint32_t>(sx * (0.5 * (box.minx() + box.maxx()) - extent.minx()));
+            boost::uint32_t y = static_cast<boost::uint32_t>(sy * (0.5 * (box.miny() + box.maxy()) - extent.miny()));
+            order.push_back(std::make_pair(hilbert(x, y), i));
+        }
+        std::sort(order.begin(), order.end());
+
+        std::vector<box2d<double> > nodes;
+        std::vector<int> node_values;
+        nodes.reserve(count + count / (node_size - 1) + 1);
+        node_values.reserve(nodes.capacity());
+        for (std::size_t i = 0; i < count; ++i)
+        {
+            nodes.push_back(boxes[order[i].second]);
+            node_values.push_back(values[order[i].second]);
+        }
+        std::size_t level_start = 0;
+        std::size_t level_end = nodes.size();
+        while (level_end - level_start > 1)
+        {
+            for (std::size_t i = level_start; i < level_end; i += node_size)
+            {
+                box2d<double> ext = nodes[i];
+                std::size_t end = std::min(i + node_size, level_end);
+                for (std::size_t j = i + 1; j < end; ++j)
+                {
+                    ext.expand_to_include(nodes[j]);
+                }
+                nodes.push_back(ext);
+                node_values.push_back(i);
+            }
+            level_start = level_end;
+            level_end = nodes.size();
+        }
+
+        out.assign(header_size + nodes.size() * record_size, 0);
+        std::memcpy(&out[0], magic(), 8);
+        write_int32_ndr(&out[8], count);
+        write_int32_ndr(&out[12], node_size);
+        for (std::size_t i = 0; i < nodes.size(); ++i)
+        {
+            char* record = &out[header_size + i * record_size];
+            write_double_ndr(record, nodes[i].minx());
+            write_double_ndr(record + 8, nodes[i].miny());
+            write_double_ndr(record + 16, nodes[i].maxx());
+            write_double_ndr(record + 24, nodes[i].maxy());
+            write_int32_ndr(record + 32, node_values[i]);
+        }
+    }
+
+private:
+    static const unsigned max_levels = 32;
+
+    static const char* magic()
+    {
+        return "mapnikH\1";
+    }
+
+    // distance of x,y along the hilbert curve filling a 2^16 x 2^16 grid
+    static boost::uint32_t hilbert(boost::uint32_t x, boost::uint32_t y)
+    {
+        const boost::uint32_t n = 1 << 16;
+        boost::uint32_t d = 0;
+        for (boost::uint32_t s = n / 2; s > 0; s /= 2)
+        {
+            boost::uint32_t rx = (x & s) > 0;
+            boost::uint32_t ry = (y & s) > 0;
+            d += s * s * ((3 * rx) ^ ry);
+            if (ry == 0)
+            {
+                if (rx == 1)
+                {
+                    x = n - 1 - x;
+                    y = n - 1 - y;
+                }
+                std::swap(x, y);
+            }
+        }
+        return d;
+    }
+
+    static void write_int32_ndr(char* data, boost::int32_t val)
+    {
+        for (int i = 0; i < 4; ++i)
+        {
+            data[i] = static_cast<char>((val >> (8 * i)) & 0xff);
+        }
+    }
+
+    static void write_double_ndr(char* data, double val)
+    {
+        boost::uint64_t bits;
+        std::memcpy(&bits, &val, 8);
+        for (int i = 0; i < 8; ++i)
+        {
+            data[i] = static_cast<char>((bits >> (8 * i)) & 0xff);
+        }
+    }
+
+    template <typename filterT>
+    void query_node(filterT const& filter, unsigned level, std::size_t index, std::vector<int> & pos) const
+    {
+        const char* record = data_ + header_size + index * record_size;
+        double minx, miny, maxx, maxy;
+        mapnik::read_double_ndr(record, minx);
+        mapnik::read_double_ndr(record + 8, miny);
+        mapnik::read_double_ndr(record + 16, maxx);
+        mapnik::read_double_ndr(record + 24, maxy);
+        if (!filter.pass(box2d<double>(minx, miny, maxx, maxy))) return;
+        boost::int32_t value;
+        mapnik::read_int32_ndr(record + 32, value);
+        if (level == 0)
+        {
+            pos.push_back(value);
+            return;
+        }
+        std::size_t first = value;
+        std::size_t end = level_bounds_[level];
+        if (value < 0 || first < level_bounds_[level - 1] || first >= end) return;
+        end = std::min(first + node_size_, end);
+        for (std::size_t child = first; child < end; ++child)
+        {
+            query_node(filter, level - 1, child, pos);
+        }
+    }
+
+    const char* data_;
+    std::size_t size_;
+    std::size_t count_;
+    std::size_t node_size_;
+    unsigned num_levels_;
+    // index of the first node of each level, and the total node count
+    std::size_t level_bounds_[max_levels + 1];
+};
+
+#endif // SHP_PACKED_INDEX_HPP
@@ -78,6 +78,7 @@ sqlite_datasource::sqlite_datasource(parameters const& params, bool bind)
 
     multiple_geometries_ = *params_.get<mapnik::boolean>("multiple_geometries",false);
     use_spatial_index_ = *params_.get<mapnik::boolean>("use_spatial_index",true);
+    filter_pushdown_ = *params_.get<mapnik::boolean>("filter_pushdown",false);
 
     boost::optional<std::string> ext  = params_.get<std::string>("extent");
     if (ext) extent_initialized_ = extent_.from_string(*ext);
@@ -260,6 +261,19 @@ featureset_ptr sqlite_datasource::features(query const& q) const
         }
         
         s << query ;
+
+        // leave out rows no active rule matches, the table may be a
+        // query with its own WHERE clause so it is filtered as a whole
+        if (filter_pushdown_ && q.get_filter())
+        {
+            std::string filter = mapnik::sql_from_filter(*q.get_filter(), false);
+            if (!filter.empty())
+            {
+                std::string select = s.str();
+                s.str("");
+                s << "SELECT * FROM (" << select << ") WHERE " << filter;
+            }
+        }
         
         if (row_limit_ > 0) {
             s << " LIMIT " << row_limit_;
@@ -66,6 +66,7 @@ class sqlite_datasource : public mapnik::datasource
       mapnik::wkbFormat format_;
       bool multiple_geometries_;
       mutable bool use_spatial_index_;
+      bool filter_pushdown_;
 };
 
 
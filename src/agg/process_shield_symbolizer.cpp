@@ -111,7 +111,7 @@ void  agg_renderer<T>::process(shield_symbolizer const& sym,
             ren.set_halo_radius(sym.get_halo_radius() * scale_factor_);
             ren.set_opacity(sym.get_text_opacity());
 
-            placement_finder<label_collision_detector4> finder(detector_);
+            placement_finder<label_collision_detector_type> finder(detector_);
 
             string_info info(text);
 
@@ -1137,7 +1137,7 @@ void cairo_renderer_base::process(shield_symbolizer const& sym,
             cairo_context context(context_);
             string_info info(text);
 
-            placement_finder<label_collision_detector4> finder(detector_);
+            placement_finder<label_collision_detector_type> finder(detector_);
 
             faces->set_pixel_sizes(placement_options->text_size);
             faces->get_string_info(info);
@@ -1438,7 +1438,7 @@ void cairo_renderer_base::process(markers_symbolizer const& sym,
         {
             path_type path(t_, geom, prj_trans);
 
-            markers_placement<path_type, label_collision_detector4> placement(path, arrow_.extent(), detector_, sym.get_spacing(), sym.get_max_error(), sym.get_allow_overlap());
+            markers_placement<path_type, label_collision_detector_type> placement(path, arrow_.extent(), detector_, sym.get_spacing(), sym.get_max_error(), sym.get_allow_overlap());
 
             double x, y, angle;
             while (placement.get_point(&x, &y, &angle)) {
@@ -1566,7 +1566,7 @@ void cairo_renderer_base::process(text_symbolizer const& sym,
         faces->set_pixel_sizes(placement_options->text_size);
         faces->get_string_info(info);
 
-        placement_finder<label_collision_detector4> finder(detector_);
+        placement_finder<label_collision_detector_type> finder(detector_);
 
         for (unsigned i = 0; i < feature.num_geometries(); ++i)
         {
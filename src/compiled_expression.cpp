@@ -0,0 +1,344 @@
+/*****************************************************************************
+ *
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+
+//$Id$
+
+// mapnik
+#include <mapnik/compiled_expression.hpp>
+#include <mapnik/unicode.hpp>
+// boost
+#include <boost/variant.hpp>
+#include <boost/regex.hpp>
+#if defined(BOOST_REGEX_HAS_ICU)
+#include <boost/regex/icu.hpp>
+#endif
+// stl
+#include <sstream>
+#include <functional>
+
+namespace mapnik
+{
+
+struct compiled_expressions::compiler : boost::static_visitor<void>
+{
+    explicit compiler(compiled_expressions & exprs)
+        : exprs_(exprs) {}
+
+    void operator() (value_type const& x) const
+    {
+        exprs_.code_.push_back(instruction(PUSH_VALUE, exprs_.values_.size()));
+        exprs_.values_.push_back(x);
+    }
+
+    void operator() (attribute const& attr) const
+    {
+        exprs_.code_.push_back(instruction(PUSH_ATTRIBUTE, exprs_.slot(attr.name())));
+    }
+
+    void operator() (binary_node<tags::logical_and> const& x) const
+    {
+        logical(x.left, x.right, AND_JUMP);
+    }
+
+    void operator() (binary_node<tags::logical_or> const& x) const
+    {
+        logical(x.left, x.right, OR_JUMP);
+    }
+
+    template <typename Tag>
+    void operator() (binary_node<Tag> const& x) const
+    {
+        boost::apply_visitor(*this, x.left);
+        boost::apply_visitor(*this, x.right);
+        exprs_.code_.push_back(instruction(op(Tag())));
+    }
+
+    template <typename Tag>
+    void operator() (unary_node<Tag> const& x) const
+    {
+        boost::apply_visitor(*this, x.expr);
+        exprs_.code_.push_back(instruction(NOT));
+    }
+
+    void operator() (regex_match_node const& x) const
+    {
+        boost::apply_visitor(*this, x.expr);
+        exprs_.code_.push_back(instruction(REGEX_MATCH, exprs_.matches_.size()));
+        exprs_.matches_.push_back(&x);
+    }
+
+    void operator() (regex_replace_node const& x) const
+    {
+        boost::apply_visitor(*this, x.expr);
+        exprs_.code_.push_back(instruction(REGEX_REPLACE, exprs_.replaces_.size()));
+        exprs_.replaces_.push_back(&x);
+    }
+
+    // left, then a jump past right if left decides the result
+    void logical(expr_node const& left, expr_node const& right, opcode jump) const
+    {
+        boost::apply_visitor(*this, left);
+        std::size_t pos = exprs_.code_.size();
+        exprs_.code_.push_back(instruction(jump));
+        boost::apply_visitor(*this, right);
+        exprs_.code_.push_back(instruction(TO_BOOL));
+        exprs_.code_[pos].arg = exprs_.code_.size();
+    }
+
+    static opcode op(tags::plus) { return PLUS; }
+    static opcode op(tags::minus) { return MINUS; }
+    static opcode op(tags::mult) { return MULT; }
+    static opcode op(tags::div) { return DIV; }
+    static opcode op(tags::mod) { return MOD; }
+    static opcode op(tags::less) { return LESS; }
+    static opcode op(tags::less_equal) { return LESS_EQUAL; }
+    static opcode op(tags::greater) { return GREATER; }
+    static opcode op(tags::greater_equal) { return GREATER_EQUAL; }
+    static opcode op(tags::equal_to) { return EQUAL_TO; }
+    static opcode op(tags::not_equal_to) { return NOT_EQUAL_TO; }
+
+    compiled_expressions & exprs_;
+};
+
+namespace {
+
+// replace the two operands on top of stack with op(left,right)
+template <typename Op>
+inline void apply_binary(std::vector<value_type> & stack)
+{
+    value_type & left = stack[stack.size() - 2];
+    left = Op()(left, stack.back());
+    stack.pop_back();
+}
+
+}
+
+unsigned compiled_expressions::add(expression_ptr const& expr)
+{
+    unsigned start = code_.size();
+    if (expr)
+    {
+        boost::apply_visitor(compiler(*this), *expr);
+    }
+    else
+    {
+        // null expressions evaluate to null
+        code_.push_back(instruction(PUSH_VALUE, values_.size()));
+        values_.push_back(value_type());
+    }
+    exprs_.push_back(expr);
+    programs_.push_back(std::make_pair(start, unsigned(code_.size())));
+    return programs_.size() - 1;
+}
+
+unsigned compiled_expressions::slot(std::string const& name)
+{
+    std::map<std::string,unsigned>::const_iterator itr = slots_.find(name);
+    if (itr != slots_.end()) return itr->second;
+    unsigned index = names_.size();
+    names_.push_back(name);
+    slots_.insert(std::make_pair(name, index));
+    return index;
+}
+
+void compiled_expressions::reset(context & ctx, Feature const& feature) const
+{
+    ctx.feature_ = &feature;
+    if (++ctx.generation_ == 0)
+    {
+        // generation wrapped, forget when the slots were loaded
+        std::fill(ctx.loaded_.begin(), ctx.loaded_.end(), 0);
+        ctx.generation_ = 1;
+    }
+    if (ctx.slots_.size() != names_.size())
+    {
+        ctx.slots_.resize(names_.size());
+        ctx.loaded_.resize(names_.size(), 0);
+    }
+}
+
+value_type const& compiled_expressions::load(unsigned slot, context & ctx) const
+{
+    if (ctx.loaded_[slot] != ctx.generation_)
+    {
+        std::map<std::string,value_type> const& props = ctx.feature_->props();
+        std::map<std::string,value_type>::const_iterator itr = props.find(names_[slot]);
+        ctx.slots_[slot] = (itr != props.end()) ? itr->second : value_type();
+        ctx.loaded_[slot] = ctx.generation_;
+    }
+    return ctx.slots_[slot];
+}
+
+value_type compiled_expressions::evaluate(unsigned id, context & ctx) const
+{
+    std::vector<value_type> & stack = ctx.stack_;
+    stack.clear();
+    unsigned pc = programs_[id].first;
+    unsigned end = programs_[id].second;
+    while (pc < end)
+    {
+        instruction const& ins = code_[pc++];
+        switch (ins.op)
+        {
+        case PUSH_VALUE:
+            stack.push_back(values_[ins.arg]);
+            break;
+        case PUSH_ATTRIBUTE:
+            stack.push_back(load(ins.arg, ctx));
+            break;
+        case PLUS:
+            apply_binary<std::plus<value_type> >(stack);
+            break;
+        case MINUS:
+            apply_binary<std::minus<value_type> >(stack);
+            break;
+        case MULT:
+            apply_binary<std::multiplies<value_type> >(stack);
+            break;
+        case DIV:
+            apply_binary<std::divides<value_type> >(stack);
+            break;
+        case MOD:
+            apply_binary<std::modulus<value_type> >(stack);
+            break;
+        case LESS:
+            apply_binary<std::less<value_type> >(stack);
+            break;
+        case LESS_EQUAL:
+            apply_binary<std::less_equal<value_type> >(stack);
+            break;
+        case GREATER:
+            apply_binary<std::greater<value_type> >(stack);
+            break;
+        case GREATER_EQUAL:
+            apply_binary<std::greater_equal<value_type> >(stack);
+            break;
+        case EQUAL_TO:
+            apply_binary<std::equal_to<value_type> >(stack);
+            break;
+        case NOT_EQUAL_TO:
+            apply_binary<std::not_equal_to<value_type> >(stack);
+            break;
+        case NOT:
+            stack.back() = !stack.back().to_bool();
+            break;
+        case TO_BOOL:
+            stack.back() = stack.back().to_bool();
+            break;
+        case AND_JUMP:
+            if (!stack.back().to_bool())
+            {
+                stack.back() = false;
+                pc = ins.arg;
+            }
+            else
+            {
+                stack.pop_back();
+            }
+            break;
+        case OR_JUMP:
+            if (stack.back().to_bool())
+            {
+                stack.back() = true;
+                pc = ins.arg;
+            }
+            else
+            {
+                stack.pop_back();
+            }
+            break;
+        case REGEX_MATCH:
+        {
+            regex_match_node const& node = *matches_[ins.arg];
+#if defined(BOOST_REGEX_HAS_ICU)
+            stack.back() = boost::u32regex_match(stack.back().to_unicode(), node.pattern);
+#else
+            stack.back() = boost::regex_match(stack.back().to_string(), node.pattern);
+#endif
+            break;
+        }
+        case REGEX_REPLACE:
+        {
+            regex_replace_node const& node = *replaces_[ins.arg];
+#if defined(BOOST_REGEX_HAS_ICU)
+            stack.back() = boost::u32regex_replace(stack.back().to_unicode(), node.pattern, node.format);
+#else
+            std::string repl = boost::regex_replace(stack.back().to_string(), node.pattern, node.format);
+            mapnik::transcoder tr_("utf8");
+            stack.back() = tr_.transcode(repl.c_str());
+#endif
+            break;
+        }
+        }
+    }
+    return stack.back();
+}
+
+std::string compiled_expressions::to_string(unsigned id) const
+{
+    static const char* names[] = {
+        "push", "attribute", "+", "-", "*", "/", "%",
+        "<", "<=", ">", ">=", "=", "!=", "not", "bool",
+        "and_jump", "or_jump", "match", "replace"
+    };
+    std::ostringstream s;
+    for (unsigned pc = programs_[id].first; pc < programs_[id].second; ++pc)
+    {
+        instruction const& ins = code_[pc];
+        s << pc - programs_[id].first << ": " << names[ins.op];
+        switch (ins.op)
+        {
+        case PUSH_VALUE:
+            s << " " << values_[ins.arg].to_expression_string();
+            break;
+        case PUSH_ATTRIBUTE:
+            s << " [" << names_[ins.arg] << "]";
+            break;
+        case AND_JUMP:
+        case OR_JUMP:
+            s << " " << ins.arg - programs_[id].first;
+            break;
+        case REGEX_MATCH:
+        case REGEX_REPLACE:
+        {
+            std::string str;
+#if defined(BOOST_REGEX_HAS_ICU)
+            std::basic_string<UChar32> pattern = (ins.op == REGEX_MATCH) ?
+                matches_[ins.arg]->pattern.str() : replaces_[ins.arg]->pattern.str();
+            UnicodeString ustr = UnicodeString::fromUTF32(&pattern[0], pattern.length());
+            to_utf8(ustr, str);
+#else
+            if (ins.op == REGEX_MATCH) str = matches_[ins.arg]->pattern.str();
+            else str = replaces_[ins.arg]->pattern.str();
+#endif
+            s << " '" << str << "'";
+            break;
+        }
+        default:
+            break;
+        }
+        s << "\n";
+    }
+    return s.str();
+}
+
+}
@@ -73,25 +73,34 @@ datasource_ptr datasource_cache::create(const parameters& params, bool bind)
     }
 
     datasource_ptr ds;
-    std::map<string,boost::shared_ptr<PluginInfo> >::iterator itr=plugins_.find(*type);
-    if ( itr == plugins_.end() )
+    create_ds* create_datasource = 0;
     {
-        throw config_error(string("Could not create datasource. No plugin ") +
-                           "found for type '" + * type + "' (searched in: " + plugin_directories() + ")");
-    }
-    if ( ! itr->second->handle())
-    {
-        throw std::runtime_error(string("Cannot load library: ") +
-                                 lt_dlerror());
-    }
+#ifdef MAPNIK_THREADSAFE
+        // plugins_ may be modified by register_datasources and
+        // lt_dlsym/lt_dlerror are not reentrant. The datasource itself is
+        // created outside of the lock, binding it may take a while.
+        mutex::scoped_lock lock(mapnik::singleton<mapnik::datasource_cache,
+                                mapnik::CreateStatic>::mutex_);
+#endif
+        std::map<string,boost::shared_ptr<PluginInfo> >::iterator itr=plugins_.find(*type);
+        if ( itr == plugins_.end() )
+        {
+            throw config_error(string("Could not create datasource. No plugin ") +
+                               "found for type '" + * type + "' (searched in: " + plugin_directories() + ")");
+        }
+        if ( ! itr->second->handle())
+        {
+            throw std::runtime_error(string("Cannot load library: ") +
+                                     lt_dlerror());
+        }
 
-    create_ds* create_datasource = 
-        (create_ds*) lt_dlsym(itr->second->handle(), "create");
+        create_datasource = (create_ds*) lt_dlsym(itr->second->handle(), "create");
 
-    if ( ! create_datasource)
-    {
-        throw std::runtime_error(string("Cannot load symbols: ") +
-                                 lt_dlerror());
+        if ( ! create_datasource)
+        {
+            throw std::runtime_error(string("Cannot load symbols: ") +
+                                     lt_dlerror());
+        }
     }
 #ifdef MAPNIK_DEBUG
     std::clog << "size = " << params.size() << "\n";
@@ -0,0 +1,281 @@
+/*****************************************************************************
+ *
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+
+//$Id$
+
+// mapnik
+#include <mapnik/feature_cache.hpp>
+#include <mapnik/feature_factory.hpp>
+
+// boost
+#include <boost/algorithm/string.hpp>
+
+// stl
+#include <cmath>
+
+namespace mapnik
+{
+
+namespace {
+
+// rough footprint of a feature, including the allocator overhead of
+// the property map nodes
+std::size_t feature_bytes(Feature const& f)
+{
+    std::size_t bytes = sizeof(Feature);
+    for (unsigned i = 0; i < f.num_geometries(); ++i)
+    {
+        bytes += sizeof(geometry_type) + f.get_geometry(i).num_points() * (2 * sizeof(double) + 1);
+    }
+    std::map<std::string,value> const& props = f.props();
+    for (std::map<std::string,value>::const_iterator itr = props.begin(); itr != props.end(); ++itr)
+    {
+        bytes += 4 * sizeof(void*) + sizeof(std::string) + itr->first.size() + sizeof(value);
+        UnicodeString const* ustr = boost::get<UnicodeString>(&itr->second.base());
+        if (ustr) bytes += ustr->length() * sizeof(UChar);
+    }
+    return bytes;
+}
+
+box2d<double> geometry_envelope(geometry_type const& geom)
+{
+    box2d<double> result;
+    double x = 0;
+    double y = 0;
+    for (unsigned i = 0; i < geom.num_points(); ++i)
+    {
+        geom.get_vertex(i, &x, &y);
+        if (i == 0)
+            result.init(x, y, x, y);
+        else
+            result.expand_to_include(x, y);
+    }
+    return result;
+}
+
+feature_ptr copy_feature(Feature const& f)
+{
+    feature_ptr result(feature_factory::create(f.id()));
+    for (unsigned i = 0; i < f.num_geometries(); ++i)
+    {
+        geometry_type const& geom = f.get_geometry(i);
+        geometry_type * copy = new geometry_type(geom.type());
+        unsigned size = geom.num_points();
+        copy->set_capacity(size);
+        double x = 0;
+        double y = 0;
+        for (unsigned j = 0; j < size; ++j)
+        {
+            unsigned cmd = geom.get_vertex(j, &x, &y);
+            copy->push_vertex(x, y, CommandType(cmd));
+        }
+        result->add_geometry(copy);
+    }
+    result->props() = f.props();
+    result->set_raster(f.get_raster());
+    return result;
+}
+
+// snap the bbox outwards to a grid with a power of two cell size at
+// least as large as the bbox, so neighbouring queries share a snapped bbox
+box2d<double> snap_to_grid(box2d<double> const& bbox)
+{
+    double size = std::max(bbox.width(), bbox.height());
+    if (!(size > 0)) return bbox;
+    double cell = std::pow(2.0, std::ceil(std::log(size) / std::log(2.0)));
+    return box2d<double>(std::floor(bbox.minx() / cell) * cell,
+                         std::floor(bbox.miny() / cell) * cell,
+                         std::ceil(bbox.maxx() / cell) * cell,
+                         std::ceil(bbox.maxy() / cell) * cell);
+}
+
+// scale denominators of neighbouring zoom levels differ by a factor of two
+int scale_bucket(double scale_denom)
+{
+    if (!(scale_denom > 0)) return 0;
+    return static_cast<int>(std::floor(std::log(scale_denom) / std::log(2.0) + 0.5));
+}
+
+bool contains(box2d<double> const& outer, box2d<double> const& inner)
+{
+    return outer.minx() <= inner.minx() && outer.miny() <= inner.miny() &&
+        outer.maxx() >= inner.maxx() && outer.maxy() >= inner.maxy();
+}
+
+}
+
+std::list<feature_cache::entry_ptr> feature_cache::entries_;
+feature_cache_stats feature_cache::stats_;
+std::size_t feature_cache::max_bytes_ = 64 * 1024 * 1024;
+
+void feature_cache::features(datasource_ptr const& ds, query const& q, memory_datasource & cache)
+{
+    std::string names = boost::algorithm::join(q.property_names(), ",");
+    int bucket = scale_bucket(q.scale_denominator());
+    box2d<double> const& bbox = q.get_bbox();
+
+    entry_ptr e = find(ds, names, bucket, bbox);
+    if (!e)
+    {
+        query snapped(snap_to_grid(bbox), q.resolution(), q.scale_denominator());
+        snapped.set_filter_factor(q.get_filter_factor());
+        std::set<std::string>::const_iterator itr = q.property_names().begin();
+        std::set<std::string>::const_iterator end = q.property_names().end();
+        for (; itr != end; ++itr)
+        {
+            snapped.add_property_name(*itr);
+        }
+
+        boost::shared_ptr<entry> result(new entry);
+        result->ds = ds;
+        result->ds_key = ds.get();
+        result->names = names;
+        result->scale_bucket = bucket;
+        result->bbox = snapped.get_bbox();
+        result->bytes = sizeof(entry);
+        featureset_ptr fs = ds->features(snapped);
+        if (fs)
+        {
+            feature_ptr feature;
+            while ((feature = fs->next()))
+            {
+                box2d<double> envelope;
+                for (unsigned i = 0; i < feature->num_geometries(); ++i)
+                {
+                    box2d<double> geom_envelope = geometry_envelope(feature->get_geometry(i));
+                    if (i == 0)
+                        envelope = geom_envelope;
+                    else
+                        envelope.expand_to_include(geom_envelope);
+                }
+                result->features.push_back(feature);
+                result->envelopes.push_back(envelope);
+                result->bytes += feature_bytes(*feature) + sizeof(feature_ptr) + sizeof(box2d<double>);
+            }
+        }
+        e = result;
+        insert(e);
+    }
+
+    for (std::size_t i = 0; i < e->features.size(); ++i)
+    {
+        if (bbox.intersects(e->envelopes[i]))
+        {
+            cache.push(copy_feature(*e->features[i]));
+        }
+    }
+}
+
+feature_cache::entry_ptr feature_cache::find(datasource_ptr const& ds, std::string const& names,
+                                             int scale_bucket, box2d<double> const& bbox)
+{
+#ifdef MAPNIK_THREADSAFE
+    mutex::scoped_lock lock(mutex_);
+#endif
+    std::list<entry_ptr>::iterator itr = entries_.begin();
+    while (itr != entries_.end())
+    {
+        entry const& e = **itr;
+        if (e.ds.expired())
+        {
+            // the datasource is gone, its address may be reused
+            stats_.bytes -= e.bytes;
+            itr = entries_.erase(itr);
+            continue;
+        }
+        if (e.ds_key == ds.get() && e.scale_bucket == scale_bucket &&
+            e.names == names && contains(e.bbox, bbox))
+        {
+            entry_ptr result = *itr;
+            entries_.splice(entries_.begin(), entries_, itr);
+            ++stats_.hits;
+            return result;
+        }
+        ++itr;
+    }
+    ++stats_.misses;
+    return entry_ptr();
+}
+
+void feature_cache::insert(entry_ptr const& e)
+{
+#ifdef MAPNIK_THREADSAFE
+    mutex::scoped_lock lock(mutex_);
+#endif
+    if (e->bytes > max_bytes_) return;
+    entries_.push_front(e);
+    stats_.bytes += e->bytes;
+    evict();
+}
+
+void feature_cache::evict()
+{
+    while (stats_.bytes > max_bytes_ && !entries_.empty())
+    {
+        stats_.bytes -= entries_.back()->bytes;
+        entries_.pop_back();
+        ++stats_.evictions;
+    }
+}
+
+void feature_cache::set_max_bytes(std::size_t max_bytes)
+{
+#ifdef MAPNIK_THREADSAFE
+    mutex::scoped_lock lock(mutex_);
+#endif
+    max_bytes_ = max_bytes;
+    evict();
+}
+
+std::size_t feature_cache::max_bytes()
+{
+#ifdef MAPNIK_THREADSAFE
+    mutex::scoped_lock lock(mutex_);
+#endif
+    return max_bytes_;
+}
+
+feature_cache_stats feature_cache::stats()
+{
+#ifdef MAPNIK_THREADSAFE
+    mutex::scoped_lock lock(mutex_);
+#endif
+    feature_cache_stats result = stats_;
+    result.entries = entries_.size();
+    result.max_bytes = max_bytes_;
+    return result;
+}
+
+void feature_cache::clear()
+{
+#ifdef MAPNIK_THREADSAFE
+    mutex::scoped_lock lock(mutex_);
+#endif
+    entries_.clear();
+    stats_ = feature_cache_stats();
+}
+
+#ifdef MAPNIK_THREADSAFE
+boost::mutex feature_cache::mutex_;
+#endif
+
+}
@@ -21,6 +21,14 @@
  *****************************************************************************/
 
 #include <mapnik/feature_type_style.hpp>
+#include <mapnik/attribute_collector.hpp>
+
+// boost
+#include <boost/make_shared.hpp>
+#include <boost/foreach.hpp>
+
+// stl
+#include <algorithm>
 
 namespace mapnik
 {
@@ -33,6 +41,14 @@ static const char * filter_mode_strings[] = {
 
 IMPLEMENT_ENUM( filter_mode_e, filter_mode_strings );
 
+// or of filters[first,last) as a balanced tree
+static expr_node any_of(std::vector<expression_ptr> const& filters, std::size_t first, std::size_t last)
+{
+    if (last - first == 1) return *filters[first];
+    std::size_t middle = first + (last - first) / 2;
+    return binary_node<tags::logical_or>(any_of(filters, first, middle), any_of(filters, middle, last));
+}
+
 
 feature_type_style::feature_type_style()
     : filter_mode_(FILTER_ALL) {}
@@ -45,12 +61,14 @@ feature_type_style& feature_type_style::operator=(feature_type_style const& rhs)
 {
     if (this == &rhs) return *this;
     rules_=rhs.rules_;
+    clear_active_rules();
     return *this;
 }
     
 void feature_type_style::add_rule(rule const& rule)
 {
     rules_.push_back(rule);
+    clear_active_rules();
 } 
     
 rules const& feature_type_style::get_rules() const
@@ -60,8 +78,82 @@ rules const& feature_type_style::get_rules() const
 
 rules &feature_type_style::get_rules_nonconst()
 {
+    clear_active_rules();
     return rules_;
 }
+
+void feature_type_style::clear_active_rules()
+{
+#ifdef MAPNIK_THREADSAFE
+    boost::mutex::scoped_lock lock(mutex_);
+#endif
+    scale_bounds_.clear();
+    active_rules_.clear();
+}
+
+active_rules_ptr feature_type_style::get_active_rules(double scale_denom) const
+{
+#ifdef MAPNIK_THREADSAFE
+    boost::mutex::scoped_lock lock(mutex_);
+#endif
+    if (active_rules_.empty())
+    {
+        // the bounds of the scale ranges of rule::active()
+        BOOST_FOREACH(rule const& r, rules_)
+        {
+            scale_bounds_.push_back(r.get_min_scale() - 1e-6);
+            scale_bounds_.push_back(r.get_max_scale() + 1e-6);
+        }
+        std::sort(scale_bounds_.begin(), scale_bounds_.end());
+        scale_bounds_.erase(std::unique(scale_bounds_.begin(), scale_bounds_.end()), scale_bounds_.end());
+        active_rules_.resize(scale_bounds_.size() + 1);
+    }
+    std::size_t band = std::upper_bound(scale_bounds_.begin(), scale_bounds_.end(), scale_denom)
+        - scale_bounds_.begin();
+    if (!active_rules_[band])
+    {
+        boost::shared_ptr<active_rules> active = boost::make_shared<active_rules>();
+        attribute_collector collector(active->names);
+        std::vector<expression_ptr> filters;
+        bool any_feature = false;
+        BOOST_FOREACH(rule const& r, rules_)
+        {
+            if (r.active(scale_denom))
+            {
+                active->rules.push_back(&r);
+                expression_ptr const& filter = r.get_filter();
+                if (r.has_else_filter())
+                {
+                    active->else_rules.push_back(&r);
+                    any_feature = true;
+                }
+                else
+                {
+                    active->if_rules.push_back(&r);
+                    active->filters.add(filter);
+                    filters.push_back(filter);
+                    value_type const* val = filter ? boost::get<value_type>(filter.get()) : 0;
+                    if (!filter || (val && val->to_bool()))
+                    {
+                        any_feature = true;
+                    }
+                }
+                collector(r);
+            }
+        }
+        active->filter_index = rule_index(filters);
+        if (!any_feature && filters.size() == 1)
+        {
+            active->filter = filters[0];
+        }
+        else if (!any_feature && !filters.empty())
+        {
+            active->filter = boost::make_shared<expr_node>(any_of(filters, 0, filters.size()));
+        }
+        active_rules_[band] = active;
+    }
+    return active_rules_[band];
+}
     
 void feature_type_style::set_filter_mode(filter_mode_e mode)
 {
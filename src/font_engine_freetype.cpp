@@ -121,6 +121,9 @@ bool freetype_engine::register_fonts(std::string const& dir, bool recurse)
 
 std::vector<std::string> freetype_engine::face_names ()
 {
+#ifdef MAPNIK_THREADSAFE
+    mutex::scoped_lock lock(mutex_);
+#endif
     std::vector<std::string> names;
     std::map<std::string,std::string>::const_iterator itr;
     for (itr = name2file_.begin();itr!=name2file_.end();++itr)
@@ -132,17 +135,26 @@ std::vector<std::string> freetype_engine::face_names ()
 
 face_ptr freetype_engine::create_face(std::string const& family_name)
 {
-    std::map<std::string,std::string>::iterator itr;
-    itr = name2file_.find(family_name);
-    if (itr != name2file_.end())
+    std::string file_name;
     {
-        FT_Face face;
-        FT_Error error = FT_New_Face (library_,itr->second.c_str(),0,&face);
-
-        if (!error)
+#ifdef MAPNIK_THREADSAFE
+        mutex::scoped_lock lock(mutex_);
+#endif
+        std::map<std::string,std::string>::const_iterator itr;
+        itr = name2file_.find(family_name);
+        if (itr == name2file_.end())
         {
-            return face_ptr (new font_face(face));
+            return face_ptr();
         }
+        file_name = itr->second;
+    }
+    // library_ is owned by this engine instance, so only the
+    // shared name2file_ lookup above needs to be locked
+    FT_Face face;
+    FT_Error error = FT_New_Face (library_,file_name.c_str(),0,&face);
+    if (!error)
+    {
+        return face_ptr (new font_face(face));
     }
     return face_ptr();
 }
@@ -83,6 +83,30 @@ std::string save_to_string(T const& image,
     return ss.str();
 }
 
+template <typename T>
+std::string save_to_string(T const& image,
+                           std::string const& type,
+                           rgba_palette const& palette)
+{
+    std::ostringstream ss(std::ios::out|std::ios::binary);
+    save_to_stream(image, ss, type, palette);
+    return ss.str();
+}
+
+template <typename T>
+void save_to_file(T const& image,
+                  std::string const& filename,
+                  std::string const& type,
+                  rgba_palette const& palette)
+{
+    std::ofstream file (filename.c_str(), std::ios::out| std::ios::trunc|std::ios::binary);
+    if (file)
+    {
+        save_to_stream(image, file, type, palette);
+    }
+    else throw ImageWriterException("Could not write file to " + filename );
+}
+
 template <typename T>
 void save_to_file(T const& image,
                   std::string const& filename,
@@ -96,6 +120,138 @@ void save_to_file(T const& image,
     else throw ImageWriterException("Could not write file to " + filename );
 }
 
+// colors, trans_mode, gamma and use_octree are null for output with a
+// fixed palette, which is not quantized, so their options are rejected
+static void handle_png_options(std::string const& type,
+                               int * colors,
+                               int * trans_mode,
+                               double * gamma,
+                               bool * use_octree,
+                               int * compression,
+                               int * strategy,
+                               int * filter)
+{
+    boost::char_separator<char> sep(":");
+    boost::tokenizer< boost::char_separator<char> > tokens(type, sep);
+    BOOST_FOREACH(string t, tokens)
+    {
+        if (!colors && (boost::algorithm::istarts_with(t, std::string("m=")) ||
+                        boost::algorithm::istarts_with(t, std::string("c=")) ||
+                        boost::algorithm::istarts_with(t, std::string("t=")) ||
+                        boost::algorithm::istarts_with(t, std::string("g="))))
+        {
+            throw ImageWriterException("option not supported with a fixed palette: " + t);
+        }
+        if (t == "m=h")
+        {
+            *use_octree = false;
+        }
+        if (t == "m=o")
+        {
+            *use_octree = true;
+        }
+        if (boost::algorithm::istarts_with(t,std::string("c=")))
+        {
+            try 
+            {
+                *colors = boost::lexical_cast<int>(t.substr(2));
+                if (*colors < 0 || *colors > 256)
+                    throw ImageWriterException("invalid color parameter: " + t.substr(2) + " out of bounds");
+            }
+            catch(boost::bad_lexical_cast &)
+            {
+                throw ImageWriterException("invalid color parameter: " + t.substr(2));
+            }
+        }
+        if (boost::algorithm::istarts_with(t, std::string("t=")))
+        {
+            try 
+            {
+                *trans_mode = boost::lexical_cast<int>(t.substr(2));
+                if (*trans_mode < 0 || *trans_mode > 2)
+                    throw ImageWriterException("invalid trans_mode parameter: " + t.substr(2) + " out of bounds");
+            }
+            catch(boost::bad_lexical_cast &)
+            {
+                throw ImageWriterException("invalid trans_mode parameter: " + t.substr(2));
+            }
+        }
+        if (boost::algorithm::istarts_with(t, std::string("g=")))
+        {
+            try 
+            {
+                *gamma = boost::lexical_cast<double>(t.substr(2));
+                if (*gamma < 0)
+                    throw ImageWriterException("invalid gamma parameter: " + t.substr(2) + " out of bounds");
+            }
+            catch(boost::bad_lexical_cast &)
+            {
+                throw ImageWriterException("invalid gamma parameter: " + t.substr(2));
+            }
+        }
+        // zlib compression level, 0 (none, fastest) to 9 (best, slowest)
+        if (boost::algorithm::istarts_with(t, std::string("z=")))
+        {
+            try 
+            {
+                *compression = boost::lexical_cast<int>(t.substr(2));
+                if (*compression < 0 || *compression > 9)
+                    throw ImageWriterException("invalid compression parameter: " + t.substr(2) + " out of bounds (0-9)");
+            }
+            catch(boost::bad_lexical_cast &)
+            {
+                throw ImageWriterException("invalid compression parameter: " + t.substr(2));
+            }
+        }
+        // zlib compression strategy
+        if (boost::algorithm::istarts_with(t, std::string("s=")))
+        {
+            std::string s = t.substr(2);
+            if (s == "default") *strategy = Z_DEFAULT_STRATEGY;
+            else if (s == "filtered") *strategy = Z_FILTERED;
+            else if (s == "huff") *strategy = Z_HUFFMAN_ONLY;
+            else if (s == "rle") *strategy = Z_RLE;
+            else if (s == "fixed") *strategy = Z_FIXED;
+            else throw ImageWriterException("invalid compression strategy parameter: " + s);
+        }
+        // png row filter
+        if (boost::algorithm::istarts_with(t, std::string("f=")))
+        {
+            std::string f = t.substr(2);
+            if (f == "none") *filter = PNG_FILTER_NONE;
+            else if (f == "sub") *filter = PNG_FILTER_SUB;
+            else if (f == "up") *filter = PNG_FILTER_UP;
+            else if (f == "avg") *filter = PNG_FILTER_AVG;
+            else if (f == "paeth") *filter = PNG_FILTER_PAETH;
+            else if (f == "all") *filter = PNG_ALL_FILTERS;
+            else throw ImageWriterException("invalid filter parameter: " + f);
+        }
+    }
+}
+
+template <typename T>
+void save_to_stream(T const& image,
+                    std::ostream & stream,
+                    std::string const& type,
+                    rgba_palette const& palette)
+{
+    if (stream)
+    {
+        // a fixed palette always results in paletted png output
+        if (boost::algorithm::istarts_with(type, std::string("png")))
+        {
+            int compression = Z_DEFAULT_COMPRESSION;
+            int strategy = -1;
+            int filter = PNG_FILTER_NONE;
+            handle_png_options(type, 0, 0, 0, 0,
+                               &compression, &strategy, &filter);
+            save_as_png8_pal(stream, image, palette, compression, strategy, filter);
+        }
+        else throw ImageWriterException("palettes are only supported for png output, not: " + type);
+    } 
+    else throw ImageWriterException("Could not write to empty stream" );
+}
+
 template <typename T>
 void save_to_stream(T const& image,
                     std::ostream & stream,
@@ -104,74 +260,27 @@ void save_to_stream(T const& image,
     if (stream)
     {
         //all this should go into image_writer factory
-        if (type == "png")  save_as_png(stream, image);
-        else if (boost::algorithm::istarts_with(type, std::string("png256")) ||
-                 boost::algorithm::istarts_with(type, std::string("png8"))
+        if (type == "png" || boost::algorithm::istarts_with(type, std::string("png:")) ||
+            boost::algorithm::istarts_with(type, std::string("png256")) ||
+            boost::algorithm::istarts_with(type, std::string("png8"))
             ) 
         {
+            bool paletted = !(type == "png" || boost::algorithm::istarts_with(type, std::string("png:")));
             int colors  = 256;
             int trans_mode = -1;
             double gamma = -1;
             bool use_octree = true;
-            if (type.length() > 6){
-                boost::char_separator<char> sep(":");
-                boost::tokenizer< boost::char_separator<char> > tokens(type, sep);
-                BOOST_FOREACH(string t, tokens)
-                {
-                    if (t == "m=h")
-                    {
-                        use_octree = false;
-                    }
-                    if (t == "m=o")
-                    {
-                        use_octree = true;
-                    }
-                    if (boost::algorithm::istarts_with(t,std::string("c=")))
-                    {
-                        try 
-                        {
-                            colors = boost::lexical_cast<int>(t.substr(2));
-                            if (colors < 0 || colors > 256)
-                                throw ImageWriterException("invalid color parameter: " + t.substr(2) + " out of bounds");
-                        }
-                        catch(boost::bad_lexical_cast &)
-                        {
-                            throw ImageWriterException("invalid color parameter: " + t.substr(2));
-                        }
-                    }
-                    if (boost::algorithm::istarts_with(t, std::string("t=")))
-                    {
-                        try 
-                        {
-                            trans_mode= boost::lexical_cast<int>(t.substr(2));
-                            if (trans_mode < 0 || trans_mode > 2)
-                                throw ImageWriterException("invalid trans_mode parameter: " + t.substr(2) + " out of bounds");
-                        }
-                        catch(boost::bad_lexical_cast &)
-                        {
-                            throw ImageWriterException("invalid trans_mode parameter: " + t.substr(2));
-                        }
-                    }
-                    if (boost::algorithm::istarts_with(t, std::string("g=")))
-                    {
-                        try 
-                        {
-                            gamma= boost::lexical_cast<double>(t.substr(2));
-                            if (gamma < 0)
-                                throw ImageWriterException("invalid gamma parameter: " + t.substr(2) + " out of bounds");
-                        }
-                        catch(boost::bad_lexical_cast &)
-                        {
-                            throw ImageWriterException("invalid gamma parameter: " + t.substr(2));
-                        }
-                    }
-                }
-
-            }
-            if (use_octree)
-                save_as_png256(stream, image, colors);
+            int compression = Z_DEFAULT_COMPRESSION;
+            int strategy = -1;
+            int filter = PNG_FILTER_NONE;
+            handle_png_options(type, &colors, &trans_mode, &gamma, &use_octree,
+                               &compression, &strategy, &filter);
+            if (!paletted)
+                save_as_png(stream, image, compression, strategy, filter);
+            else if (use_octree)
+                save_as_png256(stream, image, colors, trans_mode, compression, strategy, filter);
             else
-                save_as_png256_hex(stream, image, colors, trans_mode, gamma);
+                save_as_png256_hex(stream, image, colors, trans_mode, gamma, compression, strategy, filter);
         }
 #if defined(HAVE_JPEG)
         else if (boost::algorithm::istarts_with(type,std::string("jpeg")))
@@ -276,6 +385,15 @@ template void save_to_file<image_data_32>(image_data_32 const&,
 template std::string save_to_string<image_data_32>(image_data_32 const&,
                                                    std::string const&);
 
+template void save_to_file<image_data_32>(image_data_32 const&,
+                                          std::string const&,
+                                          std::string const&,
+                                          rgba_palette const&);
+
+template std::string save_to_string<image_data_32>(image_data_32 const&,
+                                                   std::string const&,
+                                                   rgba_palette const&);
+
 template void save_to_file<image_view<image_data_32> > (image_view<image_data_32> const&,
                                                         std::string const&,
                                                         std::string const&);
@@ -286,6 +404,15 @@ template void save_to_file<image_view<image_data_32> > (image_view<image_data_32
 template std::string save_to_string<image_view<image_data_32> > (image_view<image_data_32> const&,
                                                                  std::string const&);
 
+template void save_to_file<image_view<image_data_32> > (image_view<image_data_32> const&,
+                                                        std::string const&,
+                                                        std::string const&,
+                                                        rgba_palette const&);
+
+template std::string save_to_string<image_view<image_data_32> > (image_view<image_data_32> const&,
+                                                                 std::string const&,
+                                                                 rgba_palette const&);
+
 
 
 // Image scaling functions
@@ -24,6 +24,7 @@
 #include <mapnik/memory_datasource.hpp>
 
 #include <mapnik/memory_featureset.hpp>
+#include <mapnik/utils.hpp>
 #include <algorithm>
 
 namespace mapnik {
@@ -54,13 +55,30 @@ struct accumulate_extent
     bool first_;
 };
     
+const std::size_t memory_datasource::index_threshold;
+
 memory_datasource::memory_datasource()
-    : datasource(parameters()) {}
+    : datasource(parameters()),
+      use_index_(true),
+      indexed_(0) {}
+
+memory_datasource::memory_datasource(bool use_index)
+    : datasource(parameters()),
+      use_index_(use_index),
+      indexed_(0) {}
+
 memory_datasource::~memory_datasource() {}
     
 void memory_datasource::push(feature_ptr feature)
 {
+#ifdef MAPNIK_THREADSAFE
+    mutex::scoped_lock lock(mutex_);
+#endif
     features_.push_back(feature);
+    if (use_index_)
+    {
+        envelopes_.push_back(feature->envelope());
+    }
 }
     
 int memory_datasource::type() const
@@ -70,7 +88,7 @@ int memory_datasource::type() const
     
 featureset_ptr memory_datasource::features(const query& q) const
 {
-    return featureset_ptr(new memory_featureset(q.get_bbox(),*this));
+    return features_in_box(q.get_bbox());
 }
 
 
@@ -80,7 +98,46 @@ featureset_ptr memory_datasource::features_at_point(coord2d const& pt) const
 #ifdef MAPNIK_DEBUG
     std::clog << "box=" << box << ", pt x=" << pt.x << ", y=" << pt.y << "\n";
 #endif
-    return featureset_ptr(new memory_featureset(box,*this));
+    return features_in_box(box);
+}
+
+featureset_ptr memory_datasource::features_in_box(box2d<double> const& box) const
+{
+    if (!use_index_ || features_.size() < index_threshold)
+    {
+        return featureset_ptr(new memory_featureset(box,*this));
+    }
+    std::vector<unsigned> candidates;
+    std::size_t indexed, count;
+    {
+#ifdef MAPNIK_THREADSAFE
+        mutex::scoped_lock lock(mutex_);
+#endif
+        update_index();
+        index_.query(box,candidates);
+        indexed = indexed_;
+        count = features_.size();
+    }
+    for (std::size_t i = indexed; i < count; ++i)
+    {
+        candidates.push_back(i);
+    }
+    // keep the order in which features were added
+    std::sort(candidates.begin(),candidates.end());
+    return featureset_ptr(new memory_featureset(box,*this,candidates));
+}
+
+void memory_datasource::update_index() const
+{
+    // features added after the index was built are scanned until
+    // there are enough of them to make rebuilding worthwhile
+    std::size_t pending = features_.size() - indexed_;
+    if (pending == 0 || (indexed_ > 0 && pending < std::max(index_threshold, indexed_ / 4)))
+    {
+        return;
+    }
+    index_.build(envelopes_);
+    indexed_ = features_.size();
 }
     
 box2d<double> memory_datasource::envelope() const
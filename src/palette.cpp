@@ -0,0 +1,178 @@
+/*****************************************************************************
+ *
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+
+//$Id$
+
+// mapnik
+#include <mapnik/palette.hpp>
+
+// boost
+#include <boost/lexical_cast.hpp>
+
+// stl
+#include <algorithm>
+
+namespace mapnik {
+
+namespace {
+
+struct is_transparent
+{
+    bool operator() (rgba const& c) const
+    {
+        return c.a < 255;
+    }
+};
+
+}
+
+rgba_palette::rgba_palette(std::string const& pal, palette_type type)
+{
+    unsigned char const* data = reinterpret_cast<unsigned char const*>(pal.data());
+    std::size_t length = pal.length();
+    switch (type)
+    {
+    case PALETTE_RGBA:
+        if (length % 4 != 0)
+            throw palette_error("invalid rgba palette: length must be a multiple of 4");
+        for (std::size_t i = 0; i < length; i += 4)
+        {
+            colors_.push_back(rgba(data[i], data[i + 1], data[i + 2], data[i + 3]));
+        }
+        break;
+    case PALETTE_RGB:
+        if (length % 3 != 0)
+            throw palette_error("invalid rgb palette: length must be a multiple of 3");
+        for (std::size_t i = 0; i < length; i += 3)
+        {
+            colors_.push_back(rgba(data[i], data[i + 1], data[i + 2], 255));
+        }
+        break;
+    case PALETTE_ACT:
+    {
+        // 256 rgb triples, optionally followed by the number of
+        // colors and the index of the transparent color
+        if (length != 768 && length != 772)
+            throw palette_error("invalid act palette: length must be 768 or 772 bytes");
+        unsigned count = 256;
+        int transparent = -1;
+        if (length == 772)
+        {
+            count = (data[768] << 8) | data[769];
+            if (count == 0 || count > 256) count = 256;
+            transparent = (data[770] << 8) | data[771];
+        }
+        for (unsigned i = 0; i < count; ++i)
+        {
+            colors_.push_back(rgba(data[i * 3], data[i * 3 + 1], data[i * 3 + 2],
+                                   int(i) == transparent ? 0 : 255));
+        }
+        break;
+    }
+    default:
+        throw palette_error("unknown palette type");
+    }
+    init();
+}
+
+rgba_palette::rgba_palette(std::vector<rgba> const& colors)
+    : colors_(colors)
+{
+    init();
+}
+
+std::string rgba_palette::to_string() const
+{
+    std::string pal;
+    pal.reserve(colors_.size() * 4);
+    for (std::vector<rgba>::const_iterator c = colors_.begin(); c != colors_.end(); ++c)
+    {
+        pal.push_back(c->r);
+        pal.push_back(c->g);
+        pal.push_back(c->b);
+        pal.push_back(c->a);
+    }
+    return pal;
+}
+
+void rgba_palette::init()
+{
+    if (colors_.empty() || colors_.size() > 256)
+        throw palette_error("invalid palette: must have 1 to 256 colors, got "
+                            + boost::lexical_cast<std::string>(colors_.size()));
+
+    // make transparent lowest indexes, so tRNS is small
+    std::stable_partition(colors_.begin(), colors_.end(), is_transparent());
+
+    transparent_index_ = -1;
+    alpha_levels_ = 1;
+    for (unsigned i = 0; i < colors_.size(); ++i)
+    {
+        rgba const& c = colors_[i];
+        rgb_pal_.push_back(rgb(c.r, c.g, c.b));
+        alpha_pal_.push_back(c.a);
+        if (c.a < 255) alpha_levels_ = ALPHA_LEVELS;
+        if (c.a == 0 && transparent_index_ < 0) transparent_index_ = i;
+    }
+
+    // nearest palette entry for the center of every lookup table cell,
+    // alpha is only taken into account if the palette has transparency
+    unsigned const cells = 1 << LUT_BITS;
+    unsigned const half = 1 << (7 - LUT_BITS);
+    lut_.resize(alpha_levels_ * cells * cells * cells);
+    std::vector<byte>::iterator out = lut_.begin();
+    for (unsigned level = 0; level < alpha_levels_; ++level)
+    {
+        int a = (alpha_levels_ == 1 || level == ALPHA_LEVELS - 1) ? 255 : int(level << 5) + 16;
+        for (unsigned ri = 0; ri < cells; ++ri)
+        {
+            int r = (ri << (8 - LUT_BITS)) + half;
+            for (unsigned gi = 0; gi < cells; ++gi)
+            {
+                int g = (gi << (8 - LUT_BITS)) + half;
+                for (unsigned bi = 0; bi < cells; ++bi)
+                {
+                    int b = (bi << (8 - LUT_BITS)) + half;
+                    int best = 0;
+                    int best_dist = 0x7fffffff;
+                    for (unsigned i = 0; i < colors_.size(); ++i)
+                    {
+                        rgba const& c = colors_[i];
+                        int dr = c.r - r;
+                        int dg = c.g - g;
+                        int db = c.b - b;
+                        int da = c.a - a;
+                        int dist = dr * dr + dg * dg + db * db + da * da;
+                        if (dist < best_dist)
+                        {
+                            best = i;
+                            best_dist = dist;
+                        }
+                    }
+                    *out++ = best;
+                }
+            }
+        }
+    }
+}
+
+}
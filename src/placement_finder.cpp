@@ -976,7 +976,7 @@ void placement_finder<DetectorT>::clear()
 
 
 typedef coord_transform2<CoordTransform,geometry_type> PathType;
-typedef label_collision_detector4 DetectorType;
+typedef label_collision_detector_type DetectorType;
 
 template class placement_finder<DetectorType>;
 template void placement_finder<DetectorType>::find_point_placements<PathType> (placement&, PathType & );
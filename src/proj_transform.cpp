@@ -25,6 +25,7 @@
 // mapnik
 #include <mapnik/proj_transform.hpp>
 #include <mapnik/utils.hpp>
+#include <mapnik/well_known_srs.hpp>
 // proj4
 #include <proj_api.h>
 
@@ -38,6 +39,19 @@ proj_transform::proj_transform(projection const& source,
     is_source_longlat_ = source_.is_geographic();
     is_dest_longlat_ = dest_.is_geographic();
     is_source_equal_dest_ = (source_ == dest_);
+    wgs84_to_merc_ = false;
+    merc_to_wgs84_ = false;
+    boost::optional<well_known_srs_e> src_k = source_.well_known();
+    boost::optional<well_known_srs_e> dest_k = dest_.well_known();
+    if (src_k && dest_k)
+    {
+        if (*src_k == *dest_k)
+            is_source_equal_dest_ = true;
+        else if (*src_k == WGS_84 && *dest_k == G_MERC)
+            wgs84_to_merc_ = true;
+        else if (*src_k == G_MERC && *dest_k == WGS_84)
+            merc_to_wgs84_ = true;
+    }
 }
 
 bool proj_transform::equal() const
@@ -50,6 +64,11 @@ bool proj_transform::forward (double & x, double & y , double & z) const
     if (is_source_equal_dest_)
         return true;
 
+    if (wgs84_to_merc_)
+        return lonlat2merc(&x,&y,1);
+    if (merc_to_wgs84_)
+        return merc2lonlat(&x,&y,1);
+
     if (is_source_longlat_)
     {
         x *= DEG_TO_RAD;
@@ -79,6 +98,11 @@ bool proj_transform::backward (double & x, double & y , double & z) const
 {
     if (is_source_equal_dest_)
         return true;
+
+    if (wgs84_to_merc_)
+        return merc2lonlat(&x,&y,1);
+    if (merc_to_wgs84_)
+        return lonlat2merc(&x,&y,1);
       
     if (is_dest_longlat_)
     {
@@ -105,6 +129,86 @@ bool proj_transform::backward (double & x, double & y , double & z) const
     return true;
 }
 
+bool proj_transform::forward (double * x, double * y , double * z, std::size_t point_count) const
+{
+    if (is_source_equal_dest_ || point_count == 0)
+        return true;
+
+    if (wgs84_to_merc_)
+        return lonlat2merc(x,y,point_count);
+    if (merc_to_wgs84_)
+        return merc2lonlat(x,y,point_count);
+
+    if (is_source_longlat_)
+    {
+        for (std::size_t i = 0; i < point_count; ++i)
+        {
+            x[i] *= DEG_TO_RAD;
+            y[i] *= DEG_TO_RAD;
+        }
+    }
+
+    int status;
+    {
+#if defined(MAPNIK_THREADSAFE) && PJ_VERSION < 480
+        mutex::scoped_lock lock(projection::mutex_);
+#endif
+        status = pj_transform( source_.proj_, dest_.proj_, point_count,
+                               0, x, y, z);
+    }
+
+    if (is_dest_longlat_)
+    {
+        for (std::size_t i = 0; i < point_count; ++i)
+        {
+            x[i] *= RAD_TO_DEG;
+            y[i] *= RAD_TO_DEG;
+        }
+    }
+
+    return status == 0;
+}
+
+bool proj_transform::backward (double * x, double * y , double * z, std::size_t point_count) const
+{
+    if (is_source_equal_dest_ || point_count == 0)
+        return true;
+
+    if (wgs84_to_merc_)
+        return merc2lonlat(x,y,point_count);
+    if (merc_to_wgs84_)
+        return lonlat2merc(x,y,point_count);
+
+    if (is_dest_longlat_)
+    {
+        for (std::size_t i = 0; i < point_count; ++i)
+        {
+            x[i] *= DEG_TO_RAD;
+            y[i] *= DEG_TO_RAD;
+        }
+    }
+
+    int status;
+    {
+#if defined(MAPNIK_THREADSAFE) && PJ_VERSION < 480
+        mutex::scoped_lock lock(projection::mutex_);
+#endif
+        status = pj_transform( dest_.proj_, source_.proj_, point_count,
+                               0, x, y, z);
+    }
+
+    if (is_source_longlat_)
+    {
+        for (std::size_t i = 0; i < point_count; ++i)
+        {
+            x[i] *= RAD_TO_DEG;
+            y[i] *= RAD_TO_DEG;
+        }
+    }
+
+    return status == 0;
+}
+
 mapnik::projection const& proj_transform::source() const
 {
     return source_;
@@ -77,6 +77,11 @@ std::string const& projection::params() const
 {
     return params_;
 }
+
+boost::optional<well_known_srs_e> projection::well_known() const
+{
+    return well_known_;
+}
     
 void projection::forward(double & x, double &y ) const
 {
@@ -114,6 +119,48 @@ void projection::inverse(double & x,double & y) const
     y = RAD_TO_DEG * p.v;
 }
     
+void projection::forward(double * x, double * y, std::size_t point_count) const
+{
+#if defined(MAPNIK_THREADSAFE) && PJ_VERSION < 480
+    mutex::scoped_lock lock(mutex_);
+#endif
+    for (std::size_t i = 0; i < point_count; ++i)
+    {
+        projUV p;
+        p.u = x[i] * DEG_TO_RAD;
+        p.v = y[i] * DEG_TO_RAD;
+        p = pj_fwd(p,proj_);
+        x[i] = p.u;
+        y[i] = p.v;
+        if (is_geographic_)
+        {
+            x[i] *= RAD_TO_DEG;
+            y[i] *= RAD_TO_DEG;
+        }
+    }
+}
+
+void projection::inverse(double * x, double * y, std::size_t point_count) const
+{
+#if defined(MAPNIK_THREADSAFE) && PJ_VERSION < 480
+    mutex::scoped_lock lock(mutex_);
+#endif
+    for (std::size_t i = 0; i < point_count; ++i)
+    {
+        projUV p;
+        p.u = x[i];
+        p.v = y[i];
+        if (is_geographic_)
+        {
+            p.u *= DEG_TO_RAD;
+            p.v *= DEG_TO_RAD;
+        }
+        p = pj_inv(p,proj_);
+        x[i] = RAD_TO_DEG * p.u;
+        y[i] = RAD_TO_DEG * p.v;
+    }
+}
+    
 projection::~projection() 
 {
 #if defined(MAPNIK_THREADSAFE) && PJ_VERSION < 480
@@ -138,6 +185,7 @@ void projection::init()
 #endif
     if (!proj_) throw proj_init_error(params_);
     is_geographic_ = pj_is_latlong(proj_) ? true : false;
+    well_known_ = is_well_known_srs(params_);
 }
     
 void projection::swap (projection& rhs)
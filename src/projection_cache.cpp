@@ -0,0 +1,192 @@
+/*****************************************************************************
+ *
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+
+//$Id$
+
+// mapnik
+#include <mapnik/projection_cache.hpp>
+
+// boost
+#include <boost/algorithm/string.hpp>
+#include <boost/unordered_map.hpp>
+#ifdef MAPNIK_THREADSAFE
+#include <boost/thread/tss.hpp>
+#endif
+
+// stl
+#include <vector>
+#include <utility>
+
+namespace mapnik
+{
+
+namespace {
+
+// a transform keeps references to its projections, so they are
+// owned together and the transform is handed out as an alias
+struct transform_holder : private boost::noncopyable
+{
+    transform_holder(projection_ptr const& source, projection_ptr const& dest)
+        : source_(source),
+          dest_(dest),
+          trans_(*source_, *dest_) {}
+
+    projection_ptr source_;
+    projection_ptr dest_;
+    proj_transform trans_;
+};
+
+typedef boost::unordered_map<std::string,projection_ptr> projection_map;
+typedef boost::unordered_map<std::pair<std::string,std::string>,proj_transform_ptr> transform_map;
+
+struct cache_entries : private boost::noncopyable
+{
+    cache_entries()
+        : generation(0) {}
+
+    std::size_t generation;
+    projection_map projections;
+    transform_map transforms;
+};
+
+#ifdef MAPNIK_THREADSAFE
+boost::thread_specific_ptr<cache_entries> thread_entries;
+#else
+cache_entries process_entries;
+#endif
+
+// the entries of the calling thread, projection_cache::mutex_ must be held
+cache_entries & local_entries()
+{
+#ifdef MAPNIK_THREADSAFE
+    if (!thread_entries.get())
+    {
+        thread_entries.reset(new cache_entries);
+    }
+    cache_entries & entries = *thread_entries;
+#else
+    cache_entries & entries = process_entries;
+#endif
+    if (entries.generation != projection_cache::generation_)
+    {
+        // objects still in use stay alive through their shared pointers
+        entries.projections.clear();
+        entries.transforms.clear();
+        entries.generation = projection_cache::generation_;
+    }
+    return entries;
+}
+
+}
+
+projection_cache_stats projection_cache::stats_;
+std::size_t projection_cache::generation_ = 0;
+
+std::string projection_cache::normalize(std::string const& params)
+{
+    std::vector<std::string> tokens;
+    std::string trimmed = boost::algorithm::trim_copy(params);
+    boost::algorithm::split(tokens, trimmed, boost::algorithm::is_space(), boost::algorithm::token_compress_on);
+    return boost::algorithm::join(tokens, " ");
+}
+
+projection_ptr projection_cache::get(std::string const& params)
+{
+    std::string key = normalize(params);
+#ifdef MAPNIK_THREADSAFE
+    mutex::scoped_lock lock(mutex_);
+#endif
+    cache_entries & entries = local_entries();
+    projection_map::const_iterator itr = entries.projections.find(key);
+    if (itr != entries.projections.end())
+    {
+        ++stats_.projection_hits;
+        return itr->second;
+    }
+    ++stats_.projection_misses;
+#ifdef MAPNIK_THREADSAFE
+    // initialize outside of the lock, pj_init may hit the disk
+    lock.unlock();
+#endif
+
+    projection_ptr proj(new projection(key));
+    if (entries.projections.size() < max_entries)
+    {
+        entries.projections.insert(std::make_pair(key, proj));
+    }
+    return proj;
+}
+
+proj_transform_ptr projection_cache::get_transform(std::string const& source, std::string const& dest)
+{
+    std::pair<std::string,std::string> key(normalize(source), normalize(dest));
+#ifdef MAPNIK_THREADSAFE
+    mutex::scoped_lock lock(mutex_);
+#endif
+    cache_entries & entries = local_entries();
+    transform_map::const_iterator itr = entries.transforms.find(key);
+    if (itr != entries.transforms.end())
+    {
+        ++stats_.transform_hits;
+        return itr->second;
+    }
+    ++stats_.transform_misses;
+#ifdef MAPNIK_THREADSAFE
+    lock.unlock();
+#endif
+
+    boost::shared_ptr<transform_holder> holder(new transform_holder(get(key.first), get(key.second)));
+    proj_transform_ptr trans(holder, &holder->trans_);
+    if (entries.transforms.size() < max_entries)
+    {
+        entries.transforms.insert(std::make_pair(key, trans));
+    }
+    return trans;
+}
+
+projection_cache_stats projection_cache::stats()
+{
+#ifdef MAPNIK_THREADSAFE
+    mutex::scoped_lock lock(mutex_);
+#endif
+    cache_entries & entries = local_entries();
+    projection_cache_stats result = stats_;
+    result.projections = entries.projections.size();
+    result.transforms = entries.transforms.size();
+    return result;
+}
+
+void projection_cache::clear()
+{
+#ifdef MAPNIK_THREADSAFE
+    mutex::scoped_lock lock(mutex_);
+#endif
+    // the entries of every thread are dropped on their next lookup
+    ++generation_;
+    stats_ = projection_cache_stats();
+}
+
+#ifdef MAPNIK_THREADSAFE
+boost::mutex projection_cache::mutex_;
+#endif
+
+}
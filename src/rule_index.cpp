@@ -0,0 +1,289 @@
+/*****************************************************************************
+ *
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+
+//$Id$
+
+// mapnik
+#include <mapnik/rule_index.hpp>
+// boost
+#include <boost/variant.hpp>
+// stl
+#include <map>
+#include <algorithm>
+#include <iterator>
+
+namespace mapnik
+{
+
+namespace {
+
+// attribute and literal of [attr] = literal, or literal = [attr]
+bool equality_operands(binary_node<tags::equal_to> const& x,
+                       attribute const*& attr, value_type const*& val)
+{
+    attr = boost::get<attribute>(&x.left);
+    val = boost::get<value_type>(&x.right);
+    if (attr && val) return true;
+    attr = boost::get<attribute>(&x.right);
+    val = boost::get<value_type>(&x.left);
+    return attr && val;
+}
+
+// names of the attributes compared to literals through and/or
+struct equality_attributes : boost::static_visitor<void>
+{
+    explicit equality_attributes(std::vector<std::string> & names)
+        : names_(names) {}
+
+    template <typename T>
+    void operator() (T const&) const {}
+
+    void operator() (binary_node<tags::equal_to> const& x) const
+    {
+        attribute const* attr;
+        value_type const* val;
+        if (equality_operands(x, attr, val) &&
+            std::find(names_.begin(), names_.end(), attr->name()) == names_.end())
+        {
+            names_.push_back(attr->name());
+        }
+    }
+
+    void operator() (binary_node<tags::logical_and> const& x) const
+    {
+        boost::apply_visitor(*this, x.left);
+        boost::apply_visitor(*this, x.right);
+    }
+
+    void operator() (binary_node<tags::logical_or> const& x) const
+    {
+        boost::apply_visitor(*this, x.left);
+        boost::apply_visitor(*this, x.right);
+    }
+
+    std::vector<std::string> & names_;
+};
+
+// literals one of which the attribute must equal for the expression to
+// be true, false if there is no such set of literals
+struct equality_keys : boost::static_visitor<bool>
+{
+    equality_keys(std::string const& name, std::vector<value_type> & keys)
+        : name_(name),
+          keys_(keys) {}
+
+    template <typename T>
+    bool operator() (T const&) const
+    {
+        return false;
+    }
+
+    bool operator() (binary_node<tags::equal_to> const& x) const
+    {
+        attribute const* attr;
+        value_type const* val;
+        if (!equality_operands(x, attr, val) || attr->name() != name_) return false;
+        keys_.push_back(*val);
+        return true;
+    }
+
+    bool operator() (binary_node<tags::logical_and> const& x) const
+    {
+        std::size_t size = keys_.size();
+        if (boost::apply_visitor(*this, x.left)) return true;
+        keys_.resize(size);
+        return boost::apply_visitor(*this, x.right);
+    }
+
+    bool operator() (binary_node<tags::logical_or> const& x) const
+    {
+        std::size_t size = keys_.size();
+        if (boost::apply_visitor(*this, x.left) && boost::apply_visitor(*this, x.right)) return true;
+        keys_.resize(size);
+        return false;
+    }
+
+    std::string const& name_;
+    std::vector<value_type> & keys_;
+};
+
+bool indexable(expression_ptr const& expr, std::string const& name, std::vector<value_type> & keys)
+{
+    keys.clear();
+    return expr && boost::apply_visitor(equality_keys(name, keys), *expr);
+}
+
+}
+
+// bucket of a feature value, null if there is none. Values are only
+// equal to values of the same kind, ints and doubles compare as numbers
+// and null is equal to nothing.
+struct rule_index::find_bucket : boost::static_visitor<std::vector<unsigned> const*>
+{
+    explicit find_bucket(rule_index const& index)
+        : index_(index) {}
+
+    std::vector<unsigned> const* operator() (value_null) const
+    {
+        return 0;
+    }
+
+    std::vector<unsigned> const* operator() (bool val) const
+    {
+        return &index_.bools_[val ? 1 : 0];
+    }
+
+    std::vector<unsigned> const* operator() (int val) const
+    {
+        return (*this)(double(val));
+    }
+
+    std::vector<unsigned> const* operator() (double val) const
+    {
+        number_table::const_iterator itr = index_.numbers_.find(val);
+        return itr != index_.numbers_.end() ? &itr->second : 0;
+    }
+
+    std::vector<unsigned> const* operator() (UnicodeString const& val) const
+    {
+        string_table::const_iterator itr = index_.strings_.find(val);
+        return itr != index_.strings_.end() ? &itr->second : 0;
+    }
+
+    rule_index const& index_;
+};
+
+// bucket of a literal, null for null which no value equals
+struct rule_index::insert_bucket : boost::static_visitor<std::vector<unsigned> *>
+{
+    explicit insert_bucket(rule_index & index)
+        : index_(index) {}
+
+    std::vector<unsigned> * operator() (value_null) const
+    {
+        return 0;
+    }
+
+    std::vector<unsigned> * operator() (bool val) const
+    {
+        return &index_.bools_[val ? 1 : 0];
+    }
+
+    std::vector<unsigned> * operator() (int val) const
+    {
+        return &index_.numbers_[double(val)];
+    }
+
+    std::vector<unsigned> * operator() (double val) const
+    {
+        return &index_.numbers_[val];
+    }
+
+    std::vector<unsigned> * operator() (UnicodeString const& val) const
+    {
+        return &index_.strings_[val];
+    }
+
+    rule_index & index_;
+};
+
+rule_index::rule_index(std::vector<expression_ptr> const& filters)
+{
+    // index by the attribute most filters can be filed under
+    std::vector<std::string> names;
+    for (unsigned i = 0; i < filters.size(); ++i)
+    {
+        if (filters[i]) boost::apply_visitor(equality_attributes(names), *filters[i]);
+    }
+    std::vector<value_type> keys;
+    unsigned best = 0;
+    for (std::vector<std::string>::const_iterator name = names.begin(); name != names.end(); ++name)
+    {
+        unsigned count = 0;
+        for (unsigned i = 0; i < filters.size(); ++i)
+        {
+            if (indexable(filters[i], *name, keys)) ++count;
+        }
+        if (count > best)
+        {
+            best = count;
+            attribute_ = *name;
+        }
+    }
+    // a single filed filter is not worth a lookup per feature
+    if (best < 2)
+    {
+        attribute_.clear();
+    }
+
+    for (unsigned i = 0; i < filters.size(); ++i)
+    {
+        if (!indexed() || !indexable(filters[i], attribute_, keys))
+        {
+            unindexed_.push_back(i);
+            continue;
+        }
+        for (std::vector<value_type>::const_iterator key = keys.begin(); key != keys.end(); ++key)
+        {
+            std::vector<unsigned> * ids = boost::apply_visitor(insert_bucket(*this), key->base());
+            if (ids && (ids->empty() || ids->back() != i)) ids->push_back(i);
+        }
+    }
+
+    // merge the unindexed filters into the buckets
+    std::vector<std::vector<unsigned> *> buckets;
+    buckets.push_back(&bools_[0]);
+    buckets.push_back(&bools_[1]);
+    for (string_table::iterator itr = strings_.begin(); itr != strings_.end(); ++itr)
+    {
+        buckets.push_back(&itr->second);
+    }
+    for (number_table::iterator itr = numbers_.begin(); itr != numbers_.end(); ++itr)
+    {
+        buckets.push_back(&itr->second);
+    }
+    for (unsigned i = 0; i < buckets.size(); ++i)
+    {
+        std::vector<unsigned> merged;
+        merged.reserve(buckets[i]->size() + unindexed_.size());
+        std::merge(buckets[i]->begin(), buckets[i]->end(), unindexed_.begin(), unindexed_.end(),
+                   std::back_inserter(merged));
+        buckets[i]->swap(merged);
+    }
+}
+
+std::vector<unsigned> const& rule_index::candidates(Feature const& feature) const
+{
+    if (indexed())
+    {
+        std::map<std::string,value_type> const& props = feature.props();
+        std::map<std::string,value_type>::const_iterator itr = props.find(attribute_);
+        if (itr != props.end())
+        {
+            std::vector<unsigned> const* ids = boost::apply_visitor(find_bucket(*this), itr->second.base());
+            if (ids) return *ids;
+        }
+    }
+    return unindexed_;
+}
+
+}
@@ -0,0 +1,224 @@
+/*****************************************************************************
+ *
+ * This file is part of Mapnik (c++ mapping toolkit)
+ *
+ * Copyright (C) 2011 Artem Pavlenko
+ *
+ * This library is free software; you can redistribute it and/or
+ * modify it under the terms of the GNU Lesser General Public
+ * License as published by the Free Software Foundation; either
+ * version 2.1 of the License, or (at your option) any later version.
+ *
+ * This library is distributed in the hope that it will be useful,
+ * but WITHOUT ANY WARRANTY; without even the implied warranty of
+ * MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+ * Lesser General Public License for more details.
+ *
+ * You should have received a copy of the GNU Lesser General Public
+ * License along with this library; if not, write to the Free Software
+ * Foundation, Inc., 51 Franklin St, Fifth Floor, Boston, MA  02110-1301  USA
+ *
+ *****************************************************************************/
+
+//$Id$
+
+// mapnik
+#include <mapnik/well_known_srs.hpp>
+
+// boost
+#include <boost/algorithm/string.hpp>
+#include <boost/lexical_cast.hpp>
+
+// stl
+#include <map>
+#include <vector>
+#include <cmath>
+
+namespace mapnik {
+
+namespace {
+
+// semi-major axis of the spherical mercator sphere
+const double EARTH_RADIUS = 6378137.0;
+const double PI = 3.14159265358979323846;
+const double HALF_PI = PI / 2.0;
+const double DEG_TO_RADIANS = PI / 180.0;
+const double RADIANS_TO_DEG = 180.0 / PI;
+// same tolerances as proj4
+const double POLE_EPS = 1.0e-10;
+const double SPI = 3.14159265359;
+
+typedef std::map<std::string,std::string> proj_params;
+
+bool parse_params(std::string const& params, proj_params & result)
+{
+    std::vector<std::string> tokens;
+    boost::algorithm::split(tokens, params, boost::algorithm::is_space(), boost::algorithm::token_compress_on);
+    for (std::vector<std::string>::const_iterator itr = tokens.begin(); itr != tokens.end(); ++itr)
+    {
+        if (itr->empty()) continue;
+        if ((*itr)[0] != '+') return false;
+        std::string::size_type pos = itr->find('=');
+        if (pos == std::string::npos)
+            result[itr->substr(1)] = "";
+        else
+            result[itr->substr(1, pos - 1)] = itr->substr(pos + 1);
+    }
+    return true;
+}
+
+bool has_only(proj_params const& params, char const* allowed[])
+{
+    for (proj_params::const_iterator itr = params.begin(); itr != params.end(); ++itr)
+    {
+        bool found = false;
+        for (char const** key = allowed; *key; ++key)
+        {
+            if (itr->first == *key)
+            {
+                found = true;
+                break;
+            }
+        }
+        if (!found) return false;
+    }
+    return true;
+}
+
+bool has_value(proj_params const& params, std::string const& key, double value)
+{
+    proj_params::const_iterator itr = params.find(key);
+    if (itr == params.end()) return false;
+    try
+    {
+        return boost::lexical_cast<double>(itr->second) == value;
+    }
+    catch (boost::bad_lexical_cast const&)
+    {
+        return false;
+    }
+}
+
+bool is_value_or_missing(proj_params const& params, std::string const& key, double value)
+{
+    return params.find(key) == params.end() || has_value(params, key, value);
+}
+
+bool is_init(proj_params const& params, char const* codes[])
+{
+    static char const* allowed[] = { "init", "no_defs", 0 };
+    proj_params::const_iterator itr = params.find("init");
+    if (itr == params.end() || !has_only(params, allowed)) return false;
+    for (char const** code = codes; *code; ++code)
+    {
+        if (boost::algorithm::iequals(itr->second, *code)) return true;
+    }
+    return false;
+}
+
+bool is_wgs84(proj_params const& params)
+{
+    static char const* codes[] = { "epsg:4326", 0 };
+    if (is_init(params, codes)) return true;
+
+    static char const* allowed[] = { "proj", "ellps", "datum", "towgs84", "no_defs", "wktext", 0 };
+    if (!has_only(params, allowed)) return false;
+    proj_params::const_iterator proj = params.find("proj");
+    if (proj == params.end() || (proj->second != "longlat" && proj->second != "latlong" &&
+                                 proj->second != "lonlat" && proj->second != "latlon"))
+        return false;
+    proj_params::const_iterator datum = params.find("datum");
+    proj_params::const_iterator ellps = params.find("ellps");
+    if (datum != params.end())
+    {
+        if (datum->second != "WGS84") return false;
+        if (ellps != params.end() && ellps->second != "WGS84") return false;
+    }
+    else if (ellps == params.end() || ellps->second != "WGS84")
+    {
+        return false;
+    }
+    proj_params::const_iterator towgs84 = params.find("towgs84");
+    if (towgs84 != params.end() && towgs84->second != "0,0,0" && towgs84->second != "0,0,0,0,0,0,0")
+        return false;
+    return true;
+}
+
+bool is_spherical_mercator(proj_params const& params)
+{
+    static char const* codes[] = { "epsg:3857", "epsg:900913", "epsg:3785", 0 };
+    if (is_init(params, codes)) return true;
+
+    static char const* allowed[] = { "proj", "a", "b", "R", "lat_ts", "lon_0", "x_0", "y_0",
+                                     "k", "k_0", "units", "nadgrids", "no_defs", "wktext", 0 };
+    if (!has_only(params, allowed)) return false;
+    proj_params::const_iterator proj = params.find("proj");
+    if (proj == params.end() || proj->second != "merc") return false;
+    bool sphere = has_value(params, "R", EARTH_RADIUS) ||
+        (has_value(params, "a", EARTH_RADIUS) && has_value(params, "b", EARTH_RADIUS));
+    if (!sphere) return false;
+    proj_params::const_iterator units = params.find("units");
+    if (units != params.end() && units->second != "m") return false;
+    proj_params::const_iterator nadgrids = params.find("nadgrids");
+    if (nadgrids != params.end() && nadgrids->second != "@null") return false;
+    return is_value_or_missing(params, "lat_ts", 0.0) &&
+        is_value_or_missing(params, "lon_0", 0.0) &&
+        is_value_or_missing(params, "x_0", 0.0) &&
+        is_value_or_missing(params, "y_0", 0.0) &&
+        is_value_or_missing(params, "k", 1.0) &&
+        is_value_or_missing(params, "k_0", 1.0);
+}
+
+// normalize a longitude in radians to [-pi,pi] like proj4's adjlon
+inline double adjust_lon(double lon)
+{
+    if (std::fabs(lon) < SPI) return lon;
+    lon += PI;
+    lon -= 2.0 * PI * std::floor(lon / (2.0 * PI));
+    lon -= PI;
+    return lon;
+}
+
+}
+
+boost::optional<well_known_srs_e> is_well_known_srs(std::string const& params)
+{
+    proj_params parsed;
+    if (parse_params(params, parsed))
+    {
+        if (is_wgs84(parsed)) return boost::optional<well_known_srs_e>(WGS_84);
+        if (is_spherical_mercator(parsed)) return boost::optional<well_known_srs_e>(G_MERC);
+    }
+    return boost::optional<well_known_srs_e>();
+}
+
+bool lonlat2merc(double * x, double * y, std::size_t point_count)
+{
+    bool ok = true;
+    for (std::size_t i = 0; i < point_count; ++i)
+    {
+        double lat = y[i] * DEG_TO_RADIANS;
+        if (std::fabs(std::fabs(lat) - HALF_PI) <= POLE_EPS || std::fabs(lat) > HALF_PI)
+        {
+            x[i] = HUGE_VAL;
+            y[i] = HUGE_VAL;
+            ok = false;
+            continue;
+        }
+        x[i] = EARTH_RADIUS * adjust_lon(x[i] * DEG_TO_RADIANS);
+        y[i] = EARTH_RADIUS * std::log(std::tan(0.25 * PI + 0.5 * lat));
+    }
+    return ok;
+}
+
+bool merc2lonlat(double * x, double * y, std::size_t point_count)
+{
+    for (std::size_t i = 0; i < point_count; ++i)
+    {
+        x[i] = adjust_lon(x[i] / EARTH_RADIUS) * RADIANS_TO_DEG;
+        y[i] = (HALF_PI - 2.0 * std::atan(std::exp(-y[i] / EARTH_RADIUS))) * RADIANS_TO_DEG;
+    }
+    return true;
+}
+
+}
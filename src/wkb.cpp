@@ -26,10 +26,14 @@
 #include <mapnik/wkb.hpp>
 #include <mapnik/geom_util.hpp>
 #include <mapnik/feature.hpp>
+#include <mapnik/value_error.hpp>
 
 // boost
 #include <boost/utility.hpp>
 
+// stl
+#include <memory>
+
 namespace mapnik
 {
 struct wkb_reader : boost::noncopyable
@@ -64,6 +68,7 @@ public:
           pos_(0),
           format_(format)
     {
+        need(format_ == wkbSpatiaLite ? 39 : 1);
         switch (format_)
         {
         case wkbSpatiaLite:
@@ -150,9 +155,36 @@ public:
     }
           
 private:
-        
+
+    // throws if fewer than bytes are left to read
+    void need(std::size_t bytes) const
+    {
+        if (pos_ > size_ || bytes > size_ - pos_)
+        {
+            throw value_error("wkb geometry is truncated");
+        }
+    }
+
+    void skip(unsigned bytes)
+    {
+        need(bytes);
+        pos_ += bytes;
+    }
+
+    // number of items that take at least item_size bytes each
+    unsigned read_count(std::size_t item_size)
+    {
+        int n = read_integer();
+        if (n < 0 || std::size_t(n) > (size_ - pos_) / item_size)
+        {
+            throw value_error("wkb geometry has an invalid item count");
+        }
+        return n;
+    }
+
     int read_integer() 
     {
+        need(4);
         boost::int32_t n;
         if (needSwap_)
         {
@@ -169,6 +201,7 @@ private:
         
     double read_double()
     {
+        need(8);
         double d;
         if (needSwap_)
         {
@@ -186,6 +219,7 @@ private:
     void read_coords(CoordinateArray& ar)
     {
         int size=sizeof(coord<double,2>)*ar.size();
+        need(16 * ar.size());
         if (!needSwap_)
         {
             std::memcpy(&ar[0],wkb_+pos_,size);
@@ -205,158 +239,161 @@ private:
         
     void read_point(Feature & feature)
     {
-        geometry_type * pt = new geometry_type(Point);
+        std::auto_ptr<geometry_type> pt(new geometry_type(Point));
         double x = read_double();
         double y = read_double();
         pt->move_to(x,y);
-        feature.add_geometry(pt);
+        feature.add_geometry(pt.release());
     }
          
     void read_multipoint(Feature & feature)
     {
-        int num_points = read_integer();
-        for (int i=0;i<num_points;++i) 
+        unsigned num_points = read_count(21);
+        for (unsigned i=0;i<num_points;++i) 
         {
-            pos_+=5;
+            skip(5);
             read_point(feature);
         }
     }
          
     void read_multipoint_2(Feature & feature)
     {
-        geometry_type * pt = new geometry_type(MultiPoint);
-        int num_points = read_integer(); 
-        for (int i=0;i<num_points;++i) 
+        std::auto_ptr<geometry_type> pt(new geometry_type(MultiPoint));
+        unsigned num_points = read_count(21);
+        for (unsigned i=0;i<num_points;++i) 
         {
-            pos_+=5;
+            skip(5);
             double x = read_double();
             double y = read_double();
             pt->move_to(x,y);
         }
-        feature.add_geometry(pt);
+        feature.add_geometry(pt.release());
     }
          
     void read_linestring(Feature & feature)
     {
-        geometry_type * line = new geometry_type(LineString);
-        int num_points=read_integer();
+        std::auto_ptr<geometry_type> line(new geometry_type(LineString));
+        unsigned num_points=read_count(16);
         CoordinateArray ar(num_points);
         read_coords(ar);
         line->set_capacity(num_points);
-        line->move_to(ar[0].x,ar[0].y);
-        for (int i=1;i<num_points;++i)
+        if (num_points > 0) line->move_to(ar[0].x,ar[0].y);
+        for (unsigned i=1;i<num_points;++i)
         {
             line->line_to(ar[i].x,ar[i].y);
         }
-        feature.add_geometry(line);
+        feature.add_geometry(line.release());
     }
          
     void read_multilinestring(Feature & feature)
     {
-        int num_lines=read_integer();
-        for (int i=0;i<num_lines;++i)
+        unsigned num_lines=read_count(9);
+        for (unsigned i=0;i<num_lines;++i)
         {
-            pos_+=5;
+            skip(5);
             read_linestring(feature);
         }
     }
 
     void read_multilinestring_2(Feature & feature)
     {
-        geometry_type * line = new geometry_type(MultiLineString);
-        int num_lines=read_integer();
+        std::auto_ptr<geometry_type> line(new geometry_type(MultiLineString));
+        unsigned num_lines=read_count(9);
         unsigned capacity = 0;
-        for (int i=0;i<num_lines;++i)
+        for (unsigned i=0;i<num_lines;++i)
         {
-            pos_+=5;
-            int num_points=read_integer();
+            skip(5);
+            unsigned num_points=read_count(16);
+            if (num_points == 0) continue;
             capacity+=num_points;
             CoordinateArray ar(num_points); 
             read_coords(ar);
             line->set_capacity(capacity);
             line->move_to(ar[0].x,ar[0].y); 
-            for (int j=1;j<num_points;++j) 
+            for (unsigned j=1;j<num_points;++j) 
             { 
                 line->line_to(ar[j].x,ar[j].y); 
             } 
         }
-        feature.add_geometry(line);
+        feature.add_geometry(line.release());
     }
          
     void read_polygon(Feature & feature) 
     {
-        geometry_type * poly = new geometry_type(Polygon);
-        int num_rings=read_integer();
+        std::auto_ptr<geometry_type> poly(new geometry_type(Polygon));
+        unsigned num_rings=read_count(4);
         unsigned capacity = 0;
-        for (int i=0;i<num_rings;++i)
+        for (unsigned i=0;i<num_rings;++i)
         {
-            int num_points=read_integer();
+            unsigned num_points=read_count(16);
+            if (num_points == 0) continue;
             capacity+=num_points;
             CoordinateArray ar(num_points);
             read_coords(ar);
             poly->set_capacity(capacity);
             poly->move_to(ar[0].x,ar[0].y);
-            for (int j=1;j<num_points;++j)
+            for (unsigned j=1;j<num_points;++j)
             {
                 poly->line_to(ar[j].x,ar[j].y);
             }
         }
-        feature.add_geometry(poly);
+        feature.add_geometry(poly.release());
     }
         
     void read_multipolygon(Feature & feature)
     {
-        int num_polys=read_integer();
-        for (int i=0;i<num_polys;++i)
+        unsigned num_polys=read_count(9);
+        for (unsigned i=0;i<num_polys;++i)
         {
-            pos_+=5;
+            skip(5);
             read_polygon(feature);
         }
     }
     
     void read_multipolygon_2(Feature & feature)
     {
-        geometry_type * poly = new geometry_type(MultiPolygon);
-        int num_polys=read_integer();
+        std::auto_ptr<geometry_type> poly(new geometry_type(MultiPolygon));
+        unsigned num_polys=read_count(9);
         unsigned capacity = 0;
-        for (int i=0;i<num_polys;++i)
+        for (unsigned i=0;i<num_polys;++i)
         {
-            pos_+=5;
-            int num_rings=read_integer();
-            for (int r=0;r<num_rings;++r)
+            skip(5);
+            unsigned num_rings=read_count(4);
+            for (unsigned r=0;r<num_rings;++r)
             {
-                int num_points=read_integer();
+                unsigned num_points=read_count(16);
+                if (num_points == 0) continue;
                 capacity += num_points;
                 CoordinateArray ar(num_points);
                 read_coords(ar);
                 poly->set_capacity(capacity);
                 poly->move_to(ar[0].x,ar[0].y);
-                for (int j=1;j<num_points;++j)
+                for (unsigned j=1;j<num_points;++j)
                 {
                     poly->line_to(ar[j].x,ar[j].y);
                 }
                 poly->line_to(ar[0].x,ar[0].y);
             }
         }
-        feature.add_geometry(poly);
+        feature.add_geometry(poly.release());
     }
 
     void read_collection(Feature & feature)
     {
-        int num_geometries=read_integer();
-        for (int i=0;i<num_geometries;++i)
+        unsigned num_geometries=read_count(5);
+        for (unsigned i=0;i<num_geometries;++i)
         {
-            pos_+=1; // skip byte order
+            skip(1); // byte order
             read(feature);
         }
     }
     
     void read_collection_2(Feature & feature)
     {
-        int num_geometries=read_integer();
-        for (int i=0;i<num_geometries;++i)
+        unsigned num_geometries=read_count(5);
+        for (unsigned i=0;i<num_geometries;++i)
         {
-            pos_+=1; // skip byte order
+            skip(1); // byte order
             read_multi(feature);
         }
     }
@@ -0,0 +1,77 @@
+#include <boost/config/warning_disable.hpp>
+
+#include <boost/detail/lightweight_test.hpp>
+#include <iostream>
+#include <mapnik/feature_type_style.hpp>
+#include <mapnik/filter_factory.hpp>
+
+using mapnik::feature_type_style;
+using mapnik::active_rules_ptr;
+using mapnik::rule;
+
+int main( int, char*[] )
+{
+    feature_type_style style;
+    rule low("low", "", 0, 5000);
+    low.set_filter(mapnik::parse_expression("[highway] = 'motorway'", "utf8"));
+    style.add_rule(low);
+    rule high("high", "", 5000, 100000);
+    high.set_filter(mapnik::parse_expression("[population] > 1000", "utf8"));
+    style.add_rule(high);
+    rule other("other", "", 0, 100000);
+    other.set_else(true);
+    style.add_rule(other);
+
+//  active rules per scale  --------------------------------------------------//
+
+    active_rules_ptr rules = style.get_active_rules(1000);
+    BOOST_TEST_EQ( rules->rules.size(), 2u );
+    BOOST_TEST_EQ( rules->if_rules.size(), 1u );
+    BOOST_TEST_EQ( rules->if_rules[0]->get_name(), std::string("low") );
+    BOOST_TEST_EQ( rules->else_rules.size(), 1u );
+    BOOST_TEST_EQ( rules->filters.size(), 1u );
+    BOOST_TEST( rules->names.count("highway") == 1 && rules->names.count("population") == 0 );
+
+    rules = style.get_active_rules(20000);
+    BOOST_TEST_EQ( rules->if_rules.size(), 1u );
+    BOOST_TEST_EQ( rules->if_rules[0]->get_name(), std::string("high") );
+    BOOST_TEST( rules->names.count("population") == 1 && rules->names.count("highway") == 0 );
+
+    BOOST_TEST( style.get_active_rules(1000000)->rules.empty() );
+
+    // scales within a range share the cached rules
+    BOOST_TEST( style.get_active_rules(100) == style.get_active_rules(4000) );
+    BOOST_TEST( style.get_active_rules(100) != style.get_active_rules(6000) );
+
+//  or of the filters for the datasource  ------------------------------------//
+
+    // the else rule renders any feature
+    BOOST_TEST( !style.get_active_rules(1000)->filter );
+    feature_type_style filtered;
+    filtered.add_rule(low);
+    filtered.add_rule(high);
+    BOOST_TEST( filtered.get_active_rules(1000)->filter == low.get_filter() );
+    filtered.add_rule(rule("all", "", 0, 5000));
+    BOOST_TEST( !filtered.get_active_rules(1000)->filter );
+    BOOST_TEST( filtered.get_active_rules(20000)->filter == high.get_filter() );
+
+//  changing the rules invalidates the cache  --------------------------------//
+
+    active_rules_ptr before = style.get_active_rules(1000);
+    style.get_rules_nonconst()[0].set_max_scale(500);
+    rules = style.get_active_rules(1000);
+    BOOST_TEST( rules != before );
+    BOOST_TEST( rules->if_rules.empty() );
+    BOOST_TEST_EQ( rules->else_rules.size(), 1u );
+
+    style.add_rule(rule("all"));
+    BOOST_TEST_EQ( style.get_active_rules(1000)->if_rules.size(), 1u );
+    BOOST_TEST_EQ( style.get_active_rules(1000000)->rules.size(), 1u );
+
+    // copies have their own cache
+    feature_type_style copy(style);
+    BOOST_TEST_EQ( copy.get_active_rules(1000)->rules.size(), 2u );
+    BOOST_TEST( copy.get_active_rules(1000) != style.get_active_rules(1000) );
+
+    return ::boost::report_errors();
+}
@@ -0,0 +1,93 @@
+#include <boost/config/warning_disable.hpp>
+
+#include <boost/detail/lightweight_test.hpp>
+#include <iostream>
+#include <vector>
+#include <string>
+#include <mapnik/compiled_expression.hpp>
+#include <mapnik/expression_evaluator.hpp>
+#include <mapnik/feature_factory.hpp>
+#include <mapnik/filter_factory.hpp>
+#include <mapnik/unicode.hpp>
+
+using mapnik::compiled_expressions;
+using mapnik::expression_ptr;
+using mapnik::value_type;
+typedef boost::shared_ptr<mapnik::Feature> feature_ptr;
+
+//  --------------------------------------------------------------------------//
+
+value_type interpret(expression_ptr const& expr, mapnik::Feature const& feature)
+{
+    return boost::apply_visitor(mapnik::evaluate<mapnik::Feature,value_type>(feature), *expr);
+}
+
+int main( int, char*[] )
+{
+    const char* exprs[] = {
+        "[name] = 'Kensington'",
+        "[name] <> 'Kensington' and [pop] > 1000",
+        "not ([pop] >= 5000) or [area] < 2.5",
+        "[pop] + 10 * [area] - 3",
+        "[pop] % 7 = 3",
+        "[pop] / 2 <= [area]",
+        "[missing] = 1 or [missing] != 2",
+        "[name].match('K.*')",
+        "[name].replace('(\\w+)ton','$1')",
+        "([pop] > 1 and [name] = 'x') or ([area] > 1 and not [flag])",
+    };
+    const unsigned count = sizeof(exprs) / sizeof(exprs[0]);
+
+    compiled_expressions compiled;
+    std::vector<expression_ptr> parsed;
+    for (unsigned i = 0; i < count; ++i)
+    {
+        parsed.push_back(mapnik::parse_expression(exprs[i], "utf8"));
+        BOOST_TEST_EQ( compiled.add(parsed.back()), i );
+    }
+    BOOST_TEST_EQ( compiled.size(), count );
+    // each attribute gets one slot
+    BOOST_TEST_EQ( compiled.attribute_names().size(), 5u );
+
+    mapnik::transcoder tr("utf8");
+    std::vector<feature_ptr> features;
+    for (int i = 0; i < 20; ++i)
+    {
+        feature_ptr feature(mapnik::feature_factory::create(i));
+        if (i % 3 != 0) boost::put(*feature, "name", tr.transcode(i % 2 ? "Kensington" : "Brixton"));
+        if (i % 4 != 0) boost::put(*feature, "pop", i * 517);
+        boost::put(*feature, "area", i * 0.75);
+        if (i % 5 != 0) boost::put(*feature, "flag", i % 2 == 0);
+        features.push_back(feature);
+    }
+
+//  compiled results match the evaluate visitor  -----------------------------//
+
+    compiled_expressions::context ctx;
+    for (unsigned f = 0; f < features.size(); ++f)
+    {
+        compiled.reset(ctx, *features[f]);
+        for (unsigned i = 0; i < count; ++i)
+        {
+            value_type expected = interpret(parsed[i], *features[f]);
+            value_type result = compiled.evaluate(i, ctx);
+            if (result.to_string() != expected.to_string() || result.to_bool() != expected.to_bool())
+            {
+                std::clog << exprs[i] << ": " << result.to_string()
+                          << " != " << expected.to_string() << std::endl;
+            }
+            BOOST_TEST( result.to_string() == expected.to_string() );
+            BOOST_TEST( result.to_bool() == expected.to_bool() );
+        }
+    }
+
+//  null expressions evaluate to null  ---------------------------------------//
+
+    unsigned null_id = compiled.add(expression_ptr());
+    compiled.reset(ctx, *features[1]);
+    BOOST_TEST( !compiled.evaluate(null_id, ctx).to_bool() );
+    // programs added after a reset can still be evaluated
+    BOOST_TEST( compiled.evaluate(0, ctx).to_bool() );
+
+    return ::boost::report_errors();
+}
@@ -0,0 +1,48 @@
+#include <iostream>
+#include <cstdlib>
+#include <ctime>
+#include <mapnik/label_collision_detector.hpp>
+
+using mapnik::box2d;
+
+//  --------------------------------------------------------------------------//
+
+// place count random labels and return how many were accepted
+template <typename Detector>
+unsigned place_labels(Detector & detector, unsigned count, double size)
+{
+    unsigned placed = 0;
+    std::srand(42);
+    for (unsigned i = 0; i < count; ++i)
+    {
+        double x = std::rand() % 4096;
+        double y = std::rand() % 4096;
+        box2d<double> box(x, y, x + size, y + size);
+        if (detector.has_placement(box))
+        {
+            detector.insert(box);
+            ++placed;
+        }
+    }
+    return placed;
+}
+
+int main( int, char*[] )
+{
+    box2d<double> extent(-128, -128, 4096 + 128, 4096 + 128);
+    mapnik::label_collision_detector_type detector(extent);
+
+    unsigned const count = 100000;
+    std::clock_t start = std::clock();
+    unsigned placed = 0;
+    for (unsigned run = 0; run < 10; ++run)
+    {
+        detector.clear();
+        placed = place_labels(detector, count, 24);
+    }
+    double elapsed = double(std::clock() - start) / CLOCKS_PER_SEC;
+    std::clog << "placed " << placed << " of " << count << " labels, 10 runs took "
+              << elapsed << "s" << std::endl;
+
+    return 0;
+}
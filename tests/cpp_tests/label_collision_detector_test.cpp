@@ -0,0 +1,61 @@
+#include <boost/config/warning_disable.hpp>
+
+#include <boost/detail/lightweight_test.hpp>
+#include <iostream>
+#include <vector>
+#include <mapnik/label_collision_detector.hpp>
+
+using mapnik::box2d;
+
+int main( int, char*[] )
+{
+    box2d<double> extent(-128, -128, 4096 + 128, 4096 + 128);
+    mapnik::label_collision_detector_type detector(extent);
+
+//  basic placement tests  --------------------------------------------------//
+
+    box2d<double> a(10, 10, 20, 20);
+    BOOST_TEST( detector.has_placement(a) );
+    detector.insert(a);
+    BOOST_TEST( !detector.has_placement(box2d<double>(15, 15, 25, 25)) );
+    BOOST_TEST( detector.has_placement(box2d<double>(30, 30, 40, 40)) );
+    BOOST_TEST( !detector.has_point_placement(box2d<double>(25, 25, 30, 30), 10) );
+
+//  bulk loading  ------------------------------------------------------------//
+
+    std::vector<box2d<double> > boxes;
+    boxes.push_back(box2d<double>(100, 100, 110, 110));
+    boxes.push_back(box2d<double>(200, 200, 210, 210));
+    detector.insert(boxes.begin(), boxes.end());
+    BOOST_TEST( !detector.has_placement(box2d<double>(105, 105, 115, 115)) );
+    BOOST_TEST( !detector.has_placement(box2d<double>(205, 205, 215, 215)) );
+
+//  clear keeps the tree usable  ---------------------------------------------//
+
+    detector.clear();
+    BOOST_TEST( detector.has_placement(a) );
+    BOOST_TEST( detector.has_placement(box2d<double>(105, 105, 115, 115)) );
+
+//  a fixed layout with known collisions  ------------------------------------//
+
+    struct { double x, y; bool placed; } labels[] = {
+        {   0,   0, true  },
+        {   5,   0, false }, // overlaps the first label
+        {  12,   0, true  },
+        {  18,   5, false }, // overlaps the third label
+        {  30,   0, true  },
+        { 100, 100, true  },
+        { 105, 105, false }, // overlaps the previous label
+        { 100, 120, true  },
+    };
+    detector.clear();
+    for (unsigned i = 0; i < sizeof(labels) / sizeof(labels[0]); ++i)
+    {
+        box2d<double> box(labels[i].x, labels[i].y, labels[i].x + 10, labels[i].y + 10);
+        bool placed = detector.has_placement(box);
+        BOOST_TEST( placed == labels[i].placed );
+        if (placed) detector.insert(box);
+    }
+
+    return ::boost::report_errors();
+}
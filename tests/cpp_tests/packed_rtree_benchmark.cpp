@@ -0,0 +1,46 @@
+#include <iostream>
+#include <vector>
+#include <cstdlib>
+#include <ctime>
+#include <mapnik/packed_rtree.hpp>
+
+using mapnik::box2d;
+
+//  --------------------------------------------------------------------------//
+
+std::vector<box2d<double> > random_boxes(unsigned count)
+{
+    std::vector<box2d<double> > boxes;
+    std::srand(42);
+    for (unsigned i = 0; i < count; ++i)
+    {
+        double x = std::rand() % 4096;
+        double y = std::rand() % 4096;
+        boxes.push_back(box2d<double>(x, y, x + i % 7, y + i % 5));
+    }
+    return boxes;
+}
+
+int main( int, char*[] )
+{
+    mapnik::packed_rtree tree;
+    std::vector<box2d<double> > boxes = random_boxes(200000);
+    std::clock_t start = std::clock();
+    tree.build(boxes);
+    double build = double(std::clock() - start) / CLOCKS_PER_SEC;
+    start = std::clock();
+    std::vector<unsigned> result;
+    std::size_t hits = 0;
+    for (unsigned i = 0; i < 10000; ++i)
+    {
+        double x = i % 4000;
+        result.clear();
+        tree.query(box2d<double>(x, x, x + 64, x + 64), result);
+        hits += result.size();
+    }
+    double elapsed = double(std::clock() - start) / CLOCKS_PER_SEC;
+    std::clog << "indexing " << boxes.size() << " boxes took " << build << "s, 10000 queries ("
+              << hits << " hits) took " << elapsed << "s" << std::endl;
+
+    return 0;
+}
@@ -0,0 +1,66 @@
+#include <boost/config/warning_disable.hpp>
+
+#include <boost/detail/lightweight_test.hpp>
+#include <iostream>
+#include <vector>
+#include <set>
+#include <cstdlib>
+#include <mapnik/packed_rtree.hpp>
+
+using mapnik::box2d;
+
+//  --------------------------------------------------------------------------//
+
+std::vector<box2d<double> > random_boxes(unsigned count)
+{
+    std::vector<box2d<double> > boxes;
+    std::srand(42);
+    for (unsigned i = 0; i < count; ++i)
+    {
+        double x = std::rand() % 4096;
+        double y = std::rand() % 4096;
+        boxes.push_back(box2d<double>(x, y, x + i % 7, y + i % 5));
+    }
+    return boxes;
+}
+
+std::set<unsigned> scan(std::vector<box2d<double> > const& boxes, box2d<double> const& query)
+{
+    std::set<unsigned> result;
+    for (unsigned i = 0; i < boxes.size(); ++i)
+    {
+        if (query.intersects(boxes[i])) result.insert(i);
+    }
+    return result;
+}
+
+int main( int, char*[] )
+{
+    mapnik::packed_rtree tree;
+
+//  empty tree  --------------------------------------------------------------//
+
+    std::vector<unsigned> result;
+    tree.query(box2d<double>(0, 0, 100, 100), result);
+    BOOST_TEST( result.empty() );
+
+//  queries match a linear scan  ---------------------------------------------//
+
+    std::vector<box2d<double> > boxes = random_boxes(10000);
+    // invalid boxes are not indexed
+    boxes[10] = box2d<double>();
+    tree.build(boxes);
+    BOOST_TEST( tree.size() == boxes.size() - 1 );
+    for (unsigned i = 0; i < 100; ++i)
+    {
+        double x = i * 40;
+        box2d<double> query(x, x, x + i, x + 2 * i);
+        result.clear();
+        tree.query(query, result);
+        std::set<unsigned> found(result.begin(), result.end());
+        BOOST_TEST( found.size() == result.size() );
+        BOOST_TEST( found == scan(boxes, query) );
+    }
+
+    return ::boost::report_errors();
+}
@@ -0,0 +1,113 @@
+#include <boost/config/warning_disable.hpp>
+
+#include <boost/detail/lightweight_test.hpp>
+#include <iostream>
+#include <vector>
+#include <string>
+#include <mapnik/rule_index.hpp>
+#include <mapnik/expression_evaluator.hpp>
+#include <mapnik/feature_factory.hpp>
+#include <mapnik/filter_factory.hpp>
+#include <mapnik/unicode.hpp>
+
+using mapnik::rule_index;
+using mapnik::expression_ptr;
+using mapnik::value_type;
+typedef boost::shared_ptr<mapnik::Feature> feature_ptr;
+
+//  --------------------------------------------------------------------------//
+
+bool matches(expression_ptr const& expr, mapnik::Feature const& feature)
+{
+    return boost::apply_visitor(mapnik::evaluate<mapnik::Feature,value_type>(feature), *expr).to_bool();
+}
+
+int main( int, char*[] )
+{
+    const char* exprs[] = {
+        "[highway] = 'motorway'",
+        "[highway] = 'primary' and [bridge] = 'yes'",
+        "[highway] = 'primary'",
+        "[landuse] = 'forest'",
+        "'secondary' = [highway] or [highway] = 'tertiary'",
+        "[lanes] > 2",
+        "[highway] = 'residential' or [lanes] = 1",
+        "[highway] = 2",
+        "[highway] = true",
+        "[highway] = 'track' and [highway] = 'path'",
+        "not ([highway] = 'motorway')",
+        "[highway].match('.*way')",
+    };
+    const unsigned count = sizeof(exprs) / sizeof(exprs[0]);
+
+    std::vector<expression_ptr> filters;
+    for (unsigned i = 0; i < count; ++i)
+    {
+        filters.push_back(mapnik::parse_expression(exprs[i], "utf8"));
+    }
+    rule_index index(filters);
+    BOOST_TEST( index.indexed() );
+    BOOST_TEST_EQ( index.attribute(), std::string("highway") );
+
+    mapnik::transcoder tr("utf8");
+    const char* highways[] = { "motorway", "primary", "secondary", "tertiary",
+                               "residential", "track", "path", "footway", "2" };
+    std::vector<feature_ptr> features;
+    for (int i = 0; i < 200; ++i)
+    {
+        feature_ptr feature(mapnik::feature_factory::create(i));
+        switch (i % 13)
+        {
+        case 0: // no highway
+            break;
+        case 1:
+            boost::put(*feature, "highway", 2);
+            break;
+        case 2:
+            boost::put(*feature, "highway", 2.0);
+            break;
+        case 3:
+            boost::put(*feature, "highway", true);
+            break;
+        default:
+            boost::put(*feature, "highway", tr.transcode(highways[i % 9]));
+        }
+        if (i % 3 == 0) boost::put(*feature, "bridge", tr.transcode("yes"));
+        if (i % 5 != 0) boost::put(*feature, "lanes", i % 4);
+        if (i % 7 == 0) boost::put(*feature, "landuse", tr.transcode("forest"));
+        features.push_back(feature);
+    }
+
+//  matching candidates are the matching filters  ---------------------------//
+
+    std::size_t candidate_count = 0;
+    for (unsigned f = 0; f < features.size(); ++f)
+    {
+        std::vector<unsigned> expected;
+        for (unsigned i = 0; i < count; ++i)
+        {
+            if (matches(filters[i], *features[f])) expected.push_back(i);
+        }
+        std::vector<unsigned> const& candidates = index.candidates(*features[f]);
+        candidate_count += candidates.size();
+        std::vector<unsigned> result;
+        for (unsigned i = 0; i < candidates.size(); ++i)
+        {
+            BOOST_TEST( i == 0 || candidates[i - 1] < candidates[i] );
+            if (matches(filters[candidates[i]], *features[f])) result.push_back(candidates[i]);
+        }
+        BOOST_TEST( result == expected );
+    }
+    BOOST_TEST( candidate_count < features.size() * count );
+
+//  styles with too few equality filters are not indexed  --------------------//
+
+    std::vector<expression_ptr> few;
+    few.push_back(mapnik::parse_expression("[highway] = 'motorway'", "utf8"));
+    few.push_back(mapnik::parse_expression("[lanes] > 2", "utf8"));
+    rule_index unindexed(few);
+    BOOST_TEST( !unindexed.indexed() );
+    BOOST_TEST_EQ( unindexed.candidates(*features[4]).size(), 2u );
+
+    return ::boost::report_errors();
+}
@@ -0,0 +1,89 @@
+#include <iostream>
+#include <sstream>
+#include <vector>
+#include <cstdlib>
+#include <ctime>
+#include <mapnik/geom_util.hpp>
+#include "../../plugins/input/shape/shp_packed_index.hpp"
+#include "../../plugins/input/shape/shp_index.hpp"
+#include "../../utils/shapeindex/quadtree.hpp"
+
+using mapnik::box2d;
+using mapnik::filter_in_box;
+
+//  --------------------------------------------------------------------------//
+
+// many small polygons, the offsets stand in for .shp record offsets
+void random_items(unsigned count, std::vector<box2d<double> > & boxes, std::vector<int> & offsets)
+{
+    std::srand(42);
+    for (unsigned i = 0; i < count; ++i)
+    {
+        double x = std::rand() % 100000;
+        double y = std::rand() % 100000;
+        boxes.push_back(box2d<double>(x, y, x + i % 13, y + i % 11));
+        offsets.push_back(100 + i * 8);
+    }
+}
+
+std::vector<box2d<double> > random_queries(unsigned count)
+{
+    std::vector<box2d<double> > queries;
+    for (unsigned i = 0; i < count; ++i)
+    {
+        double x = std::rand() % 100000;
+        double y = std::rand() % 100000;
+        double size = 100 + std::rand() % 2000;
+        queries.push_back(box2d<double>(x, y, x + size, y + size));
+    }
+    return queries;
+}
+
+int main( int, char*[] )
+{
+    std::vector<box2d<double> > boxes;
+    std::vector<int> offsets;
+    random_items(200000, boxes, offsets);
+
+    std::vector<char> data;
+    shp_packed_index::build(boxes, offsets, data);
+    shp_packed_index index;
+    index.open(&data[0], data.size());
+
+    quadtree<int> tree(box2d<double>(0, 0, 100020, 100020), 8, 0.55);
+    for (unsigned i = 0; i < boxes.size(); ++i)
+    {
+        tree.insert(offsets[i], boxes[i]);
+    }
+    tree.trim();
+    std::stringstream quadtree_data;
+    tree.write(quadtree_data);
+
+    std::vector<box2d<double> > queries = random_queries(2000);
+    std::size_t quadtree_count = 0;
+    std::clock_t start = std::clock();
+    for (unsigned i = 0; i < queries.size(); ++i)
+    {
+        std::vector<int> result;
+        quadtree_data.clear();
+        shp_index<filter_in_box, std::stringstream>::query(filter_in_box(queries[i]), quadtree_data, result);
+        quadtree_count += result.size();
+    }
+    double quadtree_elapsed = double(std::clock() - start) / CLOCKS_PER_SEC;
+
+    std::size_t packed_count = 0;
+    start = std::clock();
+    for (unsigned i = 0; i < queries.size(); ++i)
+    {
+        std::vector<int> result;
+        index.query(filter_in_box(queries[i]), result);
+        packed_count += result.size();
+    }
+    double packed_elapsed = double(std::clock() - start) / CLOCKS_PER_SEC;
+
+    std::clog << queries.size() << " queries on " << boxes.size() << " items:" << std::endl
+              << "  quadtree index: " << quadtree_elapsed << "s, " << quadtree_count << " candidates" << std::endl
+              << "  packed index:   " << packed_elapsed << "s, " << packed_count << " candidates" << std::endl;
+
+    return 0;
+}
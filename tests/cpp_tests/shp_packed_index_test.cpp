@@ -0,0 +1,132 @@
+#include <boost/config/warning_disable.hpp>
+
+#include <boost/detail/lightweight_test.hpp>
+#include <iostream>
+#include <sstream>
+#include <vector>
+#include <set>
+#include <cstdlib>
+#include <mapnik/geom_util.hpp>
+#include "../../plugins/input/shape/shp_packed_index.hpp"
+#include "../../plugins/input/shape/shp_index.hpp"
+#include "../../utils/shapeindex/quadtree.hpp"
+
+using mapnik::box2d;
+using mapnik::filter_in_box;
+
+//  --------------------------------------------------------------------------//
+
+// many small polygons, the offsets stand in for .shp record offsets
+void random_items(unsigned count, std::vector<box2d<double> > & boxes, std::vector<int> & offsets)
+{
+    std::srand(42);
+    for (unsigned i = 0; i < count; ++i)
+    {
+        double x = std::rand() % 100000;
+        double y = std::rand() % 100000;
+        boxes.push_back(box2d<double>(x, y, x + i % 13, y + i % 11));
+        offsets.push_back(100 + i * 8);
+    }
+}
+
+std::set<int> scan(std::vector<box2d<double> > const& boxes, std::vector<int> const& offsets,
+                   box2d<double> const& query)
+{
+    std::set<int> result;
+    for (unsigned i = 0; i < boxes.size(); ++i)
+    {
+        if (query.intersects(boxes[i])) result.insert(offsets[i]);
+    }
+    return result;
+}
+
+std::vector<box2d<double> > random_queries(unsigned count)
+{
+    std::vector<box2d<double> > queries;
+    for (unsigned i = 0; i < count; ++i)
+    {
+        double x = std::rand() % 100000;
+        double y = std::rand() % 100000;
+        double size = 100 + std::rand() % 2000;
+        queries.push_back(box2d<double>(x, y, x + size, y + size));
+    }
+    return queries;
+}
+
+int main( int, char*[] )
+{
+    std::vector<box2d<double> > boxes;
+    std::vector<int> offsets;
+    random_items(20000, boxes, offsets);
+
+    std::vector<char> data;
+    shp_packed_index::build(boxes, offsets, data);
+    shp_packed_index index;
+
+//  format  ------------------------------------------------------------------//
+
+    BOOST_TEST( shp_packed_index::is_packed(&data[0], data.size()) );
+    BOOST_TEST( index.open(&data[0], data.size()) );
+    BOOST_TEST_EQ( index.size(), boxes.size() );
+    // truncated data is rejected
+    shp_packed_index truncated;
+    BOOST_TEST( !truncated.open(&data[0], data.size() - 1) );
+
+//  queries match a linear scan  ---------------------------------------------//
+
+    std::vector<box2d<double> > queries = random_queries(200);
+    for (unsigned i = 0; i < queries.size(); ++i)
+    {
+        std::vector<int> result;
+        index.query(filter_in_box(queries[i]), result);
+        std::set<int> expected = scan(boxes, offsets, queries[i]);
+        BOOST_TEST_EQ( result.size(), expected.size() );
+        BOOST_TEST( std::set<int>(result.begin(), result.end()) == expected );
+    }
+
+//  empty and single item indexes  -------------------------------------------//
+
+    std::vector<char> empty_data;
+    shp_packed_index::build(std::vector<box2d<double> >(), std::vector<int>(), empty_data);
+    shp_packed_index empty;
+    BOOST_TEST( empty.open(&empty_data[0], empty_data.size()) );
+    std::vector<int> none;
+    empty.query(filter_in_box(box2d<double>(0, 0, 100000, 100000)), none);
+    BOOST_TEST( none.empty() );
+
+    std::vector<char> single_data;
+    shp_packed_index::build(std::vector<box2d<double> >(1, boxes[0]), std::vector<int>(1, 100), single_data);
+    shp_packed_index single;
+    BOOST_TEST( single.open(&single_data[0], single_data.size()) );
+    std::vector<int> one;
+    single.query(filter_in_box(boxes[0]), one);
+    BOOST_TEST( one.size() == 1 && one[0] == 100 );
+
+//  fewer candidates than the quadtree .index format  ------------------------//
+
+    quadtree<int> tree(box2d<double>(0, 0, 100020, 100020), 8, 0.55);
+    for (unsigned i = 0; i < boxes.size(); ++i)
+    {
+        tree.insert(offsets[i], boxes[i]);
+    }
+    tree.trim();
+    std::stringstream quadtree_data;
+    tree.write(quadtree_data);
+
+    std::size_t quadtree_count = 0;
+    std::size_t packed_count = 0;
+    for (unsigned i = 0; i < queries.size(); ++i)
+    {
+        std::vector<int> result;
+        quadtree_data.clear();
+        shp_index<filter_in_box, std::stringstream>::query(filter_in_box(queries[i]), quadtree_data, result);
+        quadtree_count += result.size();
+        result.clear();
+        index.query(filter_in_box(queries[i]), result);
+        packed_count += result.size();
+    }
+    // quadtree nodes return all their items, the packed index only intersecting ones
+    BOOST_TEST( packed_count <= quadtree_count );
+
+    return ::boost::report_errors();
+}
@@ -0,0 +1,65 @@
+#include <boost/config/warning_disable.hpp>
+
+#include <boost/detail/lightweight_test.hpp>
+#include <iostream>
+#include <string>
+#include <mapnik/filter_factory.hpp>
+#include <mapnik/sql_utils.hpp>
+
+std::string sql(std::string const& filter, bool boolean_literals = true)
+{
+    return mapnik::sql_from_filter(*mapnik::parse_expression(filter, "utf8"), boolean_literals);
+}
+
+int main( int, char*[] )
+{
+//  comparisons  -------------------------------------------------------------//
+
+    BOOST_TEST_EQ( sql("[type] = 'motorway'"), "(\"type\" = 'motorway')" );
+    BOOST_TEST_EQ( sql("[pop] >= 1000 and [pop] < 5000.5"), "((\"pop\" >= 1000) AND (\"pop\" < 5000.5))" );
+    BOOST_TEST_EQ( sql("[a] <> [b] or [c] > 2"), "((\"a\" <> \"b\") OR (\"c\" > 2))" );
+    BOOST_TEST_EQ( sql("3 < [pop]"), "(3 < \"pop\")" );
+    BOOST_TEST_EQ( sql("[flag] = true"), "(\"flag\" = TRUE)" );
+    BOOST_TEST_EQ( sql("[flag] = true", false), "(\"flag\" = 1)" );
+    BOOST_TEST_EQ( sql("[x] = 2.0"), "(\"x\" = 2.0)" );
+
+    // comparisons with null are false
+    BOOST_TEST_EQ( sql("[type] = null"), "FALSE" );
+    BOOST_TEST_EQ( sql("[type] != null", false), "(1=0)" );
+
+//  not keeps the filter semantics of null attributes  -----------------------//
+
+    BOOST_TEST_EQ( sql("not ([type] = 'motorway')"), "(NOT COALESCE((\"type\" = 'motorway'), FALSE))" );
+    BOOST_TEST_EQ( sql("not ([type] = 'motorway')", false), "(NOT COALESCE((\"type\" = 'motorway'), (1=0)))" );
+
+//  untranslatable parts  ----------------------------------------------------//
+
+    // and keeps the translatable side
+    BOOST_TEST_EQ( sql("[type] = 'motorway' and [name].match('A.*')"), "(\"type\" = 'motorway')" );
+    BOOST_TEST_EQ( sql("[name].match('A.*') and [type] = 'motorway'"), "(\"type\" = 'motorway')" );
+    BOOST_TEST_EQ( sql("([a] = 1 and [b]) or [c] = 2"), "((\"a\" = 1) OR (\"c\" = 2))" );
+    // or and not need both sides, resp. an exact operand
+    BOOST_TEST_EQ( sql("[type] = 'motorway' or [name].match('A.*')"), "" );
+    BOOST_TEST_EQ( sql("not ([a] = 1 and [b])"), "" );
+    // arithmetic with null yields the other operand in filters, null in sql
+    BOOST_TEST_EQ( sql("5 + [a] > 3"), "" );
+    BOOST_TEST_EQ( sql("[b] - [a] > 1"), "" );
+    BOOST_TEST_EQ( sql("[c] > 2 * [d] + 1"), "" );
+    BOOST_TEST_EQ( sql("[b] - [a] > 1 and [c] = 2"), "(\"c\" = 2)" );
+    BOOST_TEST_EQ( sql("[a] / [b] > 1"), "" );
+    BOOST_TEST_EQ( sql("[name] + 'x' = 'ax'"), "" );
+    // strings are ordered by code point in filters, by collation in sql
+    BOOST_TEST_EQ( sql("[name] < 'b'"), "" );
+    BOOST_TEST_EQ( sql("'b' >= [name]"), "" );
+    BOOST_TEST_EQ( sql("[a] > [b]"), "" );
+    BOOST_TEST_EQ( sql("[name] <= 'b' and [type] = 'x'"), "(\"type\" = 'x')" );
+    // backslashes are escapes in some postgresql configurations
+    BOOST_TEST_EQ( sql("[name] = 'a\\\\b'"), "" );
+    // bare attributes have no sql truth value
+    BOOST_TEST_EQ( sql("[flag]"), "" );
+    // true is no condition
+    BOOST_TEST_EQ( sql("true"), "" );
+    BOOST_TEST_EQ( sql("false"), "FALSE" );
+
+    return ::boost::report_errors();
+}
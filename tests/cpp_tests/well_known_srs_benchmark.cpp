@@ -0,0 +1,54 @@
+#include <iostream>
+#include <vector>
+#include <ctime>
+#include <mapnik/projection.hpp>
+#include <mapnik/proj_transform.hpp>
+
+using mapnik::projection;
+using mapnik::proj_transform;
+
+//  --------------------------------------------------------------------------//
+
+// '+over' stops the definition being recognised as spherical mercator,
+// so transforms with it go through proj4
+std::string const merc_proj4 = "+proj=merc +a=6378137 +b=6378137 +lat_ts=0.0 +lon_0=0.0 +x_0=0.0 +y_0=0 +k=1.0 +units=m +nadgrids=@null +over +no_defs";
+
+// time runs transforms of the points in lon/lat
+double time_forward(proj_transform const& trans, std::vector<double> const& lon,
+                    std::vector<double> const& lat, unsigned runs)
+{
+    std::clock_t start = std::clock();
+    for (unsigned run = 0; run < runs; ++run)
+    {
+        std::vector<double> x(lon), y(lat);
+        trans.forward(&x[0], &y[0], 0, x.size());
+    }
+    return double(std::clock() - start) / CLOCKS_PER_SEC;
+}
+
+int main( int, char*[] )
+{
+    projection wgs84("+init=epsg:4326");
+    projection merc("+init=epsg:3857");
+    projection merc_slow(merc_proj4);
+    proj_transform fast(wgs84, merc);
+    proj_transform slow(wgs84, merc_slow);
+
+    std::vector<double> lon;
+    std::vector<double> lat;
+    for (double x = -180; x <= 180; x += 7.5)
+    {
+        for (double y = -85; y <= 85; y += 2.5)
+        {
+            lon.push_back(x);
+            lat.push_back(y);
+        }
+    }
+
+    double slow_time = time_forward(slow, lon, lat, 100);
+    double fast_time = time_forward(fast, lon, lat, 100);
+    std::clog << "transforming " << 100 * lon.size() << " points took " << slow_time
+              << "s with proj4, " << fast_time << "s with the fast path" << std::endl;
+
+    return 0;
+}
@@ -0,0 +1,94 @@
+#include <boost/config/warning_disable.hpp>
+
+#include <boost/detail/lightweight_test.hpp>
+#include <iostream>
+#include <vector>
+#include <cmath>
+#include <mapnik/projection.hpp>
+#include <mapnik/proj_transform.hpp>
+#include <mapnik/well_known_srs.hpp>
+
+using mapnik::projection;
+using mapnik::proj_transform;
+
+//  --------------------------------------------------------------------------//
+
+// '+over' keeps proj4 from wrapping longitudes, which does not matter for
+// points inside [-180,180], but stops the definition being recognised as
+// spherical mercator, so transforms with it go through proj4
+std::string const merc_proj4 = "+proj=merc +a=6378137 +b=6378137 +lat_ts=0.0 +lon_0=0.0 +x_0=0.0 +y_0=0 +k=1.0 +units=m +nadgrids=@null +over +no_defs";
+
+int main( int, char*[] )
+{
+
+//  recognising well known srs  ---------------------------------------------//
+
+    BOOST_TEST( mapnik::is_well_known_srs("+init=epsg:4326") );
+    BOOST_TEST( *mapnik::is_well_known_srs("+init=epsg:4326") == mapnik::WGS_84 );
+    BOOST_TEST( *mapnik::is_well_known_srs("+proj=longlat +ellps=WGS84 +datum=WGS84 +no_defs") == mapnik::WGS_84 );
+    BOOST_TEST( *mapnik::is_well_known_srs("+init=epsg:3857") == mapnik::G_MERC );
+    BOOST_TEST( *mapnik::is_well_known_srs("+init=epsg:900913") == mapnik::G_MERC );
+    BOOST_TEST( *mapnik::is_well_known_srs("+proj=merc +a=6378137 +b=6378137 +lat_ts=0.0 +lon_0=0.0 +x_0=0.0 +y_0=0 +k=1.0 +units=m +nadgrids=@null +wktext +no_defs") == mapnik::G_MERC );
+    BOOST_TEST( !mapnik::is_well_known_srs(merc_proj4) );
+    BOOST_TEST( !mapnik::is_well_known_srs("+proj=merc +ellps=WGS84 +datum=WGS84") );
+    BOOST_TEST( !mapnik::is_well_known_srs("+proj=longlat +ellps=intl") );
+    BOOST_TEST( !mapnik::is_well_known_srs("+proj=merc +a=6378137 +b=6378137 +lon_0=10") );
+
+//  accuracy against proj4  -------------------------------------------------//
+
+    projection wgs84("+init=epsg:4326");
+    projection merc("+init=epsg:3857");
+    projection merc_slow(merc_proj4);
+    proj_transform fast(wgs84, merc);
+    proj_transform slow(wgs84, merc_slow);
+
+    std::vector<double> lon;
+    std::vector<double> lat;
+    for (double x = -180; x <= 180; x += 7.5)
+    {
+        for (double y = -85; y <= 85; y += 2.5)
+        {
+            lon.push_back(x);
+            lat.push_back(y);
+        }
+    }
+    std::size_t count = lon.size();
+
+    std::vector<double> fx(lon), fy(lat), sx(lon), sy(lat);
+    BOOST_TEST( fast.forward(&fx[0], &fy[0], 0, count) );
+    BOOST_TEST( slow.forward(&sx[0], &sy[0], 0, count) );
+    double max_error = 0;
+    for (std::size_t i = 0; i < count; ++i)
+    {
+        max_error = std::max(max_error, std::fabs(fx[i] - sx[i]));
+        max_error = std::max(max_error, std::fabs(fy[i] - sy[i]));
+    }
+    // meters
+    BOOST_TEST( max_error < 1e-6 );
+
+    BOOST_TEST( fast.backward(&fx[0], &fy[0], 0, count) );
+    BOOST_TEST( slow.backward(&sx[0], &sy[0], 0, count) );
+    max_error = 0;
+    for (std::size_t i = 0; i < count; ++i)
+    {
+        max_error = std::max(max_error, std::fabs(fx[i] - sx[i]));
+        max_error = std::max(max_error, std::fabs(fy[i] - sy[i]));
+        max_error = std::max(max_error, std::fabs(fx[i] - lon[i]));
+        max_error = std::max(max_error, std::fabs(fy[i] - lat[i]));
+    }
+    // degrees
+    BOOST_TEST( max_error < 1e-9 );
+
+    // single points take the same path
+    double x = 10, y = 50, z = 0;
+    double x2 = 10, y2 = 50, z2 = 0;
+    BOOST_TEST( fast.forward(x, y, z) );
+    BOOST_TEST( slow.forward(x2, y2, z2) );
+    BOOST_TEST( std::fabs(x - x2) < 1e-6 && std::fabs(y - y2) < 1e-6 );
+
+    // the poles cannot be projected
+    x = 0; y = 90;
+    BOOST_TEST( !fast.forward(x, y, z) );
+
+    return ::boost::report_errors();
+}
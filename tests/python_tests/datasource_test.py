@@ -3,7 +3,7 @@
 from nose.tools import *
 from utilities import execution_path
 
-import os, mapnik2
+import os, shutil, struct, tempfile, mapnik2
 
 def setup():
     # All of the paths used are relative, if we run the tests
@@ -59,6 +59,115 @@ def test_feature_attributes():
     eq_(lyr.datasource.fields(),['AREA', 'EAS_ID', 'PRFEDEA'])
     eq_(lyr.datasource.field_types(),[float,int,str])
 
+def test_shapefile_row_cache():
+    plain = mapnik2.Shapefile(file='../data/shp/poly.shp')
+    cached = mapnik2.Shapefile(file='../data/shp/poly.shp',row_cache_size=4)
+    expected = [feat.attributes for feat in plain.all_features()]
+    # the second pass is served from the cache, partially for the
+    # records evicted by the small cache size
+    eq_([feat.attributes for feat in cached.all_features()], expected)
+    eq_([feat.attributes for feat in cached.all_features()], expected)
+    # projected queries only get the requested columns
+    query = mapnik2.Query(cached.envelope())
+    query.add_property_name('EAS_ID')
+    eq_([feat.attributes for feat in cached.features(query)],
+        [{'EAS_ID': attrs['EAS_ID']} for attrs in expected])
+
+def nul_padded_dbf(src, dest):
+    # rewrite the character fields as NUL terminated strings followed
+    # by stale bytes, as written by some dbf tools
+    data = open(src,'rb').read()
+    num_records, header_length, record_length = struct.unpack('<4xIHH', data[:12])
+    fields = []
+    offset, pos = 32, 1
+    while data[offset] != '\r':
+        length = ord(data[offset+16])
+        if data[offset+11] == 'C':
+            fields.append((pos, length))
+        pos += length
+        offset += 32
+    records = []
+    for i in range(num_records):
+        record = data[header_length + i*record_length:header_length + (i+1)*record_length]
+        for pos, length in fields:
+            value = record[pos:pos+length].rstrip(' ')
+            padded = (value + '\0' * length)[:length-1] + 'x'
+            record = record[:pos] + padded + record[pos+length:]
+        records.append(record)
+    end = header_length + num_records*record_length
+    open(dest,'wb').write(data[:header_length] + ''.join(records) + data[end:])
+
+def test_shapefile_row_cache_nul_padded():
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for ext in ('shp','shx'):
+            shutil.copy('../data/shp/poly.%s' % ext, tmpdir)
+        nul_padded_dbf('../data/shp/poly.dbf', os.path.join(tmpdir,'poly.dbf'))
+        plain = mapnik2.Shapefile(file='../data/shp/poly.shp')
+        padded = mapnik2.Shapefile(file=os.path.join(tmpdir,'poly'),row_cache_size=4)
+        expected = [feat.attributes for feat in plain.all_features()]
+        eq_([feat.attributes for feat in padded.all_features()], expected)
+        eq_([feat.attributes for feat in padded.all_features()], expected)
+    finally:
+        shutil.rmtree(tmpdir)
+
+def test_shapefile_build_index():
+    plain = mapnik2.Shapefile(file='../data/shp/poly.shp')
+    indexed = mapnik2.Shapefile(file='../data/shp/poly.shp',build_index=True)
+    box = mapnik2.Box2d(479000,4763000,482000,4766000)
+    expected = sorted([feat.id() for feat in plain.features(mapnik2.Query(box))])
+    eq_(sorted([feat.id() for feat in indexed.features(mapnik2.Query(box))]), expected)
+    eq_(len(indexed.all_features()), 10)
+
+def test_shapefile_save_index():
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for ext in ('shp','shx','dbf'):
+            shutil.copy('../data/shp/poly.%s' % ext, tmpdir)
+        name = os.path.join(tmpdir,'poly')
+        indexed = mapnik2.Shapefile(file=name,build_index=True,save_index=True)
+        ok_(os.path.exists(name + '.index'))
+        # the saved index is picked up without scanning the shapefile
+        saved = mapnik2.Shapefile(file=name)
+        box = mapnik2.Box2d(479000,4763000,482000,4766000)
+        eq_(sorted([feat.id() for feat in saved.features(mapnik2.Query(box))]),
+            sorted([feat.id() for feat in indexed.features(mapnik2.Query(box))]))
+    finally:
+        shutil.rmtree(tmpdir)
+
+def test_iter_features():
+    ds = mapnik2.Shapefile(file='../data/shp/poly.shp')
+    ids = [feat.id() for feat in ds.iter_features(batch_size=3)]
+    eq_(len(ids), 10)
+    eq_(ids, [feat.id() for feat in ds.all_features()])
+
+def test_featureset_iterator():
+    ds = mapnik2.Shapefile(file='../data/shp/poly.shp')
+    query = mapnik2.Query(ds.envelope())
+    query.add_property_name('EAS_ID')
+    featureset = ds.features(query)
+    feats = [feat for feat in featureset]
+    eq_(len(feats), 10)
+    eq_(feats[0]['EAS_ID'], 168)
+    # exhausted
+    eq_(featureset.next_batch(5), [])
+
+def test_featureset_to_arrays():
+    ds = mapnik2.Shapefile(file='../data/shp/poly.shp')
+    query = mapnik2.Query(ds.envelope())
+    query.add_property_name('EAS_ID')
+    query.add_property_name('PRFEDEA')
+    arrays = ds.features(query).to_arrays(['EAS_ID', 'PRFEDEA'])
+    feats = ds.all_features()
+    eq_(len(arrays['id']), 10)
+    eq_(len(arrays['feature_offset']), 11)
+    eq_(len(arrays['x']), arrays['geometry_offset'][-1])
+    eq_(list(arrays['fields']['EAS_ID']), [f['EAS_ID'] for f in feats])
+    eq_(list(arrays['fields']['PRFEDEA']), [f['PRFEDEA'] for f in feats])
+    eq_(arrays['geometry_type'][0], int(feats[0].get_geometry(0).type()))
+    # polygon rings start with a move_to
+    eq_(arrays['command'][0], 1)
+
 def test_hit_grid():
     import os
     from itertools import groupby
@@ -118,5 +118,18 @@ def test_unicode_regex_replace():
     expr = mapnik2.Expression("[name].replace('(\B)|( )','$1 ')")
     eq_(expr.evaluate(f),'Q u é b e c')
 
-
-
+def test_compiled_expression():
+    f = mapnik2.Feature(0)
+    f["name"] = 'test'
+    f["pop"] = 1500
+    for text in ("[name] = 'test' and [pop] > 1000",
+                 "[name] <> 'test' or not ([pop] < 2000)",
+                 "[pop] * 2 + [pop] % 7",
+                 "[missing] = 1 or [name].match('t.*')",
+                 "[name].replace('(\B)|( )','$1 ')"):
+        expr = mapnik2.Expression(text)
+        eq_(expr.compile().evaluate(f),expr.evaluate(f))
+
+def test_compiled_expression_attributes():
+    compiled = mapnik2.Expression("[name] = 'test' and ([pop] > 1000 or [name] = 'foo')").compile()
+    eq_(compiled.attributes,['name','pop'])
@@ -42,3 +42,88 @@ class MemoryDatasource(unittest.TestCase):
 
         retrieved = md.features_at_point(Coord(20,30)).features
         self.failUnlessEqual(len(retrieved), 0)
+
+    def makePoint(self, x, y, **properties):
+        from mapnik2 import Feature, Geometry2d
+        f = Feature(self.ids.next())
+        f.add_geometry(Geometry2d.from_wkt('POINT(%s %s)' % (x, y)))
+        for k,v in properties.iteritems():
+            f[k] = v
+        return f
+
+    def test_indexed_queries(self):
+        from mapnik2 import Box2d, Coord, Query
+        points = [(x, y) for x in range(40) for y in range(40)]
+        indexed = self.makeOne()
+        indexed.add_features([self.makePoint(x, y, x=x, y=y) for x, y in points])
+        unindexed = self.makeOne(False)
+        for x, y in points:
+            unindexed.add_feature(self.makePoint(x, y, x=x, y=y))
+        self.failUnlessEqual(indexed.num_features(), len(points))
+
+        for box in [Box2d(2.5, 3.5, 7.5, 5.5), Box2d(-10, -10, 100, 100), Box2d(100, 100, 200, 200)]:
+            expected = [(f['x'], f['y']) for f in unindexed.features(Query(box)).features]
+            retrieved = [(f['x'], f['y']) for f in indexed.features(Query(box)).features]
+            self.failUnlessEqual(retrieved, expected)
+
+        retrieved = indexed.features_at_point(Coord(12, 30)).features
+        self.failUnlessEqual(len(retrieved), 1)
+        self.failUnlessEqual(retrieved[0]['x'], 12)
+
+        # features added after the index was built are found as well
+        indexed.add_feature(self.makePoint(12, 30, x=-1, y=-1))
+        retrieved = indexed.features_at_point(Coord(12, 30)).features
+        self.failUnlessEqual([f['x'] for f in retrieved], [12, -1])
+
+    def test_add_features_from_arrays(self):
+        import array
+        from mapnik2 import Box2d, Query
+        md = self.makeOne()
+        xs = array.array('d', [0, 1, 2])
+        ys = array.array('d', [10, 11, 12])
+        md.add_features_from_arrays(xs, ys, {'name': ['a', None, 'c'], 'speed': [1.5, 2.5, 3.5]})
+        self.failUnlessEqual(md.num_features(), 3)
+        features = md.features(Query(Box2d(-1, 9, 3, 13))).features
+        self.failUnlessEqual([f.envelope().minx for f in features], [0, 1, 2])
+        self.failUnlessEqual([f.envelope().miny for f in features], [10, 11, 12])
+        self.failUnlessEqual(features[0]['name'], 'a')
+        self.failIf('name' in features[1])
+        self.failUnlessEqual([f['speed'] for f in features], [1.5, 2.5, 3.5])
+
+        self.assertRaises(ValueError, md.add_features_from_arrays, xs, array.array('d', [0]))
+        self.assertRaises(ValueError, md.add_features_from_arrays, xs, ys, {'name': ['a']})
+
+    def test_add_wkb_many(self):
+        import struct
+        from mapnik2 import Coord
+        md = self.makeOne()
+        points = [(2, 3), (4, 5)]
+        md.add_wkb_many([struct.pack('<BIdd', 1, 1, x, y) for x, y in points], {'id': [1, 2]})
+        self.failUnlessEqual(md.num_features(), 2)
+        retrieved = md.features_at_point(Coord(4, 5)).features
+        self.failUnlessEqual(len(retrieved), 1)
+        self.failUnlessEqual(retrieved[0]['id'], 2)
+
+    def test_add_wkb_many_int64_overflow(self):
+        import struct
+        try:
+            import numpy
+        except ImportError:
+            return # int64 buffers need numpy
+        md = self.makeOne()
+        wkbs = [struct.pack('<BIdd', 1, 1, x, 0) for x in range(2)]
+        md.add_wkb_many(wkbs, {'id': numpy.array([1, 2], dtype=numpy.int64)})
+        self.failUnlessEqual(md.num_features(), 2)
+        self.assertRaises(OverflowError, md.add_wkb_many, wkbs,
+                          {'id': numpy.array([1, 2**40], dtype=numpy.int64)})
+        self.failUnlessEqual(md.num_features(), 2)
+
+    def test_add_wkb_many_truncated(self):
+        import struct
+        md = self.makeOne()
+        point = struct.pack('<BIdd', 1, 1, 2, 3)
+        self.assertRaises(ValueError, md.add_wkb_many, [point[:-4]], {})
+        # a linestring claiming more points than it holds
+        line = struct.pack('<BII', 1, 2, 1000000) + struct.pack('<dd', 0, 0)
+        self.assertRaises(ValueError, md.add_wkb_many, [line], {})
+        self.failUnlessEqual(md.num_features(), 0)
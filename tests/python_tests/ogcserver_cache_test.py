@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+
+from nose.tools import *
+
+import os, shutil, tempfile, time
+from mapnik2.ogcserver.cache import MemoryCache, DiskCache, TieredCache, cache_key
+from mapnik2.ogcserver.common import MapPool
+
+def test_memory_cache_lru():
+    cache = MemoryCache(10)
+    cache.set('a', '1234')
+    cache.set('b', '1234')
+    # touch 'a' so that 'b' is the least recently used entry
+    eq_(cache.get('a'), '1234')
+    cache.set('c', '1234')
+    eq_(cache.get('b'), None)
+    eq_(cache.get('a'), '1234')
+    eq_(cache.get('c'), '1234')
+    ok_(cache.size <= 10)
+
+def test_memory_cache_ttl():
+    cache = MemoryCache(100, ttl=1)
+    cache.set('a', 'data')
+    eq_(cache.get('a'), 'data')
+    cache.entries['a'][0] -= 2
+    eq_(cache.get('a'), None)
+    eq_(cache.size, 0)
+
+def test_disk_cache():
+    directory = tempfile.mkdtemp()
+    try:
+        cache = DiskCache(directory, 100)
+        key = cache_key({'layers': ['world'], 'crs': 'epsg:4326', 'bbox': [-180, -90, 180, 90],
+                         'width': 256, 'height': 256, 'format': 'image/png'})
+        eq_(cache.get(key), None)
+        cache.set(key, 'data')
+        eq_(cache.get(key), 'data')
+        cache.clear()
+        eq_(cache.get(key), None)
+    finally:
+        shutil.rmtree(directory)
+
+def test_disk_cache_ignores_temporary_files():
+    directory = tempfile.mkdtemp()
+    try:
+        cache = DiskCache(directory, 100)
+        cache.set('abcd', 'data')
+        # a response another process is still writing
+        open(os.path.join(directory, 'ab', '.tmp1234'), 'wb').write('x' * 200)
+        eq_(sum([size for mtime, size, path in cache._scan()]), 4)
+        cache.size = None
+        cache.set('abef', 'data')
+        eq_(cache.get('abcd'), 'data')
+        eq_(cache.size, 8)
+    finally:
+        shutil.rmtree(directory)
+
+def test_tiered_cache():
+    directory = tempfile.mkdtemp()
+    try:
+        disk = DiskCache(directory, 100)
+        disk.set('abcd', 'data')
+        cache = TieredCache(MemoryCache(100), disk)
+        eq_(cache.get('abcd'), 'data')
+        eq_(cache.memory.get('abcd'), 'data')
+    finally:
+        shutil.rmtree(directory)
+
+def test_cache_key_normalization():
+    params = {'layers': ['a', 'b'], 'styles': [], 'crs': 'EPSG:4326', 'bbox': [0, 0, 1, 1],
+              'width': 256, 'height': 256, 'format': 'image/png'}
+    other = dict(params)
+    other['styles'] = ['', '']
+    other['crs'] = 'epsg:4326'
+    other['bbox'] = [0.0, 0.0, 1.0, 1.0]
+    eq_(cache_key(params), cache_key(other))
+    other['width'] = 512
+    assert_not_equal(cache_key(params), cache_key(other))
+
+def test_map_pool_clear_drops_maps_in_use():
+    pool = MapPool()
+    generation, m = pool.acquire('key')
+    eq_(m, None)
+    pool.release('key', generation, 'map')
+    eq_(pool.acquire('key'), (generation, 'map'))
+    # a map being rendered while the pool is cleared is not reused
+    pool.clear()
+    pool.release('key', generation, 'map')
+    eq_(pool.acquire('key'), (generation + 1, None))
@@ -39,3 +39,91 @@ def test_wgs84_inverse_forward():
 
     assert_almost_equal(e.forward(p).center().y, e.center().y)
     assert_almost_equal(e.forward(p).center().x, e.center().x)
+
+def test_forward_many():
+    import array
+    merc = mapnik2.Projection('+proj=merc +a=6378137 +b=6378137 +lat_ts=0.0 +lon_0=0.0 +x_0=0.0 +y_0=0 +k=1.0 +units=m +nadgrids=@null +no_defs')
+    longlat = mapnik2.Projection('+proj=longlat +ellps=WGS84 +datum=WGS84 +no_defs')
+    points = [(0, 0), (-122.5, 45.5), (3.01331418311, 43.3333092669)]
+    x = array.array('d', [p[0] for p in points])
+    y = array.array('d', [p[1] for p in points])
+    merc.forward_many(x, y)
+    for i, p in enumerate(points):
+        c = merc.forward(mapnik2.Coord(*p))
+        assert_almost_equal(x[i], c.x)
+        assert_almost_equal(y[i], c.y)
+    merc.inverse_many(x, y)
+    for i, p in enumerate(points):
+        assert_almost_equal(x[i], p[0])
+        assert_almost_equal(y[i], p[1])
+
+    trans = mapnik2.ProjTransform(longlat, merc)
+    eq_(trans.forward_many(x, y), True)
+    for i, p in enumerate(points):
+        c = trans.forward(mapnik2.Coord(*p))
+        assert_almost_equal(x[i], c.x, places=4)
+        assert_almost_equal(y[i], c.y, places=4)
+    eq_(trans.backward_many(x, y), True)
+    for i, p in enumerate(points):
+        assert_almost_equal(x[i], p[0])
+        assert_almost_equal(y[i], p[1])
+
+@raises(ValueError)
+def test_forward_many_length_mismatch():
+    import array
+    p = mapnik2.Projection('+init=epsg:4326')
+    p.forward_many(array.array('d', [0, 1]), array.array('d', [0]))
+
+def test_wgs84_merc_fast_path_matches_proj():
+    # '+over' stops the mercator definition from being recognised, so the
+    # second transform goes through proj4
+    wgs84 = mapnik2.Projection('+init=epsg:4326')
+    fast = mapnik2.ProjTransform(wgs84, mapnik2.Projection('+init=epsg:3857'))
+    slow = mapnik2.ProjTransform(wgs84, mapnik2.Projection('+proj=merc +a=6378137 +b=6378137 +lat_ts=0.0 +lon_0=0.0 +x_0=0.0 +y_0=0 +k=1.0 +units=m +nadgrids=@null +over +no_defs'))
+    for lon, lat in [(0, 0), (-122.5, 45.5), (180, 85.0511287798), (-179.9, -70)]:
+        c1 = fast.forward(mapnik2.Coord(lon, lat))
+        c2 = slow.forward(mapnik2.Coord(lon, lat))
+        assert_almost_equal(c1.x, c2.x, places=5)
+        assert_almost_equal(c1.y, c2.y, places=5)
+        c1 = fast.backward(c1)
+        assert_almost_equal(c1.x, lon)
+        assert_almost_equal(c1.y, lat)
+
+def test_projection_cache():
+    mapnik2.clear_projection_cache()
+    p1 = mapnik2.cached_projection('+init=epsg:3857')
+    # definitions differing only in whitespace share one projection
+    p2 = mapnik2.cached_projection('  +init=epsg:3857 ')
+    eq_(p1.params(), '+init=epsg:3857')
+    eq_(p2.params(), p1.params())
+    stats = mapnik2.projection_cache_stats()
+    eq_(stats['projection_misses'], 1)
+    eq_(stats['projection_hits'], 1)
+    eq_(stats['projections'], 1)
+    c = p2.forward(mapnik2.Coord(0, 0))
+    assert_almost_equal(c.x, 0)
+    assert_almost_equal(c.y, 0)
+
+    # rendering caches the map and layer projections
+    m = mapnik2.Map(256, 256, '+init=epsg:4326')
+    lyr = mapnik2.Layer('test', '+init=epsg:27700')
+    lyr.datasource = mapnik2.Shapefile(file='../data/shp/poly.shp')
+    m.layers.append(lyr)
+    m.zoom_all()
+    mapnik2.render(m, mapnik2.Image(256, 256))
+    mapnik2.render(m, mapnik2.Image(256, 256))
+    stats = mapnik2.projection_cache_stats()
+    eq_(stats['transforms'], 1)
+    eq_(stats['transform_misses'], 1)
+    assert stats['transform_hits'] >= 1
+
+    mapnik2.clear_projection_cache()
+    stats = mapnik2.projection_cache_stats()
+    eq_(stats['projections'], 0)
+    eq_(stats['transforms'], 0)
+    # cleared projections held elsewhere stay usable
+    eq_(p1.forward(mapnik2.Coord(0, 0)).x, c.x)
+
+@raises(RuntimeError)
+def test_cached_projection_invalid():
+    mapnik2.cached_projection('+proj=foo')
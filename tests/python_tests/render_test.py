@@ -26,6 +26,122 @@ def test_render_image_to_string():
 
     s = i.tostring('png')
 
+def test_png_compression_options():
+    m = mapnik2.Map(256, 256)
+    mapnik2.load_map(m, '../data/good_maps/agg_poly_gamma_map.xml')
+    m.zoom_all()
+    i = mapnik2.Image(256, 256)
+    mapnik2.render(m, i)
+    default = i.tostring('png')
+    uncompressed = i.tostring('png:z=0')
+    fast = i.tostring('png:z=1:s=rle:f=none')
+    best = i.tostring('png:z=9:s=filtered:f=all')
+    ok_(len(uncompressed) > len(fast))
+    ok_(len(uncompressed) > len(best))
+    for data in (default, uncompressed, fast, best):
+        eq_(data[:8], '\x89PNG\r\n\x1a\n')
+    ok_(len(i.tostring('png256:z=1:s=huff')) > 0)
+
+@raises(RuntimeError)
+def test_png_invalid_compression_level():
+    mapnik2.Image(16, 16).tostring('png:z=10')
+
+@raises(RuntimeError)
+def test_png_invalid_strategy():
+    mapnik2.Image(16, 16).tostring('png:s=bogus')
+
+def test_render_with_palette():
+    m = mapnik2.Map(256, 256)
+    mapnik2.load_map(m, '../data/good_maps/agg_poly_gamma_map.xml')
+    m.zoom_all()
+    i = mapnik2.Image(256, 256)
+    mapnik2.render(m, i)
+    pal = mapnik2.Palette.from_images([i], 64)
+    ok_(0 < len(pal) <= 64)
+    data = i.tostring('png', pal)
+    eq_(data[:8], '\x89PNG\r\n\x1a\n')
+    # a palette round trips through its packed rgba form
+    pal2 = mapnik2.Palette(pal.tostring(), 'rgba')
+    eq_(pal2.tostring(), pal.tostring())
+    eq_(i.tostring('png:z=1', pal2), i.tostring('png:z=1', pal))
+    eq_(i.view(0, 0, 128, 128).tostring('png', pal)[:8], '\x89PNG\r\n\x1a\n')
+
+def test_palette_formats():
+    eq_(len(mapnik2.Palette('\xff\x00\x00\x00\xff\x00', 'rgb')), 2)
+    act = '\x00\x00\x00' * 256 + '\x00\x02\x00\x00'
+    pal = mapnik2.Palette(act, 'act')
+    eq_(len(pal), 2)
+    # the transparent color is moved first
+    eq_(pal.tostring()[:4], '\x00\x00\x00\x00')
+
+@raises(RuntimeError)
+def test_palette_rejects_quantization_options():
+    pal = mapnik2.Palette('\xff\x00\x00\x00\xff\x00', 'rgb')
+    mapnik2.Image(16, 16).tostring('png:c=16', pal)
+
+@raises(RuntimeError)
+def test_invalid_palette():
+    mapnik2.Palette('\xff\x00\x00', 'rgba')
+
+def test_image_buffer_protocol():
+    i = mapnik2.Image(256, 256)
+    i.background = mapnik2.Color('black')
+    buf = memoryview(i)
+    eq_(len(buf), 256 * 256 * 4)
+    eq_(buf.tobytes(), i.tostring())
+    # the buffer shares the image pixels
+    i.background = mapnik2.Color('white')
+    eq_(buf.tobytes(), i.tostring())
+
+def test_image_view_buffer_protocol():
+    i = mapnik2.Image(256, 256)
+    i.background = mapnik2.Color('black')
+    view = i.view(64, 64, 32, 16)
+    buf = memoryview(view)
+    eq_(buf.shape, (16, 32, 4))
+    eq_(buf.readonly, True)
+    eq_(buf.tobytes(), view.tostring())
+
+def test_image_frombuffer():
+    i = mapnik2.Image(256, 256)
+    i.background = mapnik2.Color('rgba(255,0,0,.5)')
+    i2 = mapnik2.Image.frombuffer(256, 256, i.tostring())
+    eq_(i2.tostring(), i.tostring())
+    eq_(i2.tostring('png'), i.tostring('png'))
+
+@raises(ValueError)
+def test_image_frombuffer_size_mismatch():
+    mapnik2.Image.frombuffer(256, 256, '\x00' * 16)
+
+def test_render_with_feature_cache():
+    m = mapnik2.Map(256, 256)
+    mapnik2.load_map(m, '../data/good_maps/agg_poly_gamma_map.xml')
+    m.zoom_all()
+    expected = mapnik2.Image(256, 256)
+    mapnik2.render(m, expected)
+
+    mapnik2.clear_feature_cache()
+    m.layers[0].cache_features = True
+    for i in range(2):
+        im = mapnik2.Image(256, 256)
+        mapnik2.render(m, im)
+        eq_(im.tostring(), expected.tostring())
+    stats = mapnik2.feature_cache_stats()
+    eq_(stats['misses'], 1)
+    eq_(stats['hits'], 1)
+    eq_(stats['entries'], 1)
+    ok_(stats['bytes'] > 0)
+
+    # an entry larger than the budget is not kept
+    mapnik2.set_feature_cache_size(1024)
+    eq_(mapnik2.feature_cache_stats()['entries'], 0)
+    im = mapnik2.Image(256, 256)
+    mapnik2.render(m, im)
+    eq_(im.tostring(), expected.tostring())
+    eq_(mapnik2.feature_cache_stats()['entries'], 0)
+    mapnik2.set_feature_cache_size(64 * 1024 * 1024)
+    mapnik2.clear_feature_cache()
+
 def test_setting_alpha():
     w,h = 256,256
     im1 = mapnik2.Image(w,h)
@@ -132,3 +248,36 @@ def test_render_points():
 		num_points_rendered = svg.count('<image ')
 		eq_(num_points_present, num_points_rendered, "Not all points were rendered (%d instead of %d) at projection %s" % (num_points_rendered, num_points_present, projdescr)) 
 
+
+def test_render_metatile():
+    m = mapnik2.Map(256, 256)
+    m.background = mapnik2.Color('black')
+    tiles = mapnik2.render_metatile(m, mapnik2.Box2d(-10, -10, 10, 10), 2, 256, 64, 'png')
+    eq_(len(tiles), 4)
+    for x in range(2):
+        for y in range(2):
+            eq_(tiles[(x, y)][:4], '\x89PNG')
+    eq_(tiles[(0, 0)], tiles[(1, 1)])
+
+@raises(ValueError)
+def test_render_metatile_non_square():
+    m = mapnik2.Map(256, 256)
+    mapnik2.render_metatile(m, mapnik2.Box2d(-20, -10, 20, 10), 2, 256, 64, 'png')
+
+def test_render_pool():
+    mapfile = '../data/good_maps/building_symbolizer.xml'
+    m = mapnik2.Map(256, 256)
+    mapnik2.load_map(m, mapfile)
+    m.zoom_all()
+    bbox = m.envelope()
+    expected = mapnik2.Image(256, 256)
+    mapnik2.render(m, expected)
+    pool = mapnik2.RenderPool(mapfile, workers=2)
+    try:
+        jobs = [(bbox, 256, 256, 'png')] * 4
+        results = list(pool.imap(jobs))
+    finally:
+        pool.close()
+    eq_(len(results), 4)
+    for job, data in results:
+        eq_(data, expected.tostring('png'))
@@ -33,6 +33,7 @@
 #include "quadtree.hpp"
 #include "shapefile.hpp"
 #include "shape_io.hpp"
+#include "shp_packed_index.hpp"
 
 const int MAXDEPTH = 64;
 const int DEFAULT_DEPTH = 8;
@@ -50,6 +51,7 @@ int main (int argc,char** argv)
     using std::endl;
     
     bool verbose=false;
+    bool packed=true;
     unsigned int depth=DEFAULT_DEPTH;
     double ratio=DEFAULT_RATIO;
     vector<string> shape_files;
@@ -61,8 +63,9 @@ int main (int argc,char** argv)
             ("help,h", "produce usage message")
             ("version,V","print version string")
             ("verbose,v","verbose output")
-            ("depth,d", po::value<unsigned int>(), "max tree depth\n(default 8)")   
-            ("ratio,r",po::value<double>(),"split ratio (default 0.55)")
+            ("quadtree,q","write a quadtree index, readable by older versions,\ninstead of a packed Hilbert R-tree")
+            ("depth,d", po::value<unsigned int>(), "max quadtree depth\n(default 8)")   
+            ("ratio,r",po::value<double>(),"quadtree split ratio (default 0.55)")
             ("shape_files",po::value<vector<string> >(),"shape files to index: file1 file2 ...fileN")
             ;
         
@@ -74,7 +77,7 @@ int main (int argc,char** argv)
         
         if (vm.count("version"))
         {
-            clog<<"version 0.3.0" <<std::endl;
+            clog<<"version 0.4.0" <<std::endl;
             return 1;
         }
 
@@ -87,6 +90,10 @@ int main (int argc,char** argv)
         {
             verbose = true;
         }
+        if (vm.count("quadtree"))
+        {
+            packed = false;
+        }
         if (vm.count("depth"))
         {
             depth = vm["depth"].as<unsigned int>();
@@ -107,8 +114,11 @@ int main (int argc,char** argv)
         return -1;
     }
     
-    clog << "max tree depth:" << depth << endl;
-    clog << "split ratio:" << ratio << endl;
+    if (!packed)
+    {
+        clog << "max tree depth:" << depth << endl;
+        clog << "split ratio:" << ratio << endl;
+    }
   
     vector<string>::const_iterator itr = shape_files.begin();
     if (itr == shape_files.end())
@@ -155,6 +165,8 @@ int main (int argc,char** argv)
         int pos=50;
         shp.seek(pos*2);  
         quadtree<int> tree(extent,depth,ratio);
+        vector<box2d<double> > boxes;
+        vector<int> offsets;
         int count=0;
         while (true) {
             
@@ -205,7 +217,15 @@ int main (int argc,char** argv)
                 shp.skip(2*content_length-4*8-4);
             }
             
-            tree.insert(offset,item_ext);
+            if (packed)
+            {
+                boxes.push_back(item_ext);
+                offsets.push_back(offset);
+            }
+            else
+            {
+                tree.insert(offset,item_ext);
+            }
             if (verbose) {
                 clog << "record number " << record_number << " box=" << item_ext << endl;
             }
@@ -226,6 +246,13 @@ int main (int argc,char** argv)
         if (!file) {
             clog << "cannot open index file for writing file \"" 
                  << (shapename+".index") << "\"" << endl;
+        } else if (packed) {
+            vector<char> index;
+            shp_packed_index::build(boxes,offsets,index);
+            file.exceptions(std::ios::failbit | std::ios::badbit);
+            file.write(&index[0],index.size());
+            file.flush();
+            file.close();
         } else {
             tree.trim();
             std::clog<<" number nodes="<<tree.count()<<std::endl;